@@ -0,0 +1,149 @@
+"""Esquema inicial (equivalente al create_all previo a las migraciones)
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-18 00:59:34.070769
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('academic_years',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('start_date', sa.Date(), nullable=False),
+    sa.Column('end_date', sa.Date(), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('year')
+    )
+    op.create_index(op.f('ix_academic_years_id'), 'academic_years', ['id'], unique=False)
+
+    op.create_table('grades',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('level', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_grades_id'), 'grades', ['id'], unique=False)
+
+    op.create_table('guardians',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('dni', sa.String(length=8), nullable=False),
+    sa.Column('first_name', sa.String(), nullable=False),
+    sa.Column('last_name', sa.String(), nullable=False),
+    sa.Column('phone', sa.String(), nullable=True),
+    sa.Column('email', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_guardians_dni'), 'guardians', ['dni'], unique=True)
+    op.create_index(op.f('ix_guardians_id'), 'guardians', ['id'], unique=False)
+
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('hashed_password', sa.String(), nullable=False),
+    sa.Column('full_name', sa.String(), nullable=True),
+    sa.Column('role', sa.String(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_index(op.f('ix_users_username'), 'users', ['username'], unique=True)
+
+    op.create_table('sections',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('grade_id', sa.Integer(), nullable=True),
+    sa.Column('capacity', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['grade_id'], ['grades.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_sections_id'), 'sections', ['id'], unique=False)
+
+    op.create_table('students',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('dni', sa.String(length=8), nullable=False),
+    sa.Column('first_name', sa.String(), nullable=False),
+    sa.Column('last_name', sa.String(), nullable=False),
+    sa.Column('birth_date', sa.Date(), nullable=False),
+    sa.Column('address', sa.String(), nullable=True),
+    sa.Column('guardian_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['guardian_id'], ['guardians.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_students_dni'), 'students', ['dni'], unique=True)
+    op.create_index(op.f('ix_students_id'), 'students', ['id'], unique=False)
+
+    op.create_table('enrollments',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('student_id', sa.Integer(), nullable=True),
+    sa.Column('academic_year_id', sa.Integer(), nullable=True),
+    sa.Column('grade_id', sa.Integer(), nullable=True),
+    sa.Column('section_id', sa.Integer(), nullable=True),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['academic_year_id'], ['academic_years.id'], ),
+    sa.ForeignKeyConstraint(['grade_id'], ['grades.id'], ),
+    sa.ForeignKeyConstraint(['section_id'], ['sections.id'], ),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_enrollments_id'), 'enrollments', ['id'], unique=False)
+
+    op.create_table('documents',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('enrollment_id', sa.Integer(), nullable=True),
+    sa.Column('type', sa.String(), nullable=False),
+    sa.Column('file_url', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.Column('uploaded_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['enrollment_id'], ['enrollments.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_documents_id'), 'documents', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_documents_id'), table_name='documents')
+
+    op.drop_table('documents')
+    op.drop_index(op.f('ix_enrollments_id'), table_name='enrollments')
+
+    op.drop_table('enrollments')
+    op.drop_index(op.f('ix_students_id'), table_name='students')
+    op.drop_index(op.f('ix_students_dni'), table_name='students')
+
+    op.drop_table('students')
+    op.drop_index(op.f('ix_sections_id'), table_name='sections')
+
+    op.drop_table('sections')
+    op.drop_index(op.f('ix_users_username'), table_name='users')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_index(op.f('ix_users_email'), table_name='users')
+
+    op.drop_table('users')
+    op.drop_index(op.f('ix_guardians_id'), table_name='guardians')
+    op.drop_index(op.f('ix_guardians_dni'), table_name='guardians')
+
+    op.drop_table('guardians')
+    op.drop_index(op.f('ix_grades_id'), table_name='grades')
+
+    op.drop_table('grades')
+    op.drop_index(op.f('ix_academic_years_id'), table_name='academic_years')
+
+    op.drop_table('academic_years')
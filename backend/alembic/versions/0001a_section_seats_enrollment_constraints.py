@@ -0,0 +1,58 @@
+"""Contadores de vacantes por sección/año y unicidad de matrícula por estudiante/año
+
+Revision ID: 0001a
+Revises: 0001
+Create Date: 2026-10-18 00:59:35.104512
+
+Para bases creadas con create_all antes de las migraciones. Los contadores
+se inicializan con las matrículas existentes; la restricción única falla
+con un mensaje claro si ya hay estudiantes matriculados dos veces en un año.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001a'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    duplicates = op.get_bind().execute(sa.text(
+        'SELECT student_id, academic_year_id, count(*) FROM enrollments '
+        'WHERE student_id IS NOT NULL AND academic_year_id IS NOT NULL '
+        'GROUP BY student_id, academic_year_id HAVING count(*) > 1'
+    )).all()
+    if duplicates:
+        listed = ', '.join(f'estudiante {s} en año {y} ({n})' for s, y, n in duplicates[:20])
+        raise RuntimeError(f'Hay matrículas duplicadas; corríjalas antes de migrar: {listed}')
+
+    op.create_table('section_seats',
+    sa.Column('section_id', sa.Integer(), nullable=False),
+    sa.Column('academic_year_id', sa.Integer(), nullable=False),
+    sa.Column('enrolled_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['academic_year_id'], ['academic_years.id'], ),
+    sa.ForeignKeyConstraint(['section_id'], ['sections.id'], ),
+    sa.PrimaryKeyConstraint('section_id', 'academic_year_id')
+    )
+    op.execute(
+        "INSERT INTO section_seats (section_id, academic_year_id, enrolled_count) "
+        "SELECT section_id, academic_year_id, count(*) FROM enrollments "
+        "WHERE section_id IS NOT NULL AND academic_year_id IS NOT NULL AND coalesce(status, '') != 'Rechazado' "
+        "GROUP BY section_id, academic_year_id"
+    )
+
+    with op.batch_alter_table('enrollments') as batch_op:
+        batch_op.create_unique_constraint('uq_enrollments_student_year', ['student_id', 'academic_year_id'])
+    op.create_index('ix_enrollments_section_year_status', 'enrollments', ['section_id', 'academic_year_id', 'status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_enrollments_section_year_status', table_name='enrollments')
+    with op.batch_alter_table('enrollments') as batch_op:
+        batch_op.drop_constraint('uq_enrollments_student_year', type_='unique')
+    op.drop_table('section_seats')
@@ -0,0 +1,55 @@
+"""Almacén de blobs por contenido (document_blobs) y columnas de hash en documents
+
+Revision ID: 0001b
+Revises: 0001a
+Create Date: 2026-10-18 00:59:36.381207
+
+Los documentos existentes quedan con blob_id y sha256 en NULL: se siguen
+sirviendo desde su file_url.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001b'
+down_revision: Union[str, None] = '0001a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('document_blobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('size_bytes', sa.Integer(), nullable=False),
+    sa.Column('content_type', sa.String(), nullable=False),
+    sa.Column('path', sa.String(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('sha256')
+    )
+    op.create_index(op.f('ix_document_blobs_id'), 'document_blobs', ['id'], unique=False)
+
+    with op.batch_alter_table('documents') as batch_op:
+        batch_op.add_column(sa.Column('blob_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('sha256', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('size_bytes', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_documents_blob_id_document_blobs', 'document_blobs', ['blob_id'], ['id'])
+    op.create_index(op.f('ix_documents_blob_id'), 'documents', ['blob_id'], unique=False)
+    op.create_index(op.f('ix_documents_sha256'), 'documents', ['sha256'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_documents_sha256'), table_name='documents')
+    op.drop_index(op.f('ix_documents_blob_id'), table_name='documents')
+    with op.batch_alter_table('documents') as batch_op:
+        batch_op.drop_constraint('fk_documents_blob_id_document_blobs', type_='foreignkey')
+        batch_op.drop_column('size_bytes')
+        batch_op.drop_column('sha256')
+        batch_op.drop_column('blob_id')
+    op.drop_index(op.f('ix_document_blobs_id'), table_name='document_blobs')
+    op.drop_table('document_blobs')
@@ -0,0 +1,60 @@
+"""Cola de post-procesamiento (document_jobs) y resultados en documents
+
+Revision ID: 0001c
+Revises: 0001b
+Create Date: 2026-10-18 00:59:37.520946
+
+Los documentos existentes no se encolan: su processing_status queda en NULL.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001c'
+down_revision: Union[str, None] = '0001b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PROCESSING_COLUMNS = (
+    ('processing_status', sa.String()),
+    ('thumbnail_url', sa.String()),
+    ('preview_url', sa.String()),
+    ('page_count', sa.Integer()),
+    ('width', sa.Integer()),
+    ('height', sa.Integer()),
+    ('file_metadata', sa.JSON()),
+    ('processed_at', sa.DateTime(timezone=True)),
+)
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('documents') as batch_op:
+        for name, type_ in PROCESSING_COLUMNS:
+            batch_op.add_column(sa.Column(name, type_, nullable=True))
+
+    op.create_table('document_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('document_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_document_jobs_id'), 'document_jobs', ['id'], unique=False)
+    op.create_index('ix_document_jobs_status_id', 'document_jobs', ['status', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_document_jobs_status_id', table_name='document_jobs')
+    op.drop_index(op.f('ix_document_jobs_id'), table_name='document_jobs')
+    op.drop_table('document_jobs')
+    with op.batch_alter_table('documents') as batch_op:
+        for name, _ in reversed(PROCESSING_COLUMNS):
+            batch_op.drop_column(name)
@@ -0,0 +1,34 @@
+"""Contador de matrículas pendientes en section_seats (ocupación por año)
+
+Revision ID: 0001d
+Revises: 0001c
+Create Date: 2026-10-18 00:59:38.047153
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001d'
+down_revision: Union[str, None] = '0001c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('section_seats', sa.Column('pending_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        "UPDATE section_seats SET pending_count = ("
+        "SELECT count(*) FROM enrollments "
+        "WHERE enrollments.section_id = section_seats.section_id "
+        "AND enrollments.academic_year_id = section_seats.academic_year_id "
+        "AND enrollments.status = 'Pendiente')"
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('section_seats') as batch_op:
+        batch_op.drop_column('pending_count')
@@ -0,0 +1,60 @@
+"""Índices de trigramas para buscar estudiantes y apoderados por nombre
+
+Revision ID: 0002
+Revises: 0001d
+Create Date: 2026-10-18 01:31:12.408211
+
+Solo PostgreSQL: en SQLite la búsqueda usa un índice en memoria
+(app.services.search). Los índices se crean CONCURRENTLY para no bloquear
+las escrituras en tablas ya pobladas.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_INDEXES = {
+    'ix_students_search_name': 'students',
+    'ix_guardians_search_name': 'guardians',
+}
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+    # unaccent() no es IMMUTABLE (depende del search_path); con el diccionario
+    # calificado sí se puede declarar así y usar en un índice de expresión.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION search_name(last_name text, first_name text)
+        RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE
+        AS $$
+            SELECT public.unaccent('public.unaccent'::regdictionary,
+                                   lower(coalesce(last_name, '') || ' ' || coalesce(first_name, '')))
+        $$
+    """)
+    with op.get_context().autocommit_block():
+        for index_name, table in SEARCH_INDEXES.items():
+            op.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} '
+                f'ON {table} USING gin (search_name(last_name, first_name) gin_trgm_ops)'
+            )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    with op.get_context().autocommit_block():
+        for index_name in SEARCH_INDEXES:
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {index_name}')
+    op.execute('DROP FUNCTION IF EXISTS search_name(text, text)')
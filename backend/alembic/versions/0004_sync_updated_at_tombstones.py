@@ -0,0 +1,58 @@
+"""Columna updated_at y lápidas para la sincronización incremental (?updated_since=)
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 03:12:47.209381
+
+En PostgreSQL la columna se agrega con DEFAULT now() sin reescribir las
+tablas. SQLite no admite agregar una columna con un default no constante:
+la tabla se recrea y las filas existentes reciben el mismo instante,
+escrito por SQLAlchemy en el formato con que la aplicación escribe
+updated_at (las comparaciones con el cursor son de texto).
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SYNCED_TABLES = ('guardians', 'students', 'enrollments', 'documents')
+
+
+def upgrade() -> None:
+    sqlite = op.get_bind().dialect.name == 'sqlite'
+    now = datetime.now(timezone.utc)
+    for table in SYNCED_TABLES:
+        column = sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False)
+        if sqlite:
+            with op.batch_alter_table(table, recreate='always') as batch_op:
+                batch_op.add_column(column)
+            op.execute(sa.table(table, sa.column('updated_at', sa.DateTime(timezone=True))).update().values(updated_at=now))
+        else:
+            op.add_column(table, column)
+        op.create_index(op.f(f'ix_{table}_updated_at'), table, ['updated_at'], unique=False)
+
+    op.create_table('tombstones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('table_name', sa.String(), nullable=False),
+    sa.Column('row_id', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_tombstones_table_deleted_at', 'tombstones', ['table_name', 'deleted_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tombstones_table_deleted_at', table_name='tombstones')
+    op.drop_table('tombstones')
+    for table in reversed(SYNCED_TABLES):
+        op.drop_index(op.f(f'ix_{table}_updated_at'), table_name=table)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('updated_at')
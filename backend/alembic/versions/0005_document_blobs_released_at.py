@@ -0,0 +1,29 @@
+"""Blobs liberados: released_at para el borrado diferido de archivos (worker)
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 05:21:09.734215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('document_blobs', sa.Column('released_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index(op.f('ix_document_blobs_released_at'), 'document_blobs', ['released_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_document_blobs_released_at'), table_name='document_blobs')
+    with op.batch_alter_table('document_blobs') as batch_op:
+        batch_op.drop_column('released_at')
@@ -1,65 +1,143 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from app.db.session import get_db
+from app.db.session import get_async_db
 from app.api.deps import get_current_user
-from app.models.academic import AcademicYear, Grade, Section
+from app.api import reference
+from app.api.versioning import etag_matches
+from app.core.config import settings
+from app.models.academic import AcademicYear, Grade, Section, SectionSeat
 from app.schemas.academic import (
     AcademicYearCreate, AcademicYear as AcademicYearSchema,
     GradeCreate, Grade as GradeSchema,
-    SectionCreate, Section as SectionSchema
+    SectionCreate, Section as SectionSchema,
+    Occupancy, GradeOccupancy, SectionOccupancy
 )
+from app.services import seats
 
 router = APIRouter(dependencies=[Depends(get_current_user)])
 
+# Datos autenticados: solo la caché del navegador, que revalida con If-None-Match
+CACHE_CONTROL = f"private, max-age={settings.REFERENCE_CACHE_MAX_AGE_SECONDS}, must-revalidate"
+
+
+def _cached_json(request: Request, document: reference.Document) -> Response:
+    headers = {"ETag": document.etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), document.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(document.body, media_type="application/json", headers=headers)
+
 # --- Academic Years ---
 @router.post("/years", response_model=AcademicYearSchema)
-def create_academic_year(year: AcademicYearCreate, db: Session = Depends(get_db)):
-    db_year = db.query(AcademicYear).filter(AcademicYear.year == year.year).first()
+async def create_academic_year(year: AcademicYearCreate, db: AsyncSession = Depends(get_async_db)):
+    db_year = await db.scalar(select(AcademicYear.id).where(AcademicYear.year == year.year))
     if db_year:
         raise HTTPException(status_code=400, detail="Año académico ya existe")
     
     new_year = AcademicYear(**year.model_dump())
     db.add(new_year)
-    db.commit()
-    db.refresh(new_year)
+    await db.flush()
+    await db.run_sync(seats.create_seat_rows, academic_year_id=new_year.id)
+    await db.commit()
+    reference.invalidate()
     return new_year
 
 @router.get("/years", response_model=List[AcademicYearSchema])
-def read_academic_years(db: Session = Depends(get_db)):
-    return db.query(AcademicYear).all()
+async def read_academic_years(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return _cached_json(request, (await reference.snapshot(db)).years)
 
 # --- Grades ---
 @router.post("/grades", response_model=GradeSchema)
-def create_grade(grade: GradeCreate, db: Session = Depends(get_db)):
-    new_grade = Grade(**grade.model_dump())
+async def create_grade(grade: GradeCreate, db: AsyncSession = Depends(get_async_db)):
+    new_grade = Grade(**grade.model_dump(), sections=[])
     db.add(new_grade)
-    db.commit()
-    db.refresh(new_grade)
+    await db.commit()
+    reference.invalidate()
     return new_grade
 
 @router.get("/grades", response_model=List[GradeSchema])
-def read_grades(db: Session = Depends(get_db)):
-    return db.query(Grade).all()
+async def read_grades(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return _cached_json(request, (await reference.snapshot(db)).grades)
 
 # --- Sections ---
 @router.post("/sections", response_model=SectionSchema)
-def create_section(section: SectionCreate, db: Session = Depends(get_db)):
+async def create_section(section: SectionCreate, db: AsyncSession = Depends(get_async_db)):
     # Verificar si el grado existe
-    grade = db.query(Grade).filter(Grade.id == section.grade_id).first()
+    grade = await db.get(Grade, section.grade_id)
     if not grade:
         raise HTTPException(status_code=404, detail="Grado no encontrado")
 
     new_section = Section(**section.model_dump())
     db.add(new_section)
-    db.commit()
-    db.refresh(new_section)
+    await db.flush()
+    await db.run_sync(seats.create_seat_rows, section_id=new_section.id)
+    await db.commit()
+    seats.invalidate_occupancy()
+    reference.invalidate()
     return new_section
 
 @router.get("/sections", response_model=List[SectionSchema])
-def read_sections(grade_id: Optional[int] = None, db: Session = Depends(get_db)):
-    query = db.query(Section)
-    if grade_id:
-        query = query.filter(Section.grade_id == grade_id)
-    return query.all()
+async def read_sections(request: Request, grade_id: Optional[int] = None, db: AsyncSession = Depends(get_async_db)):
+    snapshot = await reference.snapshot(db)
+    return _cached_json(request, snapshot.sections_of(grade_id) if grade_id else snapshot.sections)
+
+# --- Occupancy ---
+def _build_occupancy(db: Session, year_id: int) -> Occupancy:
+    # Solo lectura: un contador que no existe (sección sin matrículas en el año) cuenta como cero
+    rows = db.execute(
+        select(
+            Grade.id, Grade.name, Grade.level,
+            Section.id, Section.name, Section.capacity,
+            SectionSeat.enrolled_count, SectionSeat.pending_count,
+        )
+        .join(Section, Section.grade_id == Grade.id)
+        .outerjoin(SectionSeat, and_(
+            SectionSeat.section_id == Section.id, SectionSeat.academic_year_id == year_id
+        ))
+        .order_by(Grade.id, Section.name)
+    ).all()
+
+    occupancy = Occupancy(academic_year_id=year_id, capacity=0, enrolled=0, pending=0, free=0)
+    grades = {}
+    for grade_id, grade_name, level, section_id, section_name, capacity, occupied, pending in rows:
+        occupied, pending, capacity = occupied or 0, pending or 0, capacity or 0
+        section = SectionOccupancy(
+            section_id=section_id,
+            name=section_name,
+            capacity=capacity,
+            enrolled=occupied - pending,
+            pending=pending,
+            free=max(capacity - occupied, 0),
+        )
+        grade = grades.get(grade_id)
+        if grade is None:
+            grade = grades[grade_id] = GradeOccupancy(
+                grade_id=grade_id, name=grade_name, level=level, capacity=0, enrolled=0, pending=0, free=0
+            )
+            occupancy.grades.append(grade)
+        grade.sections.append(section)
+        for total in (grade, occupancy):
+            total.capacity += section.capacity
+            total.enrolled += section.enrolled
+            total.pending += section.pending
+            total.free += section.free
+    return occupancy
+
+@router.get("/occupancy", response_model=Occupancy)
+async def read_occupancy(year_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Capacidad, matriculados, pendientes y vacantes libres por sección y grado.
+
+    Se arma desde los contadores de section_seats (sin contar matrículas) y
+    se cachea por año; cada cambio de matrícula invalida la entrada.
+    """
+    cached = seats.occupancy_cache.get(year_id)
+    if cached is not None:
+        return cached
+    if await db.get(AcademicYear, year_id) is None:
+        raise HTTPException(status_code=404, detail="Año académico no encontrado")
+    occupancy = await db.run_sync(_build_occupancy, year_id)
+    seats.occupancy_cache.set(year_id, occupancy)
+    return occupancy
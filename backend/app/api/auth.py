@@ -1,33 +1,86 @@
 from datetime import timedelta
 from typing import Any
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db
-from app.core import security
+from app.db.session import get_async_db
+from app.core import hashing, security
+from app.core.config import settings
+from app.core.throttle import FailureTracker
 from app.models.user import User
 from app.schemas.token import Token
 
 router = APIRouter()
 
+# Intentos fallidos por usuario y por IP (en memoria, por worker)
+user_failures = FailureTracker(settings.LOGIN_MAX_FAILURES_PER_USER, settings.LOGIN_FAILURE_WINDOW_SECONDS)
+ip_failures = FailureTracker(settings.LOGIN_MAX_FAILURES_PER_IP, settings.LOGIN_FAILURE_WINDOW_SECONDS)
+
+
+def _too_many_attempts(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Demasiados intentos fallidos. Intente nuevamente más tarde.",
+        headers={"Retry-After": str(max(1, int(retry_after) + 1))},
+    )
+
+
 @router.post("/login/access-token", response_model=Token)
-def login_access_token(
-    db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()
+async def login_access_token(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    form_data: OAuth2PasswordRequestForm = Depends(),
 ) -> Any:
     """
     OAuth2 compatible token login, get an access token for future requests
     """
+    username = form_data.username.strip().lower()
+    # IP de la conexión, o la que fija nginx en X-Forwarded-For si la conexión viene
+    # de un proxy de confianza (GUNICORN_FORWARDED_ALLOW_IPS); el cliente no puede cambiarla
+    client_ip = request.client.host if request.client else None
+
+    # Rechazar antes de consultar la base o calcular ningún hash
+    for tracker, key in ((user_failures, username), (ip_failures, client_ip)):
+        retry_after = tracker.retry_after(key)
+        if retry_after is not None:
+            raise _too_many_attempts(retry_after)
+
     # Permitir login por username o email
-    user = db.query(User).filter(
-        (User.username == form_data.username) | (User.email == form_data.username)
-    ).first()
-    
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    user = (await db.execute(
+        select(User.id, User.hashed_password, User.is_active).where(
+            (User.username == form_data.username) | (User.email == form_data.username)
+        )
+    )).first()
+    # Devolver la conexión al pool mientras bcrypt trabaja (~250 ms)
+    await db.close()
+
+    if not user:
+        ok, new_hash = False, None
+    else:
+        try:
+            ok, new_hash = await hashing.verify_and_update(form_data.password, user.hashed_password)
+        except hashing.HasherBusy:
+            raise HTTPException(
+                status_code=503,
+                detail="Servicio de autenticación saturado. Intente nuevamente.",
+                headers={"Retry-After": "1"},
+            )
+
+    if not ok:
+        user_failures.record_failure(username)
+        ip_failures.record_failure(client_ip)
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     elif not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-        
+    user_failures.reset(username)
+
+    if new_hash is not None:
+        # El costo configurado cambió: guardar el hash con el costo nuevo
+        await db.execute(update(User).where(User.id == user.id).values(hashed_password=new_hash))
+        await db.commit()
+
     access_token_expires = timedelta(minutes=security.ACCESS_TOKEN_EXPIRE_MINUTES)
     return {
         "access_token": security.create_access_token(
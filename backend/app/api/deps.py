@@ -1,39 +1,90 @@
-from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+from typing import Optional
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from sqlalchemy.orm import Session
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db
+from app.db.session import get_async_db
 from app.models.user import User
-from app.core.security import ALGORITHM, SECRET_KEY
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.security import ALGORITHM, EVENTS_SCOPE, SECRET_KEY
 from app.schemas.token import TokenPayload
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"/api/v1/login/access-token"
 )
+# Sin error automático: get_stream_user también acepta un token de stream en la URL
+optional_oauth2 = OAuth2PasswordBearer(
+    tokenUrl=f"/api/v1/login/access-token", auto_error=False
+)
 
-def get_current_user(
-    db: Session = Depends(get_db),
-    token: str = Depends(reusable_oauth2)
-) -> User:
+# Caché del usuario autenticado (por id) para no consultar la BD en cada request.
+# Se guardan instancias de User desacopladas de la sesión (solo lectura).
+principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_MAX_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_principal(mapper, connection, target: User) -> None:
+    # Desactivar un usuario o cambiar su rol debe surtir efecto de inmediato
+    # en este proceso; en otros workers el TTL acota cuánto dura el dato viejo.
+    principal_cache.invalidate(target.id)
+
+def _decode_token(token: str, scope: Optional[str] = None) -> int:
+    """Id del usuario del token; el alcance debe coincidir (None = token de sesión)"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         token_data = TokenPayload(**payload)
     except (JWTError, ValueError):
+        token_data = None
+    if token_data is None or token_data.sub is None or token_data.scope != scope:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    
-    user = db.query(User).filter(User.id == int(token_data.sub)).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    return int(token_data.sub)
+
+async def _load_user(db: AsyncSession, user_id: int) -> User:
+    user = principal_cache.get(user_id)
+    if user is None:
+        user = await db.get(User, user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        db.expunge(user)
+        principal_cache.set(user_id, user)
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return user
 
-def get_current_active_superuser(
+async def get_current_user(
+    db: AsyncSession = Depends(get_async_db),
+    token: str = Depends(reusable_oauth2)
+) -> User:
+    return await _load_user(db, _decode_token(token))
+
+async def get_stream_user(
+    db: AsyncSession = Depends(get_async_db),
+    token: Optional[str] = Depends(optional_oauth2),
+    stream_token: Optional[str] = Query(
+        None, alias="token", description="Token de POST /events/token, para EventSource (no envía cabeceras)"
+    ),
+) -> User:
+    # El token de sesión nunca va en la URL (quedaría en los logs de nginx)
+    if token:
+        return await _load_user(db, _decode_token(token))
+    if stream_token:
+        return await _load_user(db, _decode_token(stream_token, EVENTS_SCOPE))
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Not authenticated",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+async def get_current_active_superuser(
     current_user: User = Depends(get_current_user),
 ) -> User:
     if current_user.role != "admin":
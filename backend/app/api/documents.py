@@ -1,111 +1,204 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, UploadFile, File, Form
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from typing import List, Optional
 from app.api import deps
-from app.models.enrollment import Document, Enrollment
+from app.api.file_response import serve_file
+from app.api.pagination import MAX_PAGE_SIZE, paginate, set_total_count
+from app.api.projection import columns, json_list, nest
+from app.api.sync import changes, set_sync_cursor
+from app.api.versioning import set_etag, update_versioned
+from app.models.enrollment import Document, DocumentJob, Enrollment
 from app.schemas.document import Document as DocumentSchema, DocumentCreate, DocumentUpdate
-import os
-import shutil
+from app.services import events, storage
+from starlette.concurrency import run_in_threadpool
 from pathlib import Path
-from datetime import datetime
+import mimetypes
 
 router = APIRouter()
 
-# Directorio para almacenar archivos
-UPLOAD_DIR = Path("uploads/documents")
-
 def ensure_upload_dir():
     """Crear directorio de uploads si no existe"""
     try:
-        UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+        storage.BLOB_TMP_DIR.mkdir(parents=True, exist_ok=True)
     except Exception as e:
         print(f"Warning: Could not create upload directory: {e}")
 
 @router.get("/", response_model=List[DocumentSchema])
-def get_documents(
-    db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100,
+async def get_documents(
+    response: Response,
+    db: AsyncSession = Depends(deps.get_async_db),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    with_total: bool = False,
     enrollment_id: Optional[int] = None,
+    updated_since: Optional[str] = Query(None, description="Solo cambios desde este cursor (X-Sync-Cursor o el de la sincronización anterior)"),
     current_user: dict = Depends(deps.get_current_user)
 ):
-    """Obtener lista de documentos, opcionalmente filtrados por matrícula"""
-    query = db.query(Document)
+    """Obtener lista de documentos, opcionalmente filtrados por matrícula.
+
+    Con `updated_since` los eliminados no se filtran por matrícula: el
+    cliente ignora los ids que no tiene.
+    """
+    query = select(*columns(Document, DocumentSchema))
     
     if enrollment_id:
-        query = query.filter(Document.enrollment_id == enrollment_id)
+        query = query.where(Document.enrollment_id == enrollment_id)
     
-    documents = query.offset(skip).limit(limit).all()
-    return documents
+    if updated_since:
+        return await changes(db, query, Document, DocumentSchema, updated_since, limit)
+    set_sync_cursor(response)
+    rows = await paginate(db, query, Document.id, response, skip, limit, cursor)
+    if with_total:
+        filters = (("enrollment_id", enrollment_id),) if enrollment_id else None
+        await set_total_count(db, query, response, Document.__tablename__, filters)
+    return json_list(DocumentSchema, [nest(row) for row in rows], response)
 
 @router.get("/{document_id}", response_model=DocumentSchema)
-def get_document(
+async def get_document(
     document_id: int,
-    db: Session = Depends(deps.get_db),
+    response: Response,
+    db: AsyncSession = Depends(deps.get_async_db),
     current_user: dict = Depends(deps.get_current_user)
 ):
     """Obtener un documento específico"""
-    document = db.query(Document).filter(Document.id == document_id).first()
+    document = await db.get(Document, document_id)
     if not document:
         raise HTTPException(status_code=404, detail="Documento no encontrado")
+    set_etag(response, document.version)
     return document
 
+@router.get("/{document_id}/content")
+async def get_document_content(
+    document_id: int,
+    request: Request,
+    variant: Optional[str] = None,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: dict = Depends(deps.get_current_user)
+):
+    """Descargar el archivo de un documento (soporta Range, ETag y 304).
+
+    `variant=thumbnail` o `variant=preview` devuelven la miniatura o la
+    versión recomprimida generadas por el worker, si existen.
+    """
+    document = await db.scalar(select(Document).options(joinedload(Document.blob)).where(Document.id == document_id))
+    if not document:
+        raise HTTPException(status_code=404, detail="Documento no encontrado")
+
+    if variant in ("thumbnail", "preview"):
+        derived = document.thumbnail_url if variant == "thumbnail" else document.preview_url
+        if not derived:
+            raise HTTPException(status_code=404, detail="Vista previa no disponible")
+        path = Path(derived)
+        media_type = "image/jpeg"
+        etag = f'"{document.sha256}-{variant}"' if document.sha256 else None
+    elif variant is not None:
+        raise HTTPException(status_code=400, detail="Variante inválida. Permitidas: thumbnail, preview")
+    else:
+        path = Path(document.file_url)
+        if document.blob is not None:
+            media_type = document.blob.content_type
+        else:
+            media_type = storage.content_type_for(path.suffix)
+        etag = f'"{document.sha256}"' if document.sha256 else None
+    safe_type = "".join(ch for ch in document.type if ch.isalnum()) or "documento"
+    filename = f"{safe_type}_{document.id}{mimetypes.guess_extension(media_type) or ''}"
+    return serve_file(request, path, media_type, etag=etag, filename=filename)
+
 @router.post("/upload", response_model=DocumentSchema)
 async def upload_document(
     enrollment_id: int = Form(...),
     type: str = Form(...),
-    file: UploadFile = File(...),
-    db: Session = Depends(deps.get_db),
+    file: Optional[UploadFile] = File(None),
+    sha256: Optional[str] = Form(None),
+    db: AsyncSession = Depends(deps.get_async_db),
     current_user: dict = Depends(deps.get_current_user)
 ):
-    """Subir un documento para una matrícula"""
+    """Subir un documento para una matrícula.
+
+    Si el contenido ya está almacenado basta con enviar su `sha256` sin el
+    archivo: el documento se vincula al blob existente sin volver a subirlo.
+    """
     # Asegurar que el directorio existe antes de subir
     ensure_upload_dir()
-    
-    # Verificar que la matrícula existe
-    enrollment = db.query(Enrollment).filter(Enrollment.id == enrollment_id).first()
-    if not enrollment:
-        raise HTTPException(status_code=404, detail="Matrícula no encontrada")
+
+    if file is None and not sha256:
+        raise HTTPException(status_code=400, detail="Debe enviar el archivo o su sha256")
     
     # Validar extensión de archivo
-    allowed_extensions = {".pdf", ".jpg", ".jpeg", ".png", ".doc", ".docx"}
-    file_ext = Path(file.filename).suffix.lower()
-    if file_ext not in allowed_extensions:
+    file_ext = Path(file.filename).suffix.lower() if file is not None else None
+    if file is not None and file_ext not in storage.MAX_UPLOAD_BYTES:
         raise HTTPException(
             status_code=400, 
-            detail=f"Tipo de archivo no permitido. Permitidos: {', '.join(allowed_extensions)}"
+            detail=f"Tipo de archivo no permitido. Permitidos: {', '.join(storage.MAX_UPLOAD_BYTES)}"
         )
     
-    # Generar nombre único para el archivo
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    safe_filename = f"{enrollment_id}_{type}_{timestamp}{file_ext}"
-    file_path = UPLOAD_DIR / safe_filename
-    
-    # Guardar archivo
+    # Verificar que la matrícula existe
+    enrollment = await db.scalar(select(Enrollment.id).where(Enrollment.id == enrollment_id))
+    if not enrollment:
+        raise HTTPException(status_code=404, detail="Matrícula no encontrada")
+
+    stored = None
+    if file is None:
+        # Re-subida instantánea: solo se suma una referencia al blob
+        blob = await db.run_sync(storage.reference_existing_blob, sha256.lower())
+        if blob is None:
+            raise HTTPException(status_code=404, detail="Contenido no encontrado. Suba el archivo.")
+        blob_id, file_path, digest, size = blob.id, blob.path, blob.sha256, blob.size_bytes
+    else:
+        # Recibir el archivo por bloques (con SHA-256 y límite de tamaño) en un temporal
+        try:
+            stored = await storage.save_blob(file, storage.MAX_UPLOAD_BYTES[file_ext])
+        except storage.UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except OSError as e:
+            raise HTTPException(status_code=500, detail=f"Error al guardar archivo: {str(e)}")
+        file_path, digest, size = str(stored.path), stored.sha256, stored.size
+
     try:
-        with file_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al guardar archivo: {str(e)}")
-    
-    # Crear registro en BD
-    db_document = Document(
-        enrollment_id=enrollment_id,
-        type=type,
-        file_url=str(file_path),
-        status="Pendiente"
-    )
-    db.add(db_document)
-    db.commit()
-    db.refresh(db_document)
-    
+        if stored is not None:
+            # Registra el blob y ubica el archivo con la fila bloqueada
+            blob_id = await db.run_sync(storage.acquire_blob, stored, storage.content_type_for(file_ext))
+
+        # Crear registro en BD
+        db_document = Document(
+            enrollment_id=enrollment_id,
+            type=type,
+            file_url=file_path,
+            blob_id=blob_id,
+            sha256=digest,
+            size_bytes=size,
+            status="Pendiente"
+        )
+        db.add(db_document)
+        # Miniatura, recompresión y metadatos se generan en segundo plano (app.worker)
+        db.add(DocumentJob(document=db_document))
+        await db.flush()
+        await events.publish(
+            db, "document", db_document.id,
+            enrollment_id=enrollment_id, status=db_document.status, version=db_document.version,
+        )
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        if stored is not None:
+            # El archivo recibido no queda huérfano: lo borra el GC si ningún documento lo usa
+            await db.run_sync(storage.discard_blob, stored, storage.content_type_for(file_ext))
+            await db.commit()
+        raise
+    # uploaded_at lo asigna la base
+    await db.refresh(db_document)
     return db_document
 
 @router.patch("/{document_id}/status", response_model=DocumentSchema)
-def update_document_status(
+async def update_document_status(
     document_id: int,
     status: str,
-    db: Session = Depends(deps.get_db),
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(deps.get_async_db),
     current_user: dict = Depends(deps.get_current_user)
 ):
     """Actualizar el estado de un documento (Pendiente, Validado, Observado)"""
@@ -113,36 +206,40 @@ def update_document_status(
     if status not in valid_statuses:
         raise HTTPException(status_code=400, detail=f"Estado inválido. Permitidos: {', '.join(valid_statuses)}")
     
-    document = db.query(Document).filter(Document.id == document_id).first()
-    if not document:
-        raise HTTPException(status_code=404, detail="Documento no encontrado")
-    
-    document.status = status
-    db.commit()
-    db.refresh(document)
-    
-    return document
+    row = await update_versioned(
+        db, Document, Document.id == document_id, {"status": status}, if_match,
+        columns(Document, DocumentSchema), "Documento no encontrado",
+    )
+    await events.publish(
+        db, "document", row.id, enrollment_id=row.enrollment_id, status=row.status, version=row.version
+    )
+    await db.commit()
+    set_etag(response, row.version)
+    return nest(row)
 
 @router.delete("/{document_id}")
-def delete_document(
+async def delete_document(
     document_id: int,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_db),
     current_user: dict = Depends(deps.get_current_user)
 ):
     """Eliminar un documento"""
-    document = db.query(Document).filter(Document.id == document_id).first()
+    document = await db.get(Document, document_id)
     if not document:
         raise HTTPException(status_code=404, detail="Documento no encontrado")
-    
-    # Eliminar archivo físico
-    try:
-        file_path = Path(document.file_url)
-        if file_path.exists():
-            file_path.unlink()
-    except Exception as e:
-        print(f"Error al eliminar archivo: {e}")
-    
-    db.delete(document)
-    db.commit()
+
+    await db.delete(document)
+    await db.flush()
+    if document.blob_id:
+        # El archivo es compartido: el worker lo borra cuando ningún documento lo referencia
+        await db.run_sync(storage.release_blob, document.blob_id)
+    await db.commit()
+
+    if not document.blob_id:
+        # Documento anterior al almacén de blobs: su archivo es solo suyo
+        try:
+            await run_in_threadpool(storage.remove_blob_files, Path(document.file_url))
+        except Exception as e:
+            print(f"Error al eliminar archivo: {e}")
     
     return {"message": "Documento eliminado correctamente"}
@@ -1,100 +1,261 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
 
-from app.db.session import get_db
+from app.db.session import get_async_db
 from app.api.deps import get_current_user
+from app.api.pagination import MAX_PAGE_SIZE, paginate, set_total_count
+from app.api.projection import SEPARATOR, columns, json_list, nest
+from app.api.sync import changes, set_sync_cursor
+from app.api.versioning import expected_version, precondition_failed, set_etag
 from app.models.enrollment import Enrollment
-from app.models.academic import Section, AcademicYear
+from app.models.academic import Grade, Section, SectionSeat, AcademicYear
 from app.models.student import Student
-from app.schemas.enrollment import EnrollmentCreate, Enrollment as EnrollmentSchema
+from app.schemas.enrollment import (
+    EnrollmentCreate, Enrollment as EnrollmentSchema,
+    EnrollmentBatchCreate, EnrollmentBatchReport,
+    StudentBasic, GradeBasic, SectionBasic
+)
+from app.services import bulk_enrollment, events, exporter, seats
 
 router = APIRouter(dependencies=[Depends(get_current_user)])
 
-@router.post("/", response_model=EnrollmentSchema)
-def create_enrollment(enrollment: EnrollmentCreate, db: Session = Depends(get_db)):
-    # 1. Validar que el estudiante exista
-    student = db.query(Student).filter(Student.id == enrollment.student_id).first()
-    if not student:
-        raise HTTPException(status_code=404, detail="Estudiante no encontrado")
-
-    # 2. Validar que el año académico exista y esté activo (opcional, por ahora solo existencia)
-    year = db.query(AcademicYear).filter(AcademicYear.id == enrollment.academic_year_id).first()
-    if not year:
-        raise HTTPException(status_code=404, detail="Año académico no encontrado")
-
-    # 3. Validar Sección y Vacantes
-    section = db.query(Section).filter(Section.id == enrollment.section_id).first()
-    if not section:
-        raise HTTPException(status_code=404, detail="Sección no encontrada")
-    
-    # Contar matriculados actuales en esa sección
-    current_enrollments = db.query(Enrollment).filter(
-        Enrollment.section_id == enrollment.section_id,
-        Enrollment.academic_year_id == enrollment.academic_year_id,
-        Enrollment.status != "Rechazado" # Contamos pendientes y aprobados
-    ).count()
-
-    if current_enrollments >= section.capacity:
-        raise HTTPException(status_code=400, detail="No hay vacantes disponibles en esta sección")
+_UNIQUE_STUDENT_YEAR = "uq_enrollments_student_year"
 
-    # 4. Verificar si ya está matriculado en ese año
-    existing_enrollment = db.query(Enrollment).filter(
-        Enrollment.student_id == enrollment.student_id,
-        Enrollment.academic_year_id == enrollment.academic_year_id
-    ).first()
-    
-    if existing_enrollment:
-        raise HTTPException(status_code=400, detail="El estudiante ya está matriculado en este año académico")
-
-    # 5. Crear Matrícula
-    new_enrollment = Enrollment(
-        student_id=enrollment.student_id,
-        academic_year_id=enrollment.academic_year_id,
-        grade_id=enrollment.grade_id,
-        section_id=enrollment.section_id,
-        status="Matriculado"  # Estado por defecto al crear matrícula
+def _is_duplicate_enrollment(error: IntegrityError) -> bool:
+    # PostgreSQL nombra la restricción; SQLite solo lista las columnas
+    message = str(error.orig)
+    return _UNIQUE_STUDENT_YEAR in message or "enrollments.student_id, enrollments.academic_year_id" in message
+
+# Listado: solo las columnas de EnrollmentSchema y de los esquemas anidados
+_LIST_QUERY = (
+    select(
+        *columns(Enrollment, EnrollmentSchema),
+        *columns(Student, StudentBasic, prefix="student"),
+        *columns(Grade, GradeBasic, prefix="grade"),
+        *columns(Section, SectionBasic, prefix="section"),
+    )
+    .outerjoin(Enrollment.student)
+    .outerjoin(Enrollment.grade)
+    .outerjoin(Enrollment.section)
+)
+
+def _already_enrolled(enrollment: EnrollmentCreate):
+    return select(Enrollment.id).where(
+        Enrollment.student_id == enrollment.student_id, Enrollment.academic_year_id == enrollment.academic_year_id
+    ).exists()
+
+async def _rejection(db: AsyncSession, enrollment: EnrollmentCreate) -> Optional[HTTPException]:
+    """Motivo por el que el UPDATE condicional no reservó la vacante (solo en el camino de rechazo).
+
+    None si todo es válido pero falta el contador de la sección en el año.
+    """
+    found = (await db.execute(select(
+        select(Student.id).where(Student.id == enrollment.student_id).scalar_subquery(),
+        select(AcademicYear.id).where(AcademicYear.id == enrollment.academic_year_id).scalar_subquery(),
+        select(Grade.id).where(Grade.id == enrollment.grade_id).scalar_subquery(),
+        select(Section.id).where(Section.id == enrollment.section_id).scalar_subquery(),
+        _already_enrolled(enrollment),
+        select(SectionSeat.section_id).where(
+            SectionSeat.section_id == enrollment.section_id, SectionSeat.academic_year_id == enrollment.academic_year_id
+        ).exists(),
+    ))).one()
+    if found[0] is None:
+        return HTTPException(status_code=404, detail="Estudiante no encontrado")
+    if found[1] is None:
+        return HTTPException(status_code=404, detail="Año académico no encontrado")
+    if found[2] is None:
+        return HTTPException(status_code=404, detail="Grado no encontrado")
+    if found[3] is None:
+        return HTTPException(status_code=404, detail="Sección no encontrada")
+    # El duplicado se informa antes que la falta de vacantes
+    if found[4]:
+        return HTTPException(status_code=400, detail="El estudiante ya está matriculado en este año académico")
+    if found[5]:
+        return HTTPException(status_code=400, detail="No hay vacantes disponibles en esta sección")
+    return None
+
+def _lookup(model, schema, id: int, prefix: str) -> list:
+    # Objeto anidado de la respuesta como subconsultas escalares dentro del RETURNING
+    return [
+        select(column).where(model.id == id).scalar_subquery().label(f"{prefix}{SEPARATOR}{column.key}")
+        for column in columns(model, schema)
+    ]
+
+@router.post("/", response_model=EnrollmentSchema)
+async def create_enrollment(enrollment: EnrollmentCreate, db: AsyncSession = Depends(get_async_db)):
+    # 1. Reservar la vacante con un UPDATE condicional que además valida: estudiante y
+    #    grado existentes y sin matrícula en el año (el contador existe solo si existen
+    #    la sección y el año). Un solo viaje a la base en el camino feliz.
+    valid = (
+        select(Student.id).where(Student.id == enrollment.student_id).exists(),
+        select(Grade.id).where(Grade.id == enrollment.grade_id).exists(),
+        ~_already_enrolled(enrollment),
     )
-    db.add(new_enrollment)
-    db.commit()
-    db.refresh(new_enrollment)
-    return new_enrollment
+    reserved = await db.run_sync(seats.take_seat, enrollment.section_id, enrollment.academic_year_id, *valid)
+    if not reserved:
+        rejection = await _rejection(db, enrollment)
+        if rejection is not None:
+            await db.rollback()
+            raise rejection
+        # Primera matrícula de la sección en el año: crear el contador y reintentar
+        await db.run_sync(seats.ensure_seat_row, enrollment.section_id, enrollment.academic_year_id)
+        if not await db.run_sync(seats.take_seat, enrollment.section_id, enrollment.academic_year_id, *valid):
+            await db.rollback()
+            raise HTTPException(status_code=400, detail="No hay vacantes disponibles en esta sección")
+
+    # 2. Crear la matrícula; la respuesta (con estudiante, grado y sección) sale del RETURNING.
+    #    La restricción única (estudiante, año) sigue cubriendo dos altas simultáneas.
+    try:
+        row = (await db.execute(
+            insert(Enrollment)
+            .values(
+                student_id=enrollment.student_id,
+                academic_year_id=enrollment.academic_year_id,
+                grade_id=enrollment.grade_id,
+                section_id=enrollment.section_id,
+                status="Matriculado",  # Estado por defecto al crear matrícula
+            )
+            .returning(
+                *columns(Enrollment, EnrollmentSchema),
+                *_lookup(Student, StudentBasic, enrollment.student_id, "student"),
+                *_lookup(Grade, GradeBasic, enrollment.grade_id, "grade"),
+                *_lookup(Section, SectionBasic, enrollment.section_id, "section"),
+            )
+        )).one()
+        await events.publish(
+            db, "enrollment", row.id, status=row.status, version=row.version,
+            student_id=enrollment.student_id, section_id=enrollment.section_id,
+        )
+        await events.publish(db, "occupancy", enrollment.academic_year_id)
+        await db.commit()
+    except IntegrityError as e:
+        # El rollback también devuelve la vacante reservada
+        await db.rollback()
+        if _is_duplicate_enrollment(e):
+            raise HTTPException(status_code=400, detail="El estudiante ya está matriculado en este año académico")
+        # Un registro referenciado se eliminó en paralelo
+        raise HTTPException(status_code=409, detail="Conflicto con datos modificados en paralelo. Reintente la operación.")
+    seats.invalidate_occupancy(enrollment.academic_year_id)
+    return nest(row)
+
+@router.post("/batch", response_model=EnrollmentBatchReport)
+async def create_enrollments_batch(batch: EnrollmentBatchCreate, db: AsyncSession = Depends(get_async_db)):
+    """Matricular varios estudiantes en una sola transacción.
+
+    Acepta una lista de `items` (estudiante, sección) o una regla `promote`
+    que pasa a los matriculados de un grado/año al grado destino, repartiendo
+    vacantes entre sus secciones. Devuelve el resultado por estudiante.
+    """
+    try:
+        return await db.run_sync(bulk_enrollment.enroll_batch, batch)
+    except IntegrityError:
+        # Otra matrícula del mismo estudiante entró en paralelo: no se aplicó nada
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Conflicto con matrículas simultáneas. Reintente la operación.")
 
 @router.get("/", response_model=List[EnrollmentSchema])
-def read_enrollments(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    from sqlalchemy.orm import joinedload
-    enrollments = db.query(Enrollment)\
-        .options(
-            joinedload(Enrollment.student),
-            joinedload(Enrollment.grade),
-            joinedload(Enrollment.section)
-        )\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
-    return enrollments
+async def read_enrollments(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    with_total: bool = False,
+    updated_since: Optional[str] = Query(None, description="Solo cambios desde este cursor (X-Sync-Cursor o el de la sincronización anterior)"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if updated_since:
+        # Grados y secciones son datos de referencia (ver app.api.reference); el estudiante sí se sigue
+        return await changes(db, _LIST_QUERY, Enrollment, EnrollmentSchema, updated_since, limit, nested=[Student])
+    set_sync_cursor(response)
+    rows = await paginate(db, _LIST_QUERY, Enrollment.id, response, skip, limit, cursor)
+    if with_total:
+        await set_total_count(db, select(Enrollment.id), response, Enrollment.__tablename__)
+    return json_list(EnrollmentSchema, [nest(row) for row in rows], response)
+
+@router.get("/export")
+async def export_enrollments(
+    format: Literal["csv", "ndjson", "xlsx"] = "csv",
+    academic_year_id: Optional[int] = None,
+    grade_id: Optional[int] = None,
+    section_id: Optional[int] = None,
+    status: Optional[str] = None,
+):
+    """Nómina completa de matrículas con estudiante, apoderado, grado y sección.
+
+    Se genera en streaming (cursor del lado del servidor), sin paginar y
+    con memoria constante; pensado para la carga anual a SIAGIE.
+    """
+    query = exporter.export_query(academic_year_id, grade_id, section_id, status)
+    return StreamingResponse(
+        exporter.stream(query, format),
+        media_type=exporter.MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="matriculas.{format}"',
+            # Que nginx no acumule la respuesta antes de enviarla
+            "X-Accel-Buffering": "no",
+        },
+    )
 
 @router.patch("/{enrollment_id}/status")
-def update_enrollment_status(enrollment_id: int, status: str, db: Session = Depends(get_db)):
+async def update_enrollment_status(
+    enrollment_id: int,
+    status: str,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
     valid_statuses = ["Matriculado", "Pendiente", "Retirado", "Rechazado"]
     if status not in valid_statuses:
         raise HTTPException(status_code=400, detail=f"Estado inválido. Debe ser uno de: {', '.join(valid_statuses)}")
     
-    enrollment = db.query(Enrollment).filter(Enrollment.id == enrollment_id).first()
+    # Bloquear la fila para que dos cambios de estado simultáneos no descuadren el contador
+    enrollment = await db.scalar(select(Enrollment).where(Enrollment.id == enrollment_id).with_for_update())
     if not enrollment:
         raise HTTPException(status_code=404, detail="Matrícula no encontrada")
+    # El estado anterior decide el ajuste de vacantes, así que aquí la fila se
+    # lee bloqueada (no basta un UPDATE condicional) y la versión se compara antes
+    version = expected_version(if_match)
+    if version is not None and version != enrollment.version:
+        await db.rollback()
+        raise precondition_failed()
+
+    # Mantener los contadores de vacantes y pendientes de la sección
+    if not await db.run_sync(
+        seats.change_status, enrollment.section_id, enrollment.academic_year_id, enrollment.status, status
+    ):
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="No hay vacantes disponibles en esta sección")
     
     enrollment.status = status
-    db.commit()
-    db.refresh(enrollment)
+    enrollment.version += 1
+    await events.publish(
+        db, "enrollment", enrollment.id, status=status, version=enrollment.version,
+        student_id=enrollment.student_id, section_id=enrollment.section_id,
+    )
+    await events.publish(db, "occupancy", enrollment.academic_year_id)
+    await db.commit()
+    seats.invalidate_occupancy(enrollment.academic_year_id)
+    set_etag(response, enrollment.version)
     return {"message": f"Estado actualizado a {status}", "enrollment": enrollment}
 
 @router.delete("/{enrollment_id}")
-def delete_enrollment(enrollment_id: int, db: Session = Depends(get_db)):
-    enrollment = db.query(Enrollment).filter(Enrollment.id == enrollment_id).first()
+async def delete_enrollment(enrollment_id: int, db: AsyncSession = Depends(get_async_db)):
+    # Bloquear la fila: un cambio de estado o un segundo borrado simultáneo esperan
+    # y luego ven el estado final (o la fila ya borrada), sin liberar la vacante dos veces
+    enrollment = await db.scalar(select(Enrollment).where(Enrollment.id == enrollment_id).with_for_update())
     if not enrollment:
         raise HTTPException(status_code=404, detail="Matrícula no encontrada")
+
+    year_id = enrollment.academic_year_id
+    await db.run_sync(seats.change_status, enrollment.section_id, year_id, enrollment.status, None)
     
-    db.delete(enrollment)
-    db.commit()
+    await db.delete(enrollment)
+    await events.publish(db, "enrollment", enrollment_id, deleted=True)
+    await events.publish(db, "occupancy", year_id)
+    await db.commit()
+    seats.invalidate_occupancy(year_id)
     return {"message": "Matrícula eliminada exitosamente"}
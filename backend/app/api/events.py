@@ -0,0 +1,75 @@
+import json
+import time
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_current_user, get_stream_user
+from app.core.config import settings
+from app.core.security import create_stream_token
+from app.db.session import get_async_db
+from app.schemas.token import StreamToken
+from app.services.events import broker
+
+router = APIRouter()
+
+
+async def _stream():
+    # Se suscribe al empezar el stream: si el cliente se va antes, no queda un buzón huérfano
+    subscriber = broker.subscribe()
+    deadline = time.monotonic() + settings.EVENTS_STREAM_MAX_SECONDS
+    try:
+        yield "retry: 1000\n\n"
+        while (remaining := deadline - time.monotonic()) > 0:
+            # Mientras el navegador no lee, este yield no vuelve y los eventos se agrupan en el buzón
+            batch = await subscriber.next_batch(min(settings.EVENTS_HEARTBEAT_SECONDS, remaining))
+            if batch is None:
+                break
+            if not batch:
+                yield ": ping\n\n"
+                continue
+            yield "".join(
+                f"event: {data['type']}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n" for data in batch
+            )
+    finally:
+        broker.unsubscribe(subscriber)
+
+
+@router.post("/token", response_model=StreamToken)
+async def create_events_token(current_user=Depends(get_current_user)):
+    """Token para abrir el stream con EventSource: `GET /events?token=...`.
+
+    Solo sirve para el stream y vence a los EVENTS_TOKEN_TTL_SECONDS; al
+    vencer, la reconexión responde 403 y el cliente pide otro.
+    """
+    return StreamToken(token=create_stream_token(current_user.id), expires_in=settings.EVENTS_TOKEN_TTL_SECONDS)
+
+
+@router.get("")
+async def stream_events(db: AsyncSession = Depends(get_async_db), current_user=Depends(get_stream_user)):
+    """Cambios de matrículas, ocupación y documentos en tiempo real (Server-Sent Events).
+
+    Eventos: `enrollment` {id, status, version, ...}, `occupancy` {id: año
+    académico}, `document` {id, enrollment_id, status, version} y `resync`
+    cuando el cliente debe recargar sus listados con ?updated_since=. Los
+    eventos se agrupan por registro: llega el último estado, no cada cambio.
+
+    Como EventSource no envía cabeceras, acepta en `?token=` un token de
+    POST /events/token (nunca el de sesión). La conexión se cierra cada
+    EVENTS_STREAM_MAX_SECONDS y el navegador reconecta solo; al (re)conectar
+    conviene sincronizar.
+    """
+    # La sesión solo sirvió para autenticar: no debe retener una conexión del pool durante el stream
+    await db.close()
+    if broker.clients >= settings.EVENTS_MAX_CLIENTS:
+        raise HTTPException(status_code=503, detail="Demasiadas conexiones de eventos. Reintente más tarde.")
+    return StreamingResponse(
+        _stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # nginx no debe acumular el stream en su buffer
+            "X-Accel-Buffering": "no",
+        },
+    )
@@ -0,0 +1,123 @@
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+
+from app.core.config import settings
+from app.services.storage import CHUNK_SIZE, UPLOAD_ROOT
+
+# Los documentos no cambian (el contenido está direccionado por hash), pero
+# se pide revalidar para que el navegador use el ETag y reciba un 304.
+CACHE_CONTROL = "private, no-cache"
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # If-None-Match usa comparación débil: se ignora el prefijo W/
+    candidates = (tag.strip().removeprefix("W/") for tag in header.split(","))
+    return etag in candidates
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Devuelve (inicio, fin) inclusivos; None para ignorar el Range y enviar todo"""
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        # Rangos múltiples: el RFC permite responder con el archivo completo
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first == "":
+            suffix = int(last)
+            if suffix <= 0:
+                raise ValueError
+            return max(size - suffix, 0), size - 1
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=416,
+            detail="Rango no satisfacible",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
+
+
+def _iter_range(path: Path, start: int, length: int) -> Iterator[bytes]:
+    # Generador síncrono: Starlette lo recorre en el threadpool
+    with path.open("rb") as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def serve_file(
+    request: Request, path: Path, media_type: str, etag: Optional[str] = None, filename: Optional[str] = None
+) -> Response:
+    """Responde un archivo con soporte de ETag/Last-Modified (304) y Range (206).
+
+    Si DOCUMENTS_ACCEL_REDIRECT_PREFIX está configurado, se delega el envío a
+    nginx con X-Accel-Redirect (sendfile, Range incluido) y el worker de
+    Python no toca los bytes.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Archivo no encontrado")
+
+    if etag is None:
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+    }
+    if _not_modified(request, etag, stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    if filename:
+        headers["Content-Disposition"] = f'inline; filename="{filename}"'
+
+    if settings.DOCUMENTS_ACCEL_REDIRECT_PREFIX:
+        relative = path.resolve().relative_to(UPLOAD_ROOT.resolve()).as_posix()
+        headers["X-Accel-Redirect"] = settings.DOCUMENTS_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + relative
+        return Response(media_type=media_type, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() in (etag, headers["Last-Modified"])):
+        byte_range = _parse_range(range_header, stat.st_size)
+        if byte_range is not None:
+            start, end = byte_range
+            length = end - start + 1
+            headers["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+            headers["Content-Length"] = str(length)
+            return StreamingResponse(
+                _iter_range(path, start, length), status_code=206, media_type=media_type, headers=headers
+            )
+
+    return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat)
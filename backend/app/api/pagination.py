@@ -0,0 +1,85 @@
+import base64
+import binascii
+import json
+from typing import Hashable, Optional
+
+from fastapi import HTTPException, Response
+from sqlalchemy import Select, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+# Conteos totales cacheados por (tabla, filtros) para no ejecutar COUNT(*) en cada página
+count_cache = TTLCache(maxsize=256, ttl=settings.COUNT_CACHE_TTL_SECONDS)
+
+# Tope de `limit` en los listados (filas por página)
+MAX_PAGE_SIZE = 1000
+
+# Por debajo de este tamaño el COUNT(*) exacto es barato y preferible a la estimación
+EXACT_COUNT_THRESHOLD = 10_000
+
+
+def encode_cursor(last_id: int) -> str:
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(padded))["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor de paginación inválido")
+
+
+async def paginate(
+    db: AsyncSession, query: Select, id_column, response: Response, skip: int, limit: int, cursor: Optional[str]
+) -> list:
+    """Pagina por cursor (keyset sobre id) si se envía `cursor`; si no, por offset.
+
+    En ambos modos se devuelve el cursor de la siguiente página en la
+    cabecera X-Next-Cursor, así un cliente puede empezar por offset y seguir
+    por cursor sin que la base recorra y descarte las filas saltadas.
+
+    Devuelve filas (no objetos ORM): la consulta debe seleccionar columnas,
+    incluida una llamada "id" (ver app.api.projection).
+    """
+    query = query.order_by(id_column)
+    if cursor:
+        query = query.where(id_column > decode_cursor(cursor))
+    elif skip:
+        query = query.offset(skip)
+
+    rows = (await db.execute(query.limit(limit + 1))).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].id)
+    return rows
+
+
+async def _estimated_rows(db: AsyncSession, table_name: str) -> Optional[int]:
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    # reltuples es -1 si la tabla nunca fue analizada
+    estimate = (await db.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+        {"table": table_name},
+    )).scalar()
+    if estimate is None or estimate < EXACT_COUNT_THRESHOLD:
+        return None
+    return int(estimate)
+
+
+async def set_total_count(
+    db: AsyncSession, query: Select, response: Response, table_name: str, filters: Hashable = None
+) -> None:
+    """Agrega X-Total-Count usando la estimación del planner o un conteo cacheado"""
+    cache_key = (table_name, filters)
+    total = count_cache.get(cache_key)
+    if total is None:
+        total = None if filters else await _estimated_rows(db, table_name)
+        if total is None:
+            total = await db.scalar(select(func.count()).select_from(query.order_by(None).subquery()))
+        count_cache.set(cache_key, total)
+    response.headers["X-Total-Count"] = str(total)
@@ -0,0 +1,81 @@
+"""Consultas de solo columnas para los endpoints de listado.
+
+Los listados seleccionan exactamente las columnas que declara su esquema de
+respuesta (sin instanciar objetos ORM ni cargar relaciones completas) y
+devuelven la respuesta ya codificada por json_list():
+
+    query = select(
+        *columns(Enrollment, EnrollmentSchema),
+        *columns(Student, StudentBasic, prefix="student"),
+    ).outerjoin(Enrollment.student)
+    rows = (await db.execute(query)).all()
+    return json_list(EnrollmentSchema, [nest(row) for row in rows])
+"""
+from functools import lru_cache
+from typing import Iterable, List, Optional, Type
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy.engine import Row
+
+SEPARATOR = "__"
+
+
+def columns(model, schema: Type[BaseModel], prefix: Optional[str] = None, exclude: Iterable[str] = ()) -> List:
+    """Columnas de `model` que aparecen como campos en `schema`.
+
+    Los campos que no son columnas (relaciones anidadas) se omiten; con
+    `prefix` se etiquetan como "<prefix>__<campo>" para que nest() los anide.
+    """
+    table_columns = model.__table__.columns
+    selected = [
+        getattr(model, name) for name in schema.model_fields
+        if name in table_columns and name not in exclude
+    ]
+    if prefix:
+        selected = [column.label(f"{prefix}{SEPARATOR}{column.key}") for column in selected]
+    return selected
+
+
+def nest(row: Row) -> dict:
+    """Fila plana -> diccionario con los objetos anidados por prefijo.
+
+    Un objeto anidado cuyas columnas son todas NULL (LEFT JOIN sin
+    coincidencia) se devuelve como None.
+    """
+    result: dict = {}
+    nested: dict = {}
+    for key, value in row._mapping.items():
+        prefix, sep, field = key.partition(SEPARATOR)
+        if sep:
+            nested.setdefault(prefix, {})[field] = value
+        else:
+            result[key] = value
+    for prefix, values in nested.items():
+        result[prefix] = values if any(value is not None for value in values.values()) else None
+    return result
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[schema])
+
+
+def encode_list(schema: Type[BaseModel], items: list) -> bytes:
+    """Valida `items` contra List[schema] y devuelve el JSON ya codificado"""
+    adapter = _list_adapter(schema)
+    return adapter.dump_json(adapter.validate_python(items))
+
+
+def json_list(schema: Type[BaseModel], items: list, response: Optional[Response] = None) -> Response:
+    """Valida y codifica la lista directamente en pydantic-core (Rust).
+
+    Evita el camino por defecto de FastAPI (validar con response_model,
+    volcar a objetos Python y codificar con json). Las cabeceras fijadas en
+    `response` (X-Next-Cursor, X-Total-Count) se copian a la respuesta.
+    El response_model de la ruta se mantiene para la documentación OpenAPI.
+    """
+    json_response = Response(encode_list(schema, items), media_type="application/json")
+    if response is not None:
+        json_response.headers.raw.extend(response.headers.raw)
+    return json_response
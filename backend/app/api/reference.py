@@ -0,0 +1,106 @@
+"""Instantánea en memoria de los datos de referencia académicos.
+
+Años, grados y secciones cambian pocas veces al año pero la aplicación los
+pide en cada carga de página. La instantánea guarda cada listado ya
+codificado en JSON junto con su ETag, incluido el listado de secciones de
+cada grado, de modo que las lecturas no consultan la base.
+
+El ETag es un hash del contenido: es el mismo en todos los workers y no
+depende de cuándo se armó la instantánea, así que rearmarla seguido no
+invalida la caché del navegador. Las altas de este worker la invalidan al
+instante; REFERENCE_CACHE_TTL_SECONDS (pocos segundos, como la ocupación)
+acota el desfase con los demás workers.
+"""
+import hashlib
+from dataclasses import dataclass
+from typing import Dict
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.projection import columns, encode_list, nest
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.academic import AcademicYear, Grade, Section
+from app.schemas.academic import (
+    AcademicYear as AcademicYearSchema,
+    Grade as GradeSchema,
+    Section as SectionSchema,
+)
+
+reference_cache = TTLCache(maxsize=1, ttl=settings.REFERENCE_CACHE_TTL_SECONDS)
+_SNAPSHOT_KEY = "academic"
+# Se incrementa en cada invalidación: una instantánea armada antes no se guarda
+_generation = 0
+
+
+@dataclass(frozen=True)
+class Document:
+    body: bytes
+    etag: str
+
+
+def _document(body: bytes) -> Document:
+    return Document(body, f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"')
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    years: Document
+    grades: Document
+    sections: Document
+    sections_by_grade: Dict[int, Document]
+    no_sections: Document
+
+    def sections_of(self, grade_id: int) -> Document:
+        return self.sections_by_grade.get(grade_id, self.no_sections)
+
+
+async def _build(db: AsyncSession) -> Snapshot:
+    years = [
+        nest(row) for row in
+        (await db.execute(select(*columns(AcademicYear, AcademicYearSchema)).order_by(AcademicYear.id))).all()
+    ]
+    grades = [
+        {**nest(row), "sections": []}
+        for row in (await db.execute(select(*columns(Grade, GradeSchema)).order_by(Grade.id))).all()
+    ]
+    sections = [
+        nest(row) for row in
+        (await db.execute(select(*columns(Section, SectionSchema)).order_by(Section.id))).all()
+    ]
+
+    by_grade = {grade["id"]: grade["sections"] for grade in grades}
+    for section in sections:
+        # grade_id admite NULL: esas secciones solo aparecen en el listado completo
+        grade_sections = by_grade.get(section["grade_id"])
+        if grade_sections is not None:
+            grade_sections.append(section)
+
+    return Snapshot(
+        years=_document(encode_list(AcademicYearSchema, years)),
+        grades=_document(encode_list(GradeSchema, grades)),
+        sections=_document(encode_list(SectionSchema, sections)),
+        sections_by_grade={
+            grade_id: _document(encode_list(SectionSchema, grade_sections))
+            for grade_id, grade_sections in by_grade.items()
+        },
+        no_sections=_document(encode_list(SectionSchema, [])),
+    )
+
+
+async def snapshot(db: AsyncSession) -> Snapshot:
+    cached = reference_cache.get(_SNAPSHOT_KEY)
+    if cached is not None:
+        return cached
+    generation = _generation
+    built = await _build(db)
+    if generation == _generation:
+        reference_cache.set(_SNAPSHOT_KEY, built)
+    return built
+
+
+def invalidate() -> None:
+    global _generation
+    _generation += 1
+    reference_cache.clear()
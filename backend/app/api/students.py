@@ -1,18 +1,51 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Query, Response, UploadFile, status
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+from typing import List, Optional
 
-from app.db.session import get_db
+from app.db.session import get_async_db, get_db
 from app.api.deps import get_current_user
+from app.api.pagination import MAX_PAGE_SIZE, paginate, set_total_count
+from app.api.projection import columns, json_list, nest
+from app.api.sync import changes, set_sync_cursor
+from app.api.versioning import set_etag, update_versioned
+from app.models.enrollment import Enrollment
 from app.models.student import Student, Guardian
-from app.schemas.student import StudentCreate, Student as StudentSchema, GuardianCreate
+from app.schemas.student import (
+    StudentCreate, Student as StudentSchema, Guardian as GuardianSchema, GuardianCreate, ImportReport
+)
+from app.services import importer, search
+from zipfile import BadZipFile
 
 router = APIRouter(dependencies=[Depends(get_current_user)])
 
+# Listado y búsqueda: solo las columnas de StudentSchema y del apoderado anidado
+_STUDENT_ROWS = select(
+    *columns(Student, StudentSchema),
+    *columns(Guardian, GuardianSchema, prefix="guardian"),
+).outerjoin(Student.guardian)
+
+# Apoderado del estudiante en el RETURNING de su UPDATE (misma ida a la base)
+_RETURNING_GUARDIAN = [
+    select(column).where(Guardian.id == Student.guardian_id).correlate(Student)
+    .scalar_subquery().label(f"guardian__{column.key}")
+    for column in columns(Guardian, GuardianSchema)
+]
+
+async def _in_search_order(db: AsyncSession, query, model, ids: List[int]) -> List[dict]:
+    by_id = {row.id: nest(row) for row in await db.execute(query.where(model.id.in_(ids)))} if ids else {}
+    return [by_id[row_id] for row_id in ids if row_id in by_id]
+
+async def _get_student(db: AsyncSession, *criteria) -> Optional[Student]:
+    # El esquema de respuesta incluye al apoderado: se carga junto al estudiante
+    return await db.scalar(select(Student).options(joinedload(Student.guardian)).where(*criteria))
+
 @router.post("/", response_model=StudentSchema)
-def create_student(student: StudentCreate, db: Session = Depends(get_db)):
+async def create_student(student: StudentCreate, db: AsyncSession = Depends(get_async_db)):
     # 1. Buscar si el apoderado existe por DNI
-    db_guardian = db.query(Guardian).filter(Guardian.dni == student.guardian_dni).first()
+    db_guardian = await db.scalar(select(Guardian).where(Guardian.dni == student.guardian_dni))
     
     if not db_guardian:
         # En un flujo real, deberíamos pedir datos del apoderado si no existe.
@@ -20,7 +53,7 @@ def create_student(student: StudentCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Apoderado no encontrado. Registre al apoderado primero.")
 
     # 2. Verificar si estudiante ya existe
-    db_student = db.query(Student).filter(Student.dni == student.dni).first()
+    db_student = await db.scalar(select(Student.id).where(Student.dni == student.dni))
     if db_student:
         raise HTTPException(status_code=400, detail="Estudiante ya registrado")
 
@@ -31,112 +64,187 @@ def create_student(student: StudentCreate, db: Session = Depends(get_db)):
         last_name=student.last_name,
         birth_date=student.birth_date,
         address=student.address,
-        guardian_id=db_guardian.id
+        guardian=db_guardian
     )
     db.add(new_student)
-    db.commit()
-    db.refresh(new_student)
+    await db.commit()
+    search.invalidate(Student)
     return new_student
 
 @router.get("/", response_model=List[StudentSchema])
-def read_students(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    from sqlalchemy.orm import joinedload
-    students = db.query(Student).options(joinedload(Student.guardian)).offset(skip).limit(limit).all()
-    return students
+async def read_students(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    with_total: bool = False,
+    updated_since: Optional[str] = Query(None, description="Solo cambios desde este cursor (X-Sync-Cursor o el de la sincronización anterior)"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if updated_since:
+        # El listado anida al apoderado: sus cambios también reenvían al estudiante
+        return await changes(db, _STUDENT_ROWS, Student, StudentSchema, updated_since, limit, nested=[Guardian])
+    set_sync_cursor(response)
+    rows = await paginate(db, _STUDENT_ROWS, Student.id, response, skip, limit, cursor)
+    if with_total:
+        await set_total_count(db, select(Student.id), response, Student.__tablename__)
+    return json_list(StudentSchema, [nest(row) for row in rows], response)
+
+@router.post("/import", response_model=ImportReport)
+def import_students(file: UploadFile = File(...), db: Session = Depends(get_db)):
+    """Importación masiva de estudiantes y apoderados desde CSV o XLSX.
+
+    Columnas: dni, first_name, last_name, birth_date, address, guardian_dni y
+    opcionalmente guardian_first_name, guardian_last_name, guardian_phone,
+    guardian_email para registrar apoderados nuevos.
+    """
+    # Síncrono a propósito: leer y validar miles de filas es trabajo de CPU
+    # que bloquearía el event loop; FastAPI lo ejecuta en el threadpool.
+    try:
+        rows = importer.iter_rows(file.file, file.filename or "")
+        return importer.import_students(db, rows)
+    except (ValueError, BadZipFile) as e:
+        raise HTTPException(status_code=400, detail=f"Archivo inválido: {e}")
+    finally:
+        # También con errores: los lotes anteriores ya quedaron confirmados
+        search.invalidate(Student, Guardian)
+
+@router.get("/search", response_model=List[StudentSchema])
+async def search_students(
+    q: str = Query(..., min_length=2, description="Prefijo de DNI o parte de apellidos/nombres"),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Buscar estudiantes sin distinguir tildes ni mayúsculas, ordenados por relevancia"""
+    ids = await search.search_ids(db, Student, q, limit)
+    return json_list(StudentSchema, await _in_search_order(db, _STUDENT_ROWS, Student, ids))
 
 # --- Endpoints de apoderados (ANTES de las rutas con parámetros dinámicos) ---
 @router.get("/guardian", response_model=List[GuardianCreate])
-def read_guardians(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    guardians = db.query(Guardian).offset(skip).limit(limit).all()
-    return guardians
+async def read_guardians(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    with_total: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    # El id no está en la respuesta pero hace falta para el cursor
+    query = select(Guardian.id, *columns(Guardian, GuardianCreate))
+    rows = await paginate(db, query, Guardian.id, response, skip, limit, cursor)
+    if with_total:
+        await set_total_count(db, select(Guardian.id), response, Guardian.__tablename__)
+    return json_list(GuardianCreate, [nest(row) for row in rows], response)
+
+@router.get("/guardian/search", response_model=List[GuardianSchema])
+async def search_guardians(
+    q: str = Query(..., min_length=2, description="Prefijo de DNI o parte de apellidos/nombres"),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Buscar apoderados sin distinguir tildes ni mayúsculas, ordenados por relevancia"""
+    ids = await search.search_ids(db, Guardian, q, limit)
+    query = select(*columns(Guardian, GuardianSchema))
+    return json_list(GuardianSchema, await _in_search_order(db, query, Guardian, ids))
 
 @router.post("/guardian", response_model=GuardianCreate)
-def create_guardian(guardian: GuardianCreate, db: Session = Depends(get_db)):
-    db_guardian = db.query(Guardian).filter(Guardian.dni == guardian.dni).first()
+async def create_guardian(guardian: GuardianCreate, db: AsyncSession = Depends(get_async_db)):
+    db_guardian = await db.scalar(select(Guardian.id).where(Guardian.dni == guardian.dni))
     if db_guardian:
         raise HTTPException(status_code=400, detail="Apoderado ya registrado")
     
     new_guardian = Guardian(**guardian.model_dump())
     db.add(new_guardian)
-    db.commit()
-    db.refresh(new_guardian)
+    await db.commit()
+    search.invalidate(Guardian)
     return new_guardian
 
 @router.put("/guardian/{dni}", response_model=GuardianCreate)
-def update_guardian(dni: str, guardian: GuardianCreate, db: Session = Depends(get_db)):
-    db_guardian = db.query(Guardian).filter(Guardian.dni == dni).first()
-    if not db_guardian:
-        raise HTTPException(status_code=404, detail="Apoderado no encontrado")
-    
-    # Actualizar datos
-    db_guardian.dni = guardian.dni
-    db_guardian.first_name = guardian.first_name
-    db_guardian.last_name = guardian.last_name
-    db_guardian.phone = guardian.phone
-    db_guardian.email = guardian.email
-    
-    db.commit()
-    db.refresh(db_guardian)
-    return db_guardian
+async def update_guardian(
+    dni: str,
+    guardian: GuardianCreate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    try:
+        row = await update_versioned(
+            db, Guardian, Guardian.dni == dni, guardian.model_dump(), if_match,
+            columns(Guardian, GuardianSchema), "Apoderado no encontrado",
+        )
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Ya existe un apoderado con ese DNI")
+    search.invalidate(Guardian)
+    set_etag(response, row.version)
+    return nest(row)
 
 @router.delete("/guardian/{dni}")
-def delete_guardian(dni: str, db: Session = Depends(get_db)):
-    guardian = db.query(Guardian).filter(Guardian.dni == dni).first()
+async def delete_guardian(dni: str, db: AsyncSession = Depends(get_async_db)):
+    guardian = await db.scalar(select(Guardian).where(Guardian.dni == dni))
     if not guardian:
         raise HTTPException(status_code=404, detail="Apoderado no encontrado")
     
     # Verificar si tiene estudiantes asociados
-    students_count = db.query(Student).filter(Student.guardian_id == guardian.id).count()
+    students_count = await db.scalar(select(func.count(Student.id)).where(Student.guardian_id == guardian.id))
     if students_count > 0:
         raise HTTPException(status_code=400, detail=f"No se puede eliminar. Tiene {students_count} estudiante(s) asociado(s)")
     
-    db.delete(guardian)
-    db.commit()
+    await db.delete(guardian)
+    await db.commit()
+    search.invalidate(Guardian)
     return {"message": "Apoderado eliminado exitosamente"}
 
 # --- Rutas con parámetros dinámicos AL FINAL ---
 @router.get("/{dni}", response_model=StudentSchema)
-def read_student_by_dni(dni: str, db: Session = Depends(get_db)):
-    student = db.query(Student).filter(Student.dni == dni).first()
+async def read_student_by_dni(dni: str, response: Response, db: AsyncSession = Depends(get_async_db)):
+    student = await _get_student(db, Student.dni == dni)
     if student is None:
         raise HTTPException(status_code=404, detail="Estudiante no encontrado")
+    set_etag(response, student.version)
     return student
 
 @router.put("/{student_id}", response_model=StudentSchema)
-def update_student(student_id: int, student: StudentCreate, db: Session = Depends(get_db)):
-    db_student = db.query(Student).filter(Student.id == student_id).first()
-    if not db_student:
-        raise HTTPException(status_code=404, detail="Estudiante no encontrado")
-    
-    # Verificar que el apoderado existe
-    db_guardian = db.query(Guardian).filter(Guardian.dni == student.guardian_dni).first()
-    if not db_guardian:
+async def update_student(
+    student_id: int,
+    student: StudentCreate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    # El apoderado se resuelve por DNI dentro del mismo UPDATE
+    values = student.model_dump(exclude={"guardian_dni"})
+    values["guardian_id"] = select(Guardian.id).where(Guardian.dni == student.guardian_dni).scalar_subquery()
+    try:
+        row = await update_versioned(
+            db, Student, Student.id == student_id, values, if_match,
+            [*columns(Student, StudentSchema), *_RETURNING_GUARDIAN], "Estudiante no encontrado",
+        )
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Ya existe un estudiante con ese DNI")
+    if row.guardian_id is None:
+        await db.rollback()
         raise HTTPException(status_code=404, detail="Apoderado no encontrado")
-    
-    # Actualizar datos
-    db_student.dni = student.dni
-    db_student.first_name = student.first_name
-    db_student.last_name = student.last_name
-    db_student.birth_date = student.birth_date
-    db_student.address = student.address
-    db_student.guardian_id = db_guardian.id
-    
-    db.commit()
-    db.refresh(db_student)
-    return db_student
+
+    await db.commit()
+    search.invalidate(Student)
+    set_etag(response, row.version)
+    return nest(row)
 
 @router.delete("/{student_id}")
-def delete_student(student_id: int, db: Session = Depends(get_db)):
-    student = db.query(Student).filter(Student.id == student_id).first()
+async def delete_student(student_id: int, db: AsyncSession = Depends(get_async_db)):
+    student = await db.get(Student, student_id)
     if not student:
         raise HTTPException(status_code=404, detail="Estudiante no encontrado")
     
     # Verificar si tiene matrículas
-    from app.models.enrollment import Enrollment
-    enrollments_count = db.query(Enrollment).filter(Enrollment.student_id == student_id).count()
+    enrollments_count = await db.scalar(select(func.count(Enrollment.id)).where(Enrollment.student_id == student_id))
     if enrollments_count > 0:
         raise HTTPException(status_code=400, detail=f"No se puede eliminar. Tiene {enrollments_count} matrícula(s) registrada(s)")
     
-    db.delete(student)
-    db.commit()
+    await db.delete(student)
+    await db.commit()
+    search.invalidate(Student)
     return {"message": "Estudiante eliminado exitosamente"}
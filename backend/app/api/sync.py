@@ -0,0 +1,161 @@
+"""Sincronización incremental de los listados (?updated_since=<cursor>).
+
+Los listados normales devuelven en X-Sync-Cursor un cursor del momento de
+la consulta. Con `updated_since=<cursor>` el mismo endpoint devuelve solo
+lo que cambió desde entonces:
+
+    {"items": [...], "deleted": [ids], "cursor": "...", "has_more": false}
+
+El cliente aplica `items` por id, quita `deleted` y guarda `cursor` para
+la siguiente llamada; con has_more=true vuelve a pedir de inmediato.
+
+Los cambios se recorren por (updated_at, id). Un registro cuyo listado
+anida a otro (el apoderado de un estudiante) cambia cuando cambia
+cualquiera de los dos. Una transacción puede confirmarse después de que
+otra con un updated_at posterior ya fue leída; para no perderla, al
+ponerse al día el cursor retrocede SYNC_OVERLAP_SECONDS. Mientras hay más
+páginas (has_more) el cursor avanza pero recuerda dónde empezó el recorrido,
+y el retroceso final puede volver hasta ahí: una transacción que se confirma
+a mitad del recorrido con un updated_at de una página ya leída no se pierde.
+Los registros de esa ventana pueden llegar dos veces, lo que es inocuo al
+aplicarlos por id.
+
+Las lápidas se conservan SYNC_TOMBSTONE_RETENTION_DAYS: un cursor más
+antiguo responde 410 y el cliente debe recargar el listado completo.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Optional, Tuple, Type
+
+from fastapi import HTTPException, Response
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import and_, case, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+from app.api.projection import nest
+from app.core.config import settings
+from app.models.sync import Tombstone, tombstone_horizon, utcnow
+from app.schemas.sync import Changes
+
+Position = Tuple[datetime, int]
+_KEY = "sync_key"
+
+
+def _aware(value: datetime) -> datetime:
+    # SQLite devuelve los DateTime sin zona horaria; se guardan en UTC
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+def encode_sync_cursor(position: Position, start: Optional[Position] = None) -> str:
+    """`start`: posición donde empezó un recorrido por páginas que aún no terminó"""
+    updated_at, last_id = position
+    data = {"t": _aware(updated_at).isoformat(), "id": last_id}
+    if start is not None and start != position:
+        data["st"], data["sid"] = _aware(start[0]).isoformat(), start[1]
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_sync_cursor(cursor: str) -> Tuple[Position, Position]:
+    """(posición, inicio del recorrido); fuera de un recorrido ambas coinciden"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded))
+        position = _aware(datetime.fromisoformat(data["t"])), int(data["id"])
+        if "st" not in data:
+            return position, position
+        return position, (_aware(datetime.fromisoformat(data["st"])), int(data["sid"]))
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor de sincronización inválido")
+
+
+def _horizon() -> Position:
+    return utcnow() - timedelta(seconds=settings.SYNC_OVERLAP_SECONDS), 0
+
+
+def set_sync_cursor(response: Response) -> None:
+    """Cursor para empezar a sincronizar después de cargar el listado completo"""
+    response.headers["X-Sync-Cursor"] = encode_sync_cursor(_horizon())
+
+
+def _latest(*stamps):
+    """El mayor de varios updated_at; los NULL (LEFT JOIN sin fila) se ignoran"""
+    latest = stamps[0]
+    for stamp in stamps[1:]:
+        latest = case((func.coalesce(stamp, latest) > latest, stamp), else_=latest)
+    return latest
+
+
+@lru_cache(maxsize=None)
+def _changes_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(Changes[schema])
+
+
+async def changes(
+    db: AsyncSession,
+    query: Select,
+    model,
+    schema: Type[BaseModel],
+    updated_since: str,
+    limit: int,
+    nested=(),
+) -> Response:
+    """Registros de `query` modificados y ids de `model` eliminados desde el cursor.
+
+    `nested` son los modelos anidados en la respuesta (unidos en `query`)
+    cuyos cambios también deben reenviar el registro.
+    """
+    since, start = decode_sync_cursor(updated_since)
+    since_at, since_id = since
+    if since_at < tombstone_horizon(settings.SYNC_TOMBSTONE_RETENTION_DAYS):
+        # Pudieron borrarse lápidas posteriores al cursor: faltarían eliminaciones
+        raise HTTPException(status_code=410, detail="Cursor de sincronización vencido: recargue el listado completo")
+    stamps = [model.updated_at, *(other.updated_at for other in nested)]
+    key = _latest(*stamps)
+
+    rows = (await db.execute(
+        query.add_columns(key.label(_KEY))
+        # Filtro que pueden resolver los índices de updated_at ...
+        .where(or_(*(stamp >= since_at for stamp in stamps)))
+        # ... y posición exacta del cursor
+        .where(or_(key > since_at, and_(key == since_at, model.id > since_id)))
+        .order_by(key, model.id)
+        .limit(limit + 1)
+    )).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    last = (_aware(rows[-1]._mapping[_KEY]), rows[-1].id) if rows else since
+
+    # El cursor nunca queda en un instante con lápidas sin entregar: el límite inferior es estricto
+    deleted_query = select(Tombstone.row_id, Tombstone.deleted_at).where(
+        Tombstone.table_name == model.__tablename__, Tombstone.deleted_at > since_at
+    )
+    if has_more:
+        # Solo hasta donde llegan los registros de esta página; el resto, en la siguiente
+        deleted_query = deleted_query.where(Tombstone.deleted_at <= last[0])
+    deleted = (await db.execute(deleted_query.order_by(Tombstone.deleted_at, Tombstone.id))).all()
+
+    if has_more:
+        # Siguiente página: se avanza, recordando el inicio del recorrido para el retroceso final
+        cursor = last
+    else:
+        if deleted:
+            last = max(last, (_aware(deleted[-1].deleted_at), 0))
+        # Al día: retroceder la ventana de solapamiento, sin volver antes del inicio del recorrido
+        cursor, start = max(start, min(last, _horizon())), None
+
+    items = []
+    for row in rows:
+        item = nest(row)
+        del item[_KEY]
+        items.append(item)
+    adapter = _changes_adapter(schema)
+    body = adapter.validate_python({
+        "items": items, "deleted": [row.row_id for row in deleted], "cursor": encode_sync_cursor(cursor, start), "has_more": has_more,
+    })
+    return Response(adapter.dump_json(body), media_type="application/json")
@@ -0,0 +1,87 @@
+"""Concurrencia optimista con ETag / If-Match sobre la columna `version`.
+
+Las respuestas de un registro llevan `ETag: "<version>"`. Si el cliente
+envía ese valor en If-Match al editar, la edición es un solo
+UPDATE ... WHERE id = ? AND version = ? RETURNING ...; si otra persona lo
+modificó antes, no se actualiza ninguna fila y se responde 412 en lugar de
+sobrescribir sus cambios. Sin If-Match (o con "*") la edición no se
+condiciona, como antes.
+"""
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, Response
+from sqlalchemy import exists, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def set_etag(response: Response, version: int) -> None:
+    response.headers["ETag"] = etag(version)
+
+
+def etag_matches(if_none_match: Optional[str], current: str) -> bool:
+    """True si If-None-Match incluye el ETag actual (o es "*"): corresponde un 304"""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == "*" or tag == current:
+            return True
+    return False
+
+
+def expected_version(if_match: Optional[str]) -> Optional[int]:
+    if if_match is None or if_match.strip() == "*":
+        return None
+    value = if_match.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    try:
+        return int(value.strip('"'))
+    except ValueError:
+        # Un ETag que no es de versión nunca coincide con el registro actual
+        raise precondition_failed()
+
+
+def precondition_failed() -> HTTPException:
+    return HTTPException(
+        status_code=412,
+        detail="El registro fue modificado por otro usuario. Recargue los datos e intente nuevamente.",
+    )
+
+
+async def update_versioned(
+    db: AsyncSession,
+    model,
+    criteria,
+    values: Dict[str, Any],
+    if_match: Optional[str],
+    returning: list,
+    not_found: str,
+) -> Row:
+    """UPDATE condicionado a la versión que incrementa `version`; una sola ida a la base.
+
+    `returning` debe incluir model.version para poder enviar el nuevo ETag.
+    Si no se actualizó ninguna fila, una segunda consulta (solo en ese caso)
+    distingue entre registro inexistente (404) y versión vencida (412).
+    El llamador confirma la transacción.
+    """
+    version = expected_version(if_match)
+    statement = update(model).where(criteria).values(**values, version=model.version + 1)
+    if version is not None:
+        statement = statement.where(model.version == version)
+    row = (await db.execute(
+        statement.returning(*returning).execution_options(synchronize_session=False)
+    )).first()
+    if row is None:
+        await db.rollback()
+        if not await db.scalar(select(exists().where(criteria))):
+            raise HTTPException(status_code=404, detail=not_found)
+        raise precondition_failed()
+    return row
@@ -0,0 +1,89 @@
+"""Comandos de administración del backend.
+
+Uso (desde backend/):
+    python -m app.cli migrate                     # aplica las migraciones de Alembic
+    python -m app.cli seed                        # crea admin, años, grados y secciones
+    python -m app.cli import-students alumnos.xlsx
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+
+from app.db.init_db import init_db
+from app.db.session import SessionLocal, engine
+from app.services import importer
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+# Revisión que corresponde al esquema que antes creaba create_all al arrancar
+BASELINE_REVISION = "0001"
+
+
+def migrate(args: argparse.Namespace) -> int:
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "alembic"))
+    tables = set(inspect(engine).get_table_names())
+    if "alembic_version" not in tables and "users" in tables:
+        # Base creada con create_all antes de las migraciones: se marca como inicial
+        print(f"Base existente sin versión de Alembic: se marca en {BASELINE_REVISION}")
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, args.revision)
+    return 0
+
+
+def seed(args: argparse.Namespace) -> int:
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        init_db(db)
+    finally:
+        db.close()
+    print(f"Datos iniciales aplicados en {time.perf_counter() - started:.2f} s")
+    return 0
+
+
+def import_students(args: argparse.Namespace) -> int:
+    db = SessionLocal()
+    try:
+        with open(args.path, "rb") as stream:
+            report = importer.import_students(db, importer.iter_rows(stream, args.path), args.batch_size)
+    finally:
+        db.close()
+
+    for error in report.errors:
+        print(f"Fila {error.row} (DNI {error.dni or '-'}): {error.error}", file=sys.stderr)
+    rate = report.total_rows / report.elapsed_seconds if report.elapsed_seconds else 0
+    print(
+        f"✓ {report.inserted}/{report.total_rows} estudiantes importados, "
+        f"{report.guardians_created} apoderados creados, {len(report.errors)} errores "
+        f"({report.elapsed_seconds:.2f} s, {rate:.0f} filas/s)"
+    )
+    return 1 if report.errors else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Comandos de administración")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parser_migrate = commands.add_parser("migrate", help="Aplicar migraciones de la base de datos")
+    parser_migrate.add_argument("revision", nargs="?", default="head")
+    parser_migrate.set_defaults(handler=migrate)
+
+    parser_seed = commands.add_parser("seed", help="Crear datos iniciales (idempotente)")
+    parser_seed.set_defaults(handler=seed)
+
+    parser_import = commands.add_parser("import-students", help="Importar estudiantes y apoderados desde CSV/XLSX")
+    parser_import.add_argument("path")
+    parser_import.add_argument("--batch-size", type=int, default=importer.BATCH_SIZE)
+    parser_import.set_defaults(handler=import_students)
+
+    args = parser.parse_args()
+    sys.exit(args.handler(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import os
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -11,11 +12,120 @@ class Settings(BaseSettings):
     POSTGRES_SERVER: str = os.getenv("POSTGRES_SERVER", "db")
     POSTGRES_PORT: str = os.getenv("POSTGRES_PORT", "5432")
     POSTGRES_DB: str = os.getenv("POSTGRES_DB", "mrc_db")
+    # URL completa opcional (p. ej. sqlite:///./bench.db para benchmarks locales)
+    DATABASE_URL: Optional[str] = os.getenv("DATABASE_URL")
+
+    # Pool de conexiones (por proceso; con N workers el total es N * (size + overflow))
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+    # Reciclar conexiones antes de que las corte un proxy o pgbouncer (segundos; -1 = nunca)
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    # Conexiones a abrir al arrancar cada worker (0 = ninguna, se abren bajo demanda)
+    DB_POOL_WARMUP: int = int(os.getenv("DB_POOL_WARMUP", "0"))
+
+    # Servidor de producción (python -m app.server): gunicorn con workers de uvicorn
+    GUNICORN_BIND: str = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+    # 0 = un worker por núcleo (los workers son async, no hace falta 2n+1)
+    GUNICORN_WORKERS: int = int(os.getenv("GUNICORN_WORKERS", "0"))
+    # Reciclar cada worker tras N peticiones (con jitter para que no reinicien todos a la vez); 0 = nunca
+    GUNICORN_MAX_REQUESTS: int = int(os.getenv("GUNICORN_MAX_REQUESTS", "5000"))
+    GUNICORN_MAX_REQUESTS_JITTER: int = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "500"))
+    # Cargar la app en el master antes de hacer fork: arranque más rápido y memoria compartida
+    GUNICORN_PRELOAD: bool = os.getenv("GUNICORN_PRELOAD", "true").lower() in ("1", "true", "yes")
+    # Mayor que el keepalive_timeout del upstream de nginx (60 s) para que sea nginx quien cierre
+    GUNICORN_KEEPALIVE: int = int(os.getenv("GUNICORN_KEEPALIVE", "75"))
+    # Igual al proxy_read_timeout de nginx: más allá nginx ya respondió 504
+    GUNICORN_TIMEOUT: int = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+    GUNICORN_GRACEFUL_TIMEOUT: int = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+    # Proxies cuyo X-Forwarded-For se acepta como IP del cliente (separados por comas).
+    # Solo la IP de nginx: con "*" cualquier cliente falsea request.client.host
+    GUNICORN_FORWARDED_ALLOW_IPS: str = os.getenv("GUNICORN_FORWARDED_ALLOW_IPS", "127.0.0.1")
+    # Métricas de Prometheus compartidas entre workers; se vacía al arrancar el servidor
+    METRICS_MULTIPROC_DIR: str = os.getenv("PROMETHEUS_MULTIPROC_DIR", "/tmp/mrc-metrics")
+
+    # Inspector de consultas (desarrollo/CI): N+1 y consultas lentas en el log "app.queries"
+    QUERY_INSPECTOR: bool = os.getenv("QUERY_INSPECTOR", "false").lower() in ("1", "true", "yes")
+    QUERY_N_PLUS_ONE_THRESHOLD: int = int(os.getenv("QUERY_N_PLUS_ONE_THRESHOLD", "3"))
+    SLOW_QUERY_MS: int = int(os.getenv("SLOW_QUERY_MS", "200"))
+
+    # Login: costo de bcrypt (las contraseñas con otro costo se re-hashean al
+    # iniciar sesión) y pool de procesos dedicado a verificarlas
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    # Verificaciones en curso + en cola por worker; por encima se responde 503
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+    # Intentos fallidos tolerados por usuario y por IP dentro de la ventana (429 al superarlos)
+    LOGIN_MAX_FAILURES_PER_USER: int = int(os.getenv("LOGIN_MAX_FAILURES_PER_USER", "5"))
+    LOGIN_MAX_FAILURES_PER_IP: int = int(os.getenv("LOGIN_MAX_FAILURES_PER_IP", "20"))
+    LOGIN_FAILURE_WINDOW_SECONDS: int = int(os.getenv("LOGIN_FAILURE_WINDOW_SECONDS", "300"))
+
+    # Caché del usuario autenticado (get_current_user)
+    PRINCIPAL_CACHE_TTL_SECONDS: int = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+    PRINCIPAL_CACHE_MAX_SIZE: int = int(os.getenv("PRINCIPAL_CACHE_MAX_SIZE", "1024"))
+
+    # Paginación: duración del conteo total cacheado (X-Total-Count)
+    COUNT_CACHE_TTL_SECONDS: int = int(os.getenv("COUNT_CACHE_TTL_SECONDS", "30"))
+    # Ocupación de secciones: tope de desfase entre workers (en el mismo worker se invalida al instante)
+    OCCUPANCY_CACHE_TTL_SECONDS: int = int(os.getenv("OCCUPANCY_CACHE_TTL_SECONDS", "5"))
+    # Años, grados y secciones: tope de desfase entre workers de la instantánea en memoria
+    REFERENCE_CACHE_TTL_SECONDS: int = int(os.getenv("REFERENCE_CACHE_TTL_SECONDS", "5"))
+    # max-age que se envía al navegador (0 = siempre revalida con If-None-Match)
+    REFERENCE_CACHE_MAX_AGE_SECONDS: int = int(os.getenv("REFERENCE_CACHE_MAX_AGE_SECONDS", "0"))
+
+    # Sincronización incremental (?updated_since=): ventana que se vuelve a enviar al ponerse
+    # al día, para no perder transacciones que se confirman con un updated_at anterior
+    SYNC_OVERLAP_SECONDS: int = int(os.getenv("SYNC_OVERLAP_SECONDS", "5"))
+    # Días que se conservan las lápidas de registros eliminados (las borra el worker);
+    # un cursor más antiguo obliga a recargar el listado completo (410)
+    SYNC_TOMBSTONE_RETENTION_DAYS: int = int(os.getenv("SYNC_TOMBSTONE_RETENTION_DAYS", "30"))
+
+    # Eventos en tiempo real (/api/v1/events): clientes por worker y eventos pendientes
+    # por cliente (agrupados por registro) antes de pedirle que recargue todo
+    EVENTS_MAX_CLIENTS: int = int(os.getenv("EVENTS_MAX_CLIENTS", "500"))
+    EVENTS_CLIENT_MAX_PENDING: int = int(os.getenv("EVENTS_CLIENT_MAX_PENDING", "100"))
+    # Latido: por debajo del proxy_read_timeout de nginx (60 s)
+    EVENTS_HEARTBEAT_SECONDS: int = int(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+    # Duración de cada conexión (el navegador reconecta solo); menor que GUNICORN_GRACEFUL_TIMEOUT
+    # para que reiniciar un worker no tenga que esperar a que los clientes se desconecten
+    EVENTS_STREAM_MAX_SECONDS: int = int(os.getenv("EVENTS_STREAM_MAX_SECONDS", "25"))
+    # Vigencia del token de stream (?token=): EventSource lo reutiliza en cada reconexión hasta que vence
+    EVENTS_TOKEN_TTL_SECONDS: int = int(os.getenv("EVENTS_TOKEN_TTL_SECONDS", "120"))
+
+    # Descarga de documentos: si se define (p. ej. /protected-uploads/), nginx
+    # envía el archivo vía X-Accel-Redirect en lugar del worker de Python
+    DOCUMENTS_ACCEL_REDIRECT_PREFIX: Optional[str] = os.getenv("DOCUMENTS_ACCEL_REDIRECT_PREFIX")
+
+    # Worker de post-procesamiento de documentos (app.worker); 0 = un proceso por núcleo
+    DOCUMENT_WORKER_PROCESSES: int = int(os.getenv("DOCUMENT_WORKER_PROCESSES", "0"))
+    DOCUMENT_WORKER_POLL_SECONDS: float = float(os.getenv("DOCUMENT_WORKER_POLL_SECONDS", "1.0"))
+    DOCUMENT_JOB_MAX_ATTEMPTS: int = int(os.getenv("DOCUMENT_JOB_MAX_ATTEMPTS", "3"))
+    DOCUMENT_JOB_TIMEOUT_SECONDS: int = int(os.getenv("DOCUMENT_JOB_TIMEOUT_SECONDS", "300"))
+    # Blobs sin documentos: el worker borra el archivo pasado este período de gracia
+    # (una re-subida del mismo contenido dentro del período lo recupera)
+    BLOB_GC_GRACE_SECONDS: int = int(os.getenv("BLOB_GC_GRACE_SECONDS", "3600"))
+    BLOB_GC_INTERVAL_SECONDS: int = int(os.getenv("BLOB_GC_INTERVAL_SECONDS", "300"))
     
     @property
     def SQLALCHEMY_DATABASE_URI(self) -> str:
+        if self.DATABASE_URL:
+            return self.DATABASE_URL
         return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
 
+    @property
+    def ASYNC_SQLALCHEMY_DATABASE_URI(self) -> str:
+        """La misma base con driver asíncrono (asyncpg, o aiosqlite en local)"""
+        uri = self.SQLALCHEMY_DATABASE_URI
+        for sync_prefix, async_prefix in (
+            ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+            ("postgresql://", "postgresql+asyncpg://"),
+            ("sqlite://", "sqlite+aiosqlite://"),
+        ):
+            if uri.startswith(sync_prefix):
+                return async_prefix + uri[len(sync_prefix):]
+        return uri
+
     class Config:
         case_sensitive = True
 
@@ -0,0 +1,98 @@
+"""Verificación de contraseñas (bcrypt) en un pool de procesos acotado.
+
+bcrypt cuesta ~250 ms de CPU por intento: en el threadpool retiene el GIL
+de a ratos y ocupa un hilo por login. Aquí se ejecuta en un
+ProcessPoolExecutor propio de PASSWORD_HASH_WORKERS procesos por worker de
+la API, con un tope de verificaciones pendientes (PASSWORD_HASH_MAX_PENDING):
+si se supera, verify_and_update() lanza HasherBusy y el login responde 503
+en vez de encolar sin límite.
+
+Si un proceso hijo muere (OOM, kill) el pool queda roto: se descarta, se
+crea otro y la verificación se reintenta una vez.
+
+El pool se crea en el primer login (ya dentro del worker de gunicorn, no en
+el master) con procesos "spawn", que no heredan hilos ni conexiones.
+"""
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+
+from app.core.config import settings
+
+_executor: Optional[ProcessPoolExecutor] = None
+_pending = 0
+
+
+class HasherBusy(Exception):
+    """Demasiadas verificaciones pendientes en este worker, o el pool no responde"""
+
+
+def _rounds(hashed_password: str) -> Optional[int]:
+    # $2b$12$<salt+hash>
+    try:
+        return int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def _verify_and_update(plain_password: str, hashed_password: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    """Se ejecuta en el proceso hijo. Devuelve (válida, nuevo hash si cambió el costo)"""
+    from passlib.context import CryptContext
+
+    context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+    if not context.verify(plain_password, hashed_password):
+        return False, None
+    if _rounds(hashed_password) != rounds:
+        return True, context.hash(plain_password)
+    return True, None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def _discard_executor(executor: ProcessPoolExecutor) -> None:
+    global _executor
+    # Otra verificación pudo haberlo reemplazado ya
+    if _executor is executor:
+        _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    global _pending
+    if _pending >= settings.PASSWORD_HASH_MAX_PENDING:
+        raise HasherBusy()
+    _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            executor = _get_executor()
+            try:
+                return await loop.run_in_executor(
+                    executor, _verify_and_update, plain_password, hashed_password, settings.BCRYPT_ROUNDS
+                )
+            except BrokenProcessPool:
+                _discard_executor(executor)
+        raise HasherBusy()
+    finally:
+        _pending -= 1
+
+
+def pending() -> int:
+    return _pending
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
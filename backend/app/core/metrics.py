@@ -0,0 +1,170 @@
+"""Métricas de rendimiento por petición en formato de texto de Prometheus.
+
+- MetricsMiddleware (ASGI) mide latencia, tamaño de respuesta y peticiones
+  en curso por ruta (plantilla de FastAPI, p. ej. /api/v1/students/{dni}),
+  y agrega la cabecera Server-Timing.
+- Los eventos de SQLAlchemy cuentan consultas y tiempo de BD de la petición
+  en curso (contextvar), sea por la sesión async o por run_sync/threadpool.
+
+Con gunicorn (app.server) prometheus_client trabaja en modo multiproceso:
+cada worker escribe sus valores en PROMETHEUS_MULTIPROC_DIR y /metrics
+suma los de todos, atienda el worker que atienda el scrape.
+"""
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Cada cuánto (como mucho) un worker copia las estadísticas de sus cachés a los gauges
+CACHE_STATS_REFRESH_SECONDS = 1.0
+
+REQUESTS = Counter("http_requests_total", "Peticiones HTTP atendidas", ("method", "route", "status"))
+LATENCY = Histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP", ("method", "route"), buckets=LATENCY_BUCKETS
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "Tamaño del cuerpo de las respuestas", ("method", "route"), buckets=SIZE_BUCKETS
+)
+# livesum: suma de los workers vivos (sin etiqueta pid)
+IN_FLIGHT = Gauge("http_requests_in_flight", "Peticiones HTTP en curso", multiprocess_mode="livesum")
+DB_QUERIES = Histogram(
+    "db_queries_per_request", "Consultas SQL por petición", ("method", "route"), buckets=QUERY_COUNT_BUCKETS
+)
+DB_TIME = Histogram(
+    "db_time_per_request_seconds", "Tiempo en la base de datos por petición", ("method", "route"),
+    buckets=LATENCY_BUCKETS,
+)
+EVENT_CLIENTS = Gauge(
+    "app_event_clients", "Clientes conectados al canal de eventos", multiprocess_mode="livesum"
+)
+EVENT_RESYNCS = Counter(
+    "app_event_resyncs_total", "Clientes de eventos que debieron recargar (buzón lleno o LISTEN reconectado)"
+)
+CACHE_STATS = {
+    stat: Gauge(f"app_cache_{stat}", help_text, ("cache",), multiprocess_mode="livesum")
+    for stat, help_text in (
+        ("hits", "Aciertos de la caché"), ("misses", "Fallos de la caché"), ("size", "Entradas en la caché"),
+    )
+}
+
+# Cachés en memoria de la aplicación (TTLCache) que se reportan en app_cache_*
+_caches: Dict[str, object] = {}
+_cache_stats_at = 0.0
+
+
+def register_caches(caches: Dict[str, object]) -> None:
+    _caches.update(caches)
+
+
+def refresh_cache_stats(force: bool = False) -> None:
+    """Copia las estadísticas de las cachés de este worker a los gauges.
+
+    Las cachés son por proceso: cada worker publica las suyas y el scrape
+    las suma. Se hace al terminar las peticiones, no más de una vez por
+    CACHE_STATS_REFRESH_SECONDS.
+    """
+    global _cache_stats_at
+    now = time.monotonic()
+    if not force and now - _cache_stats_at < CACHE_STATS_REFRESH_SECONDS:
+        return
+    _cache_stats_at = now
+    for cache_name, cache in _caches.items():
+        stats = cache.stats()
+        for stat, gauge in CACHE_STATS.items():
+            gauge.labels(cache_name).set(stats[stat])
+
+
+def render() -> bytes:
+    refresh_cache_stats(force=True)
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
+
+
+# --- Consultas de la petición en curso ---
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_seconds: float = 0.0
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+# El inicio se guarda en el contexto de ejecución: si la consulta falla no queda nada pendiente
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_metrics_started", None)
+    stats = _current.get()
+    if stats is not None and started is not None:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - started
+
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Middleware ASGI puro: no envuelve el cuerpo, así no rompe el streaming"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status = 500
+        size = 0
+        IN_FLIGHT.inc()
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                server_timing = (
+                    f'app;dur={elapsed_ms:.1f}, '
+                    f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} consultas"'
+                )
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", server_timing.encode())]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            IN_FLIGHT.dec()
+            labels = (scope["method"], _route_label(scope))
+            REQUESTS.labels(*labels, str(status)).inc()
+            LATENCY.labels(*labels).observe(time.perf_counter() - started)
+            RESPONSE_SIZE.labels(*labels).observe(size)
+            DB_QUERIES.labels(*labels).observe(stats.queries)
+            DB_TIME.labels(*labels).observe(stats.db_seconds)
+            refresh_cache_stats()
@@ -0,0 +1,169 @@
+"""Inspector de consultas para desarrollo y CI (QUERY_INSPECTOR=true).
+
+- Agrupa las consultas de cada petición por huella (SQL normalizado: sin
+  literales y con las listas IN colapsadas) y advierte cuando la misma
+  consulta se repite QUERY_N_PLUS_ONE_THRESHOLD veces o más: la señal
+  típica de un N+1 por relaciones lazy.
+- Registra las consultas que superan SLOW_QUERY_MS con sus parámetros.
+- capture_queries() / assert_max_queries() permiten fijar en pruebas el
+  máximo de consultas de un endpoint:
+
+      with assert_max_queries(3):
+          client.get("/api/v1/academic/grades")
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger("app.queries")
+
+# Parámetros más largos que esto se recortan en el log (executemany, blobs)
+MAX_PARAMS_LOG_LENGTH = 500
+
+_FINGERPRINT_RULES = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"\bIN\s*\([^()]*\)", re.IGNORECASE), "IN (...)"),
+    (re.compile(r"\s+"), " "),
+]
+
+
+def fingerprint(statement: str) -> str:
+    for pattern, replacement in _FINGERPRINT_RULES:
+        statement = pattern.sub(replacement, statement)
+    return statement.strip()
+
+
+@dataclass
+class QueryRecord:
+    statement: str
+    parameters: Any
+    duration: float
+
+    @property
+    def fingerprint(self) -> str:
+        return fingerprint(self.statement)
+
+
+@dataclass
+class QueryCapture:
+    queries: List[QueryRecord] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Huellas que se ejecutaron `threshold` veces o más (posibles N+1)"""
+        counts = Counter(query.fingerprint for query in self.queries)
+        return [(fp, n) for fp, n in counts.most_common() if n >= threshold]
+
+    def report(self) -> str:
+        return "\n".join(
+            f"  {i}. ({query.duration * 1000:.1f} ms) {query.fingerprint}"
+            for i, query in enumerate(self.queries, start=1)
+        )
+
+
+# Petición en curso (middleware) y capturas activas de pruebas. Las de pruebas
+# son globales porque TestClient ejecuta la app en otro hilo.
+_request_capture: ContextVar[Optional[QueryCapture]] = ContextVar("query_capture", default=None)
+_active_captures: List[QueryCapture] = []
+_installed = False
+
+
+def _format_params(parameters: Any) -> str:
+    text = repr(parameters)
+    if len(text) > MAX_PARAMS_LOG_LENGTH:
+        text = text[:MAX_PARAMS_LOG_LENGTH] + "…"
+    return text
+
+
+# Como en app.core.metrics, el inicio vive en el contexto de ejecución y no se pierde si la consulta falla
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._inspector_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_inspector_started", None)
+    if started is None:
+        return
+    duration = time.perf_counter() - started
+    if duration * 1000 >= settings.SLOW_QUERY_MS:
+        logger.warning(
+            "Consulta lenta (%.1f ms): %s | parámetros: %s",
+            duration * 1000, " ".join(statement.split()), _format_params(parameters),
+        )
+
+    record = QueryRecord(statement, parameters, duration)
+    request_capture = _request_capture.get()
+    if request_capture is not None:
+        request_capture.queries.append(record)
+    for capture in _active_captures:
+        capture.queries.append(record)
+
+
+def install() -> None:
+    """Registra los eventos en todos los motores (sync y async); idempotente"""
+    global _installed
+    if _installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _installed = True
+
+
+class QueryInspectorMiddleware:
+    """Advierte de consultas repetidas (N+1) al terminar cada petición"""
+
+    def __init__(self, app):
+        self.app = app
+        install()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        capture = QueryCapture()
+        token = _request_capture.set(capture)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_capture.reset(token)
+            for fp, n in capture.repeated(settings.QUERY_N_PLUS_ONE_THRESHOLD):
+                logger.warning(
+                    "Posible N+1 en %s %s: %d ejecuciones de %s", scope["method"], scope["path"], n, fp
+                )
+
+
+@contextmanager
+def capture_queries() -> Iterator[QueryCapture]:
+    install()
+    capture = QueryCapture()
+    _active_captures.append(capture)
+    try:
+        yield capture
+    finally:
+        _active_captures.remove(capture)
+
+
+@contextmanager
+def assert_max_queries(limit: int) -> Iterator[QueryCapture]:
+    with capture_queries() as capture:
+        yield capture
+    if capture.count > limit:
+        raise AssertionError(
+            f"Se esperaban como máximo {limit} consultas y se ejecutaron {capture.count}:\n{capture.report()}"
+        )
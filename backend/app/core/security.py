@@ -4,12 +4,14 @@ from jose import jwt
 from passlib.context import CryptContext
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
 ALGORITHM = "HS256"
 # En producción esto debería ir en variables de entorno
 SECRET_KEY = "CHANGE_THIS_SECRET_KEY_IN_PRODUCTION_PLEASE" 
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Alcance de los tokens que solo sirven para abrir el stream de eventos
+EVENTS_SCOPE = "events"
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -26,3 +28,9 @@ def create_access_token(subject: Union[str, Any], expires_delta: timedelta = Non
     to_encode = {"exp": expire, "sub": str(subject)}
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
+
+def create_stream_token(subject: Union[str, Any]) -> str:
+    """Token de corta duración que solo abre GET /events (va en la URL)"""
+    expire = datetime.utcnow() + timedelta(seconds=settings.EVENTS_TOKEN_TTL_SECONDS)
+    to_encode = {"exp": expire, "sub": str(subject), "scope": EVENTS_SCOPE}
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
@@ -0,0 +1,55 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Hashable, Optional
+
+
+class FailureTracker:
+    """Intentos fallidos recientes por clave (usuario o IP), en memoria y por proceso.
+
+    Una clave con `max_failures` fallos dentro de `window` segundos queda
+    bloqueada hasta que el más antiguo sale de la ventana. Las claves se
+    desalojan por LRU para acotar la memoria ante ataques con muchos usuarios.
+    """
+
+    def __init__(self, max_failures: int, window: float, maxsize: int = 10_000):
+        self.max_failures = max_failures
+        self.window = window
+        self.maxsize = maxsize
+        self._failures: "OrderedDict[Hashable, Deque[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _prune(self, key: Hashable, now: float) -> Optional[Deque[float]]:
+        failures = self._failures.get(key)
+        if failures is None:
+            return None
+        while failures and failures[0] <= now - self.window:
+            failures.popleft()
+        if not failures:
+            del self._failures[key]
+            return None
+        return failures
+
+    def retry_after(self, key: Hashable) -> Optional[float]:
+        """Segundos hasta poder reintentar, o None si la clave no está bloqueada"""
+        now = time.monotonic()
+        with self._lock:
+            failures = self._prune(key, now)
+            if failures is None or len(failures) < self.max_failures:
+                return None
+            return failures[-self.max_failures] + self.window - now
+
+    def record_failure(self, key: Hashable) -> None:
+        now = time.monotonic()
+        with self._lock:
+            failures = self._prune(key, now)
+            if failures is None:
+                failures = self._failures[key] = deque()
+            failures.append(now)
+            self._failures.move_to_end(key)
+            while len(self._failures) > self.maxsize:
+                self._failures.popitem(last=False)
+
+    def reset(self, key: Hashable) -> None:
+        with self._lock:
+            self._failures.pop(key, None)
@@ -1,2 +1,2 @@
 from app.db.session import Base
-from app.models import User, Student, Guardian, AcademicYear, Grade, Section, Enrollment, Document
+from app.models import User, Student, Guardian, AcademicYear, Grade, Section, SectionSeat, Enrollment, Document, DocumentBlob, DocumentJob, Tombstone
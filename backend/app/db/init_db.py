@@ -1,101 +1,110 @@
+"""Datos iniciales: usuario admin, años académicos, grados y secciones.
+
+Se ejecuta con `python -m app.cli seed` (no al arrancar la API). Es
+idempotente y trabaja por conjuntos: unas pocas consultas en total, sin
+importar cuántos grados o secciones haya que crear.
+"""
+from datetime import date
+
+from sqlalchemy import select, tuple_
 from sqlalchemy.orm import Session
-from app.models.user import User
-from app.models.academic import AcademicYear, Grade, Section
+
 from app.core.security import get_password_hash
-from datetime import date
+from app.db.dialect import insert_for
+from app.models.academic import AcademicYear, Grade, Section
+from app.models.user import User
+from app.services import seats
+
+YEARS = [
+    {"year": 2024, "start_date": date(2024, 3, 1), "end_date": date(2024, 12, 20), "is_active": False},
+    {"year": 2025, "start_date": date(2025, 3, 1), "end_date": date(2025, 12, 20), "is_active": True},
+    {"year": 2026, "start_date": date(2026, 3, 1), "end_date": date(2026, 12, 20), "is_active": False},
+]
+
+# Grados (Primaria y Secundaria)
+GRADES = [
+    {"name": "1° Primaria", "level": "Primaria"},
+    {"name": "2° Primaria", "level": "Primaria"},
+    {"name": "3° Primaria", "level": "Primaria"},
+    {"name": "4° Primaria", "level": "Primaria"},
+    {"name": "5° Primaria", "level": "Primaria"},
+    {"name": "6° Primaria", "level": "Primaria"},
+    {"name": "1° Secundaria", "level": "Secundaria"},
+    {"name": "2° Secundaria", "level": "Secundaria"},
+    {"name": "3° Secundaria", "level": "Secundaria"},
+    {"name": "4° Secundaria", "level": "Secundaria"},
+    {"name": "5° Secundaria", "level": "Secundaria"},
+]
+
+SECTION_LETTERS = ["A", "B", "C"]
+
 
 def init_db(db: Session) -> None:
-    # Crear superusuario si no existe
-    user = db.query(User).filter(User.username == "admin").first()
-    if not user:
-        user = User(
-            username="admin",
-            email="admin@mrc.edu.pe",
-            hashed_password=get_password_hash("admin123"),
-            full_name="Administrador Sistema",
-            role="admin",
-            is_active=True,
-        )
-        db.add(user)
-        db.commit()
-        db.refresh(user)
-        print("✓ Usuario 'admin' creado con password 'admin123'")
+    # Crear superusuario si no existe (bcrypt solo cuando hace falta)
+    if db.scalar(select(User.id).where(User.username == "admin")) is None:
+        created = db.execute(
+            insert_for(db, User)
+            .values(
+                username="admin",
+                email="admin@mrc.edu.pe",
+                hashed_password=get_password_hash("admin123"),
+                full_name="Administrador Sistema",
+                role="admin",
+                is_active=True,
+            )
+            .on_conflict_do_nothing(index_elements=["username"])
+            .returning(User.id)
+        ).first()
+        if created:
+            print("✓ Usuario 'admin' creado con password 'admin123'")
     else:
         print("✓ Usuario 'admin' ya existe")
-    
-    # Crear años académicos
-    years_data = [
-        {"year": 2024, "start_date": date(2024, 3, 1), "end_date": date(2024, 12, 20), "is_active": False},
-        {"year": 2025, "start_date": date(2025, 3, 1), "end_date": date(2025, 12, 20), "is_active": True},
-        {"year": 2026, "start_date": date(2026, 3, 1), "end_date": date(2026, 12, 20), "is_active": False},
-    ]
-    
-    for year_data in years_data:
-        year = db.query(AcademicYear).filter(AcademicYear.year == year_data["year"]).first()
-        if not year:
-            year = AcademicYear(**year_data)
-            db.add(year)
-            print(f"✓ Año académico {year_data['year']} creado")
-    
-    db.commit()
-    
-    # Crear grados (Primaria y Secundaria)
-    grades_data = [
-        {"name": "1° Primaria", "level": "Primaria"},
-        {"name": "2° Primaria", "level": "Primaria"},
-        {"name": "3° Primaria", "level": "Primaria"},
-        {"name": "4° Primaria", "level": "Primaria"},
-        {"name": "5° Primaria", "level": "Primaria"},
-        {"name": "6° Primaria", "level": "Primaria"},
-        {"name": "1° Secundaria", "level": "Secundaria"},
-        {"name": "2° Secundaria", "level": "Secundaria"},
-        {"name": "3° Secundaria", "level": "Secundaria"},
-        {"name": "4° Secundaria", "level": "Secundaria"},
-        {"name": "5° Secundaria", "level": "Secundaria"},
+
+    # Años académicos: year es único, ON CONFLICT descarta los existentes
+    created_years = db.execute(
+        insert_for(db, AcademicYear).on_conflict_do_nothing(index_elements=["year"]).returning(AcademicYear.year),
+        YEARS,
+    ).scalars().all()
+    for year in sorted(created_years):
+        print(f"✓ Año académico {year} creado")
+
+    # Grados: no hay restricción única sobre el nombre, se filtran los existentes
+    existing_grades = set(db.scalars(select(Grade.name).where(Grade.name.in_([g["name"] for g in GRADES]))))
+    missing_grades = [g for g in GRADES if g["name"] not in existing_grades]
+    if missing_grades:
+        db.execute(insert_for(db, Grade), missing_grades)
+        for grade in missing_grades:
+            print(f"✓ Grado '{grade['name']}' creado")
+
+    # Secciones A, B, C para cada grado; capacidad según nivel: Primaria 30, Secundaria 35
+    grades = db.execute(select(Grade.id, Grade.name)).all()
+    existing_sections = set(db.execute(
+        select(Section.grade_id, Section.name).where(
+            tuple_(Section.grade_id, Section.name).in_(
+                [(grade_id, letter) for grade_id, _ in grades for letter in SECTION_LETTERS]
+            )
+        )
+    ).all()) if grades else set()
+    missing_sections = [
+        {"name": letter, "grade_id": grade_id, "capacity": 30 if "Primaria" in name else 35}
+        for grade_id, name in grades
+        for letter in SECTION_LETTERS
+        if (grade_id, letter) not in existing_sections
     ]
-    
-    created_grades = []
-    for grade_data in grades_data:
-        grade = db.query(Grade).filter(Grade.name == grade_data["name"]).first()
-        if not grade:
-            grade = Grade(**grade_data)
-            db.add(grade)
-            db.flush()
-            created_grades.append(grade)
-            print(f"✓ Grado '{grade_data['name']}' creado")
-        else:
-            created_grades.append(grade)
-    
-    db.commit()
-    
-    # Crear secciones para cada grado
-    sections_letters = ["A", "B", "C"]
-    section_count = 0
-    
-    all_grades = db.query(Grade).all()
-    for grade in all_grades:
-        for letter in sections_letters:
-            section_name = f"{grade.name} - Sección {letter}"
-            section = db.query(Section).filter(
-                Section.grade_id == grade.id,
-                Section.name == letter
-            ).first()
-            
-            if not section:
-                # Capacidad según nivel: Primaria 30, Secundaria 35
-                capacity = 30 if "Primaria" in grade.name else 35
-                section = Section(
-                    name=letter,
-                    grade_id=grade.id,
-                    capacity=capacity
-                )
-                db.add(section)
-                section_count += 1
-    
+    if missing_sections:
+        db.execute(insert_for(db, Section), missing_sections)
+
+    # Contadores de vacantes de cada sección y año (los existentes no se tocan); la
+    # ocupación solo los lee
+    section_ids = db.scalars(select(Section.id)).all()
+    if section_ids:
+        for year_id in db.scalars(select(AcademicYear.id)).all():
+            seats.ensure_seat_rows(db, section_ids, year_id)
+
     db.commit()
-    if section_count > 0:
-        print(f"✓ {section_count} secciones creadas")
-    
+    if missing_sections:
+        print(f"✓ {len(missing_sections)} secciones creadas")
+
     print("=" * 50)
     print("✓ Base de datos inicializada correctamente")
     print("=" * 50)
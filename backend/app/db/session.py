@@ -1,10 +1,36 @@
-from sqlalchemy import create_engine
+import asyncio
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.core.config import settings
 
-engine = create_engine(settings.SQLALCHEMY_DATABASE_URI)
+
+def pool_options(url: str) -> dict:
+    # SQLite (benchmarks y pruebas locales) no usa QueuePool: no aplican tamaño ni overflow
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+
+
+# Motor síncrono: CLI, worker de documentos, importación y benchmarks
+engine = create_engine(settings.SQLALCHEMY_DATABASE_URI, **pool_options(settings.SQLALCHEMY_DATABASE_URI))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Motor asíncrono (asyncpg) para los endpoints de la API
+async_engine = create_async_engine(
+    settings.ASYNC_SQLALCHEMY_DATABASE_URI, **pool_options(settings.ASYNC_SQLALCHEMY_DATABASE_URI)
+)
+# expire_on_commit=False: tras el commit los objetos se siguen serializando sin volver a la BD
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 # Dependency para inyectar la sesión de DB en los endpoints
@@ -14,3 +40,16 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Dependency asíncrona: los endpoints async no ocupan un hilo del threadpool
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def warm_up_pool(connections: int) -> None:
+    """Abre `connections` conexiones a la vez para que las primeras peticiones no paguen el handshake"""
+    async def ping():
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    await asyncio.gather(*(ping() for _ in range(connections)))
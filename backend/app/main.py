@@ -1,17 +1,24 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from app.db.session import engine, SessionLocal
-from app.db.base import Base
-from app.db.init_db import init_db
-from app.api import auth, students, academic, enrollments, documents
+import time
 
-# Crear tablas en la base de datos al iniciar
-Base.metadata.create_all(bind=engine)
+_import_started = time.perf_counter()
 
-# Inicializar datos (crear admin)
-db = SessionLocal()
-init_db(db)
-db.close()
+import os  # noqa: E402
+
+from fastapi import FastAPI, Response  # noqa: E402
+from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
+from fastapi.responses import ORJSONResponse  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.db.session import async_engine, warm_up_pool  # noqa: E402
+from app.api import auth, students, academic, enrollments, documents, events  # noqa: E402
+from app.api.deps import principal_cache  # noqa: E402
+from app.api.pagination import count_cache  # noqa: E402
+from app.api.reference import reference_cache  # noqa: E402
+from app.core import hashing, metrics, query_inspector  # noqa: E402
+from app.services.events import broker  # noqa: E402
+from app.services.seats import occupancy_cache  # noqa: E402
+
+# El esquema y los datos iniciales no se tocan al arrancar: se aplican una vez
+# por despliegue con `python -m app.cli migrate` y `python -m app.cli seed`.
 
 app = FastAPI(
     title="Sistema de Matrícula - I.E. Mariscal Ramón Castilla",
@@ -19,6 +26,9 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    # orjson para las respuestas que pasan por response_model; los listados
+    # ya llegan codificados (app.api.projection.json_list)
+    default_response_class=ORJSONResponse,
 )
 
 app.include_router(auth.router, prefix="/api/v1", tags=["login"])
@@ -26,6 +36,7 @@ app.include_router(students.router, prefix="/api/v1/students", tags=["students"]
 app.include_router(academic.router, prefix="/api/v1/academic", tags=["academic"])
 app.include_router(enrollments.router, prefix="/api/v1/enrollments", tags=["enrollments"])
 app.include_router(documents.router, prefix="/api/v1/documents", tags=["documents"])
+app.include_router(events.router, prefix="/api/v1/events", tags=["events"])
 
 # Configuración CORS (Permitir que el frontend Vue consuma la API)
 origins = [
@@ -40,12 +51,46 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Cabeceras de paginación y ETag legibles desde el frontend
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "X-Sync-Cursor", "Server-Timing", "ETag"],
 )
 
+if settings.QUERY_INSPECTOR:
+    app.add_middleware(query_inspector.QueryInspectorMiddleware)
+
+# Latencia, tamaño de respuesta y consultas por ruta (/metrics y Server-Timing).
+# Se agrega al final para quedar por fuera de CORS y medir la petición completa.
+app.add_middleware(metrics.MetricsMiddleware)
+
+_caches = {"principal": principal_cache, "count": count_cache, "occupancy": occupancy_cache,
+           "reference": reference_cache}
+metrics.register_caches(_caches)
+
+@app.on_event("startup")
+async def startup():
+    if settings.DB_POOL_WARMUP > 0:
+        await warm_up_pool(settings.DB_POOL_WARMUP)
+    elapsed_ms = (time.perf_counter() - _import_started) * 1000
+    print(f"✓ Worker {os.getpid()} listo en {elapsed_ms:.0f} ms")
+
+@app.on_event("shutdown")
+async def dispose_engine():
+    # Cerrar los streams de eventos y la conexión LISTEN
+    await broker.close()
+    # Cerrar las conexiones del pool asíncrono al detener el worker
+    await async_engine.dispose()
+    # Terminar los procesos de verificación de contraseñas
+    hashing.shutdown()
+
 @app.get("/")
 def read_root():
     return {"message": "Bienvenido a la API del Sistema de Matrícula MRC"}
 
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    # nginx no publica esta ruta: solo accesible dentro de la red de Docker
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
+    return {"status": "healthy", "principal_cache": principal_cache.stats()}
@@ -1,4 +1,8 @@
 from app.models.user import User
 from app.models.student import Student, Guardian
-from app.models.academic import AcademicYear, Grade, Section
-from app.models.enrollment import Enrollment, Document
+from app.models.academic import AcademicYear, Grade, Section, SectionSeat
+from app.models.enrollment import Enrollment, Document, DocumentBlob, DocumentJob
+from app.models.sync import Tombstone, track_deletes
+
+# Tablas con ?updated_since= en sus listados: sus borrados dejan lápida
+track_deletes(Student, Enrollment, Document)
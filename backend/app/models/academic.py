@@ -33,3 +33,16 @@ class Section(Base):
     
     grade = relationship("Grade", back_populates="sections")
     enrollments = relationship("Enrollment", back_populates="section")
+
+class SectionSeat(Base):
+    """Contador de vacantes ocupadas por sección y año académico.
+
+    Se mantiene junto con las matrículas para que la reserva de una vacante
+    sea un único UPDATE condicional en lugar de un COUNT(*) sobre enrollments.
+    """
+    __tablename__ = "section_seats"
+
+    section_id = Column(Integer, ForeignKey("sections.id"), primary_key=True)
+    academic_year_id = Column(Integer, ForeignKey("academic_years.id"), primary_key=True)
+    enrolled_count = Column(Integer, nullable=False, default=0) # Matrículas que no están rechazadas
+    pending_count = Column(Integer, nullable=False, default=0) # De ellas, las que están en "Pendiente"
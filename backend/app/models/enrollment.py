@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, DateTime, Index, JSON, Text, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.session import Base
+from app.models.sync import updated_at_column
 
 class Enrollment(Base):
     __tablename__ = "enrollments"
@@ -13,6 +14,8 @@ class Enrollment(Base):
     section_id = Column(Integer, ForeignKey("sections.id"))
     status = Column(String, default="Pendiente") # Pendiente, Aprobado, Rechazado
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    updated_at = updated_at_column()
     
     student = relationship("Student", back_populates="enrollments")
     academic_year = relationship("AcademicYear", back_populates="enrollments")
@@ -20,6 +23,13 @@ class Enrollment(Base):
     section = relationship("Section", back_populates="enrollments")
     documents = relationship("Document", back_populates="enrollment")
 
+    __table_args__ = (
+        # Un estudiante solo puede tener una matrícula por año académico
+        UniqueConstraint("student_id", "academic_year_id", name="uq_enrollments_student_year"),
+        # Conteo de vacantes y listados por sección/año
+        Index("ix_enrollments_section_year_status", "section_id", "academic_year_id", "status"),
+    )
+
 class Document(Base):
     __tablename__ = "documents"
 
@@ -27,7 +37,69 @@ class Document(Base):
     enrollment_id = Column(Integer, ForeignKey("enrollments.id"))
     type = Column(String, nullable=False) # DNI, Certificado, etc.
     file_url = Column(String, nullable=False)
+    blob_id = Column(Integer, ForeignKey("document_blobs.id"), index=True) # Null en documentos antiguos
+    sha256 = Column(String(64), index=True) # Hash del contenido, calculado al subir
+    size_bytes = Column(Integer)
     status = Column(String, default="Pendiente") # Pendiente, Validado, Observado
+    # Solo lo incrementan las ediciones de usuarios, no el worker de procesamiento
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # También cambia cuando el worker completa el post-procesamiento
+    updated_at = updated_at_column()
     uploaded_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Resultados del post-procesamiento (app.worker)
+    processing_status = Column(String, default="Pendiente") # Pendiente, Completado, Error
+    thumbnail_url = Column(String)
+    preview_url = Column(String) # Imagen recomprimida para revisar sin abrir el original
+    page_count = Column(Integer)
+    width = Column(Integer)
+    height = Column(Integer)
+    file_metadata = Column(JSON)
+    processed_at = Column(DateTime(timezone=True))
     
     enrollment = relationship("Enrollment", back_populates="documents")
+    blob = relationship("DocumentBlob", back_populates="documents")
+
+class DocumentBlob(Base):
+    """Contenido de un archivo, guardado una sola vez por su SHA-256.
+
+    Varios documentos (p. ej. el DNI del apoderado para hermanos) comparten el
+    mismo blob; cuando ref_count llega a cero el worker borra el archivo
+    (app.services.storage.collect_released_blobs).
+    """
+    __tablename__ = "document_blobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String(64), unique=True, nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    content_type = Column(String, nullable=False)
+    path = Column(String, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Cuándo ref_count llegó a cero; el worker borra el archivo pasado el período de gracia
+    released_at = Column(DateTime(timezone=True), index=True)
+
+    documents = relationship("Document", back_populates="blob")
+
+class DocumentJob(Base):
+    """Cola de post-procesamiento de documentos (sin broker externo).
+
+    Los workers toman trabajos con SELECT ... FOR UPDATE SKIP LOCKED, así que
+    pueden correr varios en paralelo sin procesar dos veces el mismo.
+    """
+    __tablename__ = "document_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False)
+    status = Column(String, nullable=False, default="pending") # pending, running, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+
+    document = relationship("Document")
+
+    __table_args__ = (
+        Index("ix_document_jobs_status_id", "status", "id"),
+    )
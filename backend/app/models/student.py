@@ -1,6 +1,7 @@
 from sqlalchemy import Column, Integer, String, Date, ForeignKey
 from sqlalchemy.orm import relationship
 from app.db.session import Base
+from app.models.sync import updated_at_column
 
 class Guardian(Base):
     __tablename__ = "guardians"
@@ -11,6 +12,10 @@ class Guardian(Base):
     last_name = Column(String, nullable=False)
     phone = Column(String)
     email = Column(String)
+    # Control de concurrencia optimista (ETag / If-Match)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Sincronización incremental (?updated_since=)
+    updated_at = updated_at_column()
     
     students = relationship("Student", back_populates="guardian")
 
@@ -24,6 +29,8 @@ class Student(Base):
     birth_date = Column(Date, nullable=False)
     address = Column(String)
     guardian_id = Column(Integer, ForeignKey("guardians.id"))
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    updated_at = updated_at_column()
     
     guardian = relationship("Guardian", back_populates="students")
     enrollments = relationship("Enrollment", back_populates="student")
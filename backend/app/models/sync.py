@@ -0,0 +1,67 @@
+"""Seguimiento de cambios para la sincronización incremental (?updated_since=).
+
+Las tablas sincronizables tienen `updated_at`, que asigna la aplicación (no
+la base) en cada INSERT/UPDATE, también en los UPDATE de Core. Así el valor
+tiene el mismo formato y precisión en PostgreSQL y SQLite y se puede
+comparar contra el cursor. Los borrados por el ORM dejan una lápida
+(tombstone) con el id del registro eliminado; el worker borra las que
+superan SYNC_TOMBSTONE_RETENTION_DAYS (prune_tombstones).
+"""
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import Column, DateTime, Index, Integer, String, delete, event, insert
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from app.db.session import Base
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def updated_at_column() -> Column:
+    return Column(
+        DateTime(timezone=True), nullable=False, index=True,
+        default=utcnow, onupdate=utcnow, server_default=func.now(),
+    )
+
+
+class Tombstone(Base):
+    """Registro eliminado de una tabla sincronizable"""
+    __tablename__ = "tombstones"
+
+    id = Column(Integer, primary_key=True)
+    table_name = Column(String, nullable=False)
+    row_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), nullable=False, default=utcnow)
+
+    __table_args__ = (
+        Index("ix_tombstones_table_deleted_at", "table_name", "deleted_at"),
+    )
+
+
+def _record_tombstone(mapper, connection, target) -> None:
+    # Misma transacción que el DELETE: si se revierte, la lápida también
+    connection.execute(insert(Tombstone).values(table_name=mapper.local_table.name, row_id=target.id))
+
+
+def track_deletes(*models) -> None:
+    for model in models:
+        event.listen(model, "after_delete", _record_tombstone)
+
+
+def tombstone_horizon(retention_days: int) -> datetime:
+    """Lápidas anteriores a este instante pueden haberse borrado ya"""
+    return utcnow() - timedelta(days=retention_days)
+
+
+def prune_tombstones(db: Session, retention_days: int) -> int:
+    """Borra las lápidas más antiguas que la retención (worker); devuelve cuántas"""
+    deleted = db.execute(
+        delete(Tombstone)
+        .where(Tombstone.deleted_at < tombstone_horizon(retention_days))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return deleted
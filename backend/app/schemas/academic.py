@@ -12,7 +12,7 @@ class SectionCreate(SectionBase):
 
 class Section(SectionBase):
     id: int
-    grade_id: int
+    grade_id: Optional[int] = None # La columna admite NULL (secciones sin grado)
 
     class Config:
         from_attributes = True
@@ -47,3 +47,30 @@ class AcademicYear(AcademicYearBase):
 
     class Config:
         from_attributes = True
+
+# --- Occupancy Schemas ---
+class SectionOccupancy(BaseModel):
+    section_id: int
+    name: str
+    capacity: int
+    enrolled: int # Matrículas activas (no pendientes ni rechazadas)
+    pending: int
+    free: int
+
+class GradeOccupancy(BaseModel):
+    grade_id: int
+    name: str
+    level: str
+    capacity: int
+    enrolled: int
+    pending: int
+    free: int
+    sections: List[SectionOccupancy] = []
+
+class Occupancy(BaseModel):
+    academic_year_id: int
+    capacity: int
+    enrolled: int
+    pending: int
+    free: int
+    grades: List[GradeOccupancy] = []
@@ -19,7 +19,16 @@ class Document(DocumentBase):
     id: int
     enrollment_id: int
     file_url: str
+    sha256: Optional[str] = None
+    size_bytes: Optional[int] = None
     uploaded_at: datetime
+    version: int = 1
+    processing_status: Optional[str] = None
+    page_count: Optional[int] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    thumbnail_url: Optional[str] = None
+    preview_url: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 class EnrollmentBase(BaseModel):
     student_id: int
@@ -41,9 +41,47 @@ class Enrollment(EnrollmentBase):
     id: int
     status: str
     created_at: datetime
+    version: int = 1
     student: Optional[StudentBasic] = None
     grade: Optional[GradeBasic] = None
     section: Optional[SectionBasic] = None
 
     class Config:
         from_attributes = True
+
+# --- Matrícula masiva ---
+# Tope de filas por petición: el lote completo se procesa en una sola transacción
+MAX_BATCH_ITEMS = 500
+
+class EnrollmentBatchItem(BaseModel):
+    student_id: int
+    section_id: int
+
+class EnrollmentPromotion(BaseModel):
+    """Promover a los matriculados de un grado/año al grado destino del nuevo año"""
+    from_academic_year_id: int
+    from_grade_id: int
+    to_grade_id: int
+
+class EnrollmentBatchCreate(BaseModel):
+    academic_year_id: int
+    items: List[EnrollmentBatchItem] = Field([], max_length=MAX_BATCH_ITEMS)
+    promote: Optional[EnrollmentPromotion] = None
+
+    @model_validator(mode="after")
+    def items_or_promote(self):
+        if bool(self.items) == (self.promote is not None):
+            raise ValueError("Envíe 'items' o 'promote', pero no ambos")
+        return self
+
+class EnrollmentBatchOutcome(BaseModel):
+    student_id: int
+    enrolled: bool
+    enrollment_id: Optional[int] = None
+    section_id: Optional[int] = None
+    detail: Optional[str] = None
+
+class EnrollmentBatchReport(BaseModel):
+    created: int
+    failed: int
+    results: List[EnrollmentBatchOutcome]
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr
-from datetime import date
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, field_validator, model_validator
+from datetime import date, datetime
+from typing import Any, Optional, List
 
 # --- Guardian Schemas ---
 class GuardianBase(BaseModel):
@@ -15,6 +15,7 @@ class GuardianCreate(GuardianBase):
 
 class Guardian(GuardianBase):
     id: int
+    version: int = 1
     
     class Config:
         from_attributes = True
@@ -33,7 +34,63 @@ class StudentCreate(StudentBase):
 class Student(StudentBase):
     id: int
     guardian_id: int
+    version: int = 1
     guardian: Optional[Guardian] = None
 
     class Config:
         from_attributes = True
+
+# --- Importación masiva (CSV/XLSX) ---
+class StudentImportRow(BaseModel):
+    dni: str
+    first_name: str
+    last_name: str
+    birth_date: date
+    address: Optional[str] = None
+    guardian_dni: str
+    # Si el apoderado no existe se crea con estos datos
+    guardian_first_name: Optional[str] = None
+    guardian_last_name: Optional[str] = None
+    guardian_phone: Optional[str] = None
+    guardian_email: Optional[EmailStr] = None
+
+    @model_validator(mode="before")
+    @classmethod
+    def empty_cells_as_none(cls, data: Any) -> Any:
+        if isinstance(data, dict):
+            return {
+                key: (value.strip() or None) if isinstance(value, str) else value
+                for key, value in data.items()
+            }
+        return data
+
+    @field_validator("dni", "guardian_dni", mode="before")
+    @classmethod
+    def normalize_dni(cls, value: Any) -> Any:
+        # Excel guarda el DNI como número y pierde los ceros a la izquierda
+        if isinstance(value, (int, float)):
+            value = str(int(value)).zfill(8)
+        if isinstance(value, str) and not (value.isdigit() and len(value) == 8):
+            raise ValueError("El DNI debe tener 8 dígitos")
+        return value
+
+    @field_validator("birth_date", mode="before")
+    @classmethod
+    def parse_birth_date(cls, value: Any) -> Any:
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, str) and "/" in value:
+            return datetime.strptime(value, "%d/%m/%Y").date()
+        return value
+
+class ImportRowError(BaseModel):
+    row: int
+    dni: Optional[str] = None
+    error: str
+
+class ImportReport(BaseModel):
+    total_rows: int
+    inserted: int
+    guardians_created: int
+    errors: List[ImportRowError] = []
+    elapsed_seconds: float
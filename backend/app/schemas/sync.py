@@ -0,0 +1,11 @@
+from typing import Generic, List, TypeVar
+from pydantic import BaseModel
+
+T = TypeVar("T")
+
+# --- Sincronización incremental (?updated_since=) ---
+class Changes(BaseModel, Generic[T]):
+    items: List[T] # Registros creados o modificados desde el cursor
+    deleted: List[int] # Ids eliminados desde el cursor
+    cursor: str # Enviar como updated_since en la siguiente llamada
+    has_more: bool # Hay más cambios: pedir de nuevo de inmediato con `cursor`
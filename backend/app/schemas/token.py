@@ -7,3 +7,8 @@ class Token(BaseModel):
 
 class TokenPayload(BaseModel):
     sub: Optional[int] = None
+    scope: Optional[str] = None # Vacío en los tokens de sesión; "events" en los de stream
+
+class StreamToken(BaseModel):
+    token: str
+    expires_in: int # Segundos
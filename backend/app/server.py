@@ -0,0 +1,102 @@
+"""Servidor de producción: gunicorn con workers de uvicorn.
+
+Toda la configuración sale de Settings (variables GUNICORN_*). La
+cantidad de workers se calcula a partir de los núcleos disponibles. Las
+métricas de Prometheus se comparten entre workers en METRICS_MULTIPROC_DIR.
+
+Uso (desde backend/):
+    python -m app.server
+"""
+import os
+import shutil
+import time
+
+from gunicorn.app.base import BaseApplication
+
+from app.core.config import settings
+
+
+def worker_count() -> int:
+    if settings.GUNICORN_WORKERS > 0:
+        return settings.GUNICORN_WORKERS
+    # sched_getaffinity respeta los límites de CPU del contenedor (cpuset)
+    try:
+        return max(len(os.sched_getaffinity(0)), 1)
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def post_fork(server, worker) -> None:
+    """Cada worker arranca con pools de conexiones propios.
+
+    Con preload la app (y sus motores) se crean en el master; dispose(close=False)
+    descarta el pool heredado sin cerrar conexiones que pudiera usar otro proceso.
+    """
+    import app.main
+    from app.db.session import async_engine, engine
+
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+    # El tiempo de arranque reportado es el de este worker, no el del master
+    app.main._import_started = time.perf_counter()
+
+
+def child_exit(server, worker) -> None:
+    # Los gauges de un worker muerto dejan de sumarse; sus contadores se conservan
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def prepare_metrics_dir() -> None:
+    """Vacía el directorio de métricas multiproceso y lo activa para los workers.
+
+    Debe correr antes de importar prometheus_client (la app se importa
+    después, en el master con preload o en cada worker).
+    """
+    path = settings.METRICS_MULTIPROC_DIR
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+
+
+def options() -> dict:
+    return {
+        "bind": settings.GUNICORN_BIND,
+        "workers": worker_count(),
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "max_requests": settings.GUNICORN_MAX_REQUESTS,
+        "max_requests_jitter": settings.GUNICORN_MAX_REQUESTS_JITTER,
+        "preload_app": settings.GUNICORN_PRELOAD,
+        "keepalive": settings.GUNICORN_KEEPALIVE,
+        "timeout": settings.GUNICORN_TIMEOUT,
+        "graceful_timeout": settings.GUNICORN_GRACEFUL_TIMEOUT,
+        "post_fork": post_fork,
+        "child_exit": child_exit,
+        # IP real del cliente desde nginx (X-Forwarded-For), solo si la conexión viene de nginx
+        "forwarded_allow_ips": settings.GUNICORN_FORWARDED_ALLOW_IPS,
+        "accesslog": "-",
+    }
+
+
+class Server(BaseApplication):
+    def __init__(self, config: dict):
+        self.config = config
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in self.config.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from app.main import app
+        return app
+
+
+def main() -> None:
+    prepare_metrics_dir()
+    Server(options()).run()
+
+
+if __name__ == "__main__":
+    main()
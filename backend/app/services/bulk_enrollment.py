@@ -0,0 +1,121 @@
+"""Matrícula masiva: una lista de (estudiante, sección) o la promoción de un grado completo.
+
+Todo se valida con unas pocas consultas por conjunto, las vacantes se
+reparten en memoria con los contadores de sección bloqueados y las
+matrículas se insertan en una sola transacción.
+"""
+import heapq
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.models.academic import AcademicYear, Section
+from app.models.enrollment import Enrollment
+from app.models.student import Student
+from app.schemas.enrollment import EnrollmentBatchCreate, EnrollmentBatchOutcome, EnrollmentBatchReport
+from app.services import seats
+
+
+def _requested_pairs(db: Session, batch: EnrollmentBatchCreate) -> Tuple[List[Tuple[int, Optional[int]]], List[int]]:
+    """Devuelve [(student_id, section_id o None)] y las secciones candidatas"""
+    if batch.promote is None:
+        pairs = [(item.student_id, item.section_id) for item in batch.items]
+        return pairs, sorted({section_id for _, section_id in pairs})
+
+    promote = batch.promote
+    student_ids = db.execute(
+        select(Enrollment.student_id)
+        .where(
+            Enrollment.academic_year_id == promote.from_academic_year_id,
+            Enrollment.grade_id == promote.from_grade_id,
+            Enrollment.status == "Matriculado",
+        )
+        .order_by(Enrollment.student_id)
+    ).scalars().all()
+    section_ids = db.execute(
+        select(Section.id).where(Section.grade_id == promote.to_grade_id).order_by(Section.id)
+    ).scalars().all()
+    if not section_ids:
+        raise HTTPException(status_code=404, detail="El grado destino no tiene secciones")
+    return [(student_id, None) for student_id in student_ids], list(section_ids)
+
+
+def enroll_batch(db: Session, batch: EnrollmentBatchCreate) -> EnrollmentBatchReport:
+    year_id = batch.academic_year_id
+    if db.get(AcademicYear, year_id) is None:
+        raise HTTPException(status_code=404, detail="Año académico no encontrado")
+
+    pairs, section_ids = _requested_pairs(db, batch)
+    student_ids = {student_id for student_id, _ in pairs}
+
+    # Validaciones por conjunto: estudiantes existentes, ya matriculados y secciones
+    existing_students = set(db.execute(select(Student.id).where(Student.id.in_(student_ids))).scalars())
+    already_enrolled = set(db.execute(
+        select(Enrollment.student_id).where(
+            Enrollment.academic_year_id == year_id, Enrollment.student_id.in_(student_ids)
+        )
+    ).scalars())
+    section_grades = dict(db.execute(select(Section.id, Section.grade_id).where(Section.id.in_(section_ids))).all())
+    free = seats.lock_free_seats(db, section_grades, year_id)
+
+    # Para la promoción: montículo de secciones ordenado por más vacantes libres
+    by_free = [(-count, section_id) for section_id, count in free.items()]
+    heapq.heapify(by_free)
+
+    outcomes: Dict[int, EnrollmentBatchOutcome] = {}
+    results: List[EnrollmentBatchOutcome] = []
+    taken: Dict[int, int] = {}
+    rows = []
+    for student_id, section_id in pairs:
+        outcome = EnrollmentBatchOutcome(student_id=student_id, enrolled=False, section_id=section_id)
+        results.append(outcome)
+        if student_id in outcomes:
+            outcome.detail = "Estudiante repetido en la solicitud"
+            continue
+        outcomes[student_id] = outcome
+        if student_id not in existing_students:
+            outcome.detail = "Estudiante no encontrado"
+            continue
+        if student_id in already_enrolled:
+            outcome.detail = "El estudiante ya está matriculado en este año académico"
+            continue
+
+        if section_id is None:
+            # Repartir en la sección del grado con más vacantes libres
+            if not by_free or by_free[0][0] >= 0:
+                outcome.detail = "No hay vacantes disponibles en el grado"
+                continue
+            neg_free, section_id = heapq.heappop(by_free)
+            heapq.heappush(by_free, (neg_free + 1, section_id))
+            outcome.section_id = section_id
+        elif section_id not in section_grades:
+            outcome.detail = "Sección no encontrada"
+            continue
+        elif free.get(section_id, 0) <= 0:
+            outcome.detail = "No hay vacantes disponibles en esta sección"
+            continue
+
+        free[section_id] = free.get(section_id, 0) - 1
+        taken[section_id] = taken.get(section_id, 0) + 1
+        rows.append({
+            "student_id": student_id,
+            "academic_year_id": year_id,
+            "grade_id": section_grades[section_id],
+            "section_id": section_id,
+            "status": "Matriculado",
+        })
+
+    if rows:
+        inserted = db.execute(insert(Enrollment).returning(Enrollment.id, Enrollment.student_id), rows).all()
+        for enrollment_id, student_id in inserted:
+            outcomes[student_id].enrolled = True
+            outcomes[student_id].enrollment_id = enrollment_id
+        seats.add_seats(db, taken, year_id)
+    db.commit()
+    if rows:
+        seats.invalidate_occupancy(year_id)
+
+    created = len(rows)
+    return EnrollmentBatchReport(created=created, failed=len(results) - created, results=results)
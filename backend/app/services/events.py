@@ -0,0 +1,204 @@
+"""Eventos de cambios en tiempo real: matrículas, ocupación y documentos.
+
+Los endpoints publican dentro de su transacción con `publish(db, ...)`. En
+PostgreSQL es un NOTIFY: la base lo entrega solo si la transacción se
+confirma, y a todos los workers que escuchan el canal (LISTEN), incluido el
+que lo emitió. Los eventos de una transacción salen juntos en una sola
+consulta justo antes del commit. En otras bases (SQLite en local) el evento
+se entrega al confirmar, solo a los clientes del mismo proceso.
+
+Cada cliente conectado (app.api.events) tiene un buzón acotado: los eventos
+pendientes se agrupan por (tipo, id) y solo queda el último, así que un
+navegador lento recibe el estado más reciente y no la historia completa. Si
+aun así el buzón se llena, se vacía y el cliente recibe un único `resync`
+para recargar sus listados (con ?updated_since=).
+"""
+import asyncio
+import json
+import logging
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Set
+
+import asyncpg
+from sqlalchemy import event, func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.config import settings
+from app.db.session import async_engine
+
+logger = logging.getLogger("app.events")
+
+CHANNEL = "mrc_events"
+RESYNC = "resync"
+# Eventos de la transacción en curso (se envían o entregan al confirmar)
+_PENDING_KEY = "pending_events"
+
+
+def _uses_notify() -> bool:
+    return async_engine.dialect.name == "postgresql"
+
+
+class Subscriber:
+    """Buzón de un cliente: eventos pendientes agrupados por (tipo, id)"""
+
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self._pending: "OrderedDict[Hashable, dict]" = OrderedDict()
+        self._resync = False
+        self._closed = False
+        self._wakeup = asyncio.Event()
+
+    def offer(self, data: dict) -> None:
+        if self._resync:
+            # Ya se le pidió recargar todo: los eventos sueltos sobran
+            return
+        key = (data["type"], data["id"])
+        self._pending.pop(key, None)
+        self._pending[key] = data
+        if len(self._pending) > self.max_pending:
+            self.request_resync()
+        self._wakeup.set()
+
+    def request_resync(self) -> None:
+        self._pending.clear()
+        self._resync = True
+        metrics.EVENT_RESYNCS.inc()
+        self._wakeup.set()
+
+    def close(self) -> None:
+        self._closed = True
+        self._wakeup.set()
+
+    async def next_batch(self, timeout: float) -> Optional[List[dict]]:
+        """Eventos pendientes (lista vacía si pasó `timeout` sin eventos); None si se cerró"""
+        if not (self._pending or self._resync or self._closed):
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        self._wakeup.clear()
+        if self._closed:
+            return None
+        if self._resync:
+            self._resync = False
+            return [{"type": RESYNC}]
+        batch = list(self._pending.values())
+        self._pending.clear()
+        return batch
+
+
+class EventBroker:
+    """Reparte los eventos a los clientes conectados a este worker.
+
+    Con PostgreSQL, al conectarse el primer cliente se abre una conexión
+    dedicada (fuera del pool) que hace LISTEN; si se corta, se reconecta y
+    pide un `resync` a todos porque pudo perder eventos mientras tanto.
+    """
+
+    def __init__(self):
+        self._subscribers: Set[Subscriber] = set()
+        self._listener: Optional[asyncio.Task] = None
+
+    @property
+    def clients(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> Subscriber:
+        subscriber = Subscriber(settings.EVENTS_CLIENT_MAX_PENDING)
+        self._subscribers.add(subscriber)
+        metrics.EVENT_CLIENTS.inc()
+        if _uses_notify() and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        if subscriber in self._subscribers:
+            self._subscribers.remove(subscriber)
+            metrics.EVENT_CLIENTS.dec()
+
+    def dispatch(self, data: dict) -> None:
+        for subscriber in self._subscribers:
+            subscriber.offer(data)
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            logger.warning("Evento inválido en %s: %r", channel, payload[:200])
+            return
+        self.dispatch(data)
+
+    async def _listen(self) -> None:
+        dsn = make_url(settings.SQLALCHEMY_DATABASE_URI).set(drivername="postgresql").render_as_string(hide_password=False)
+        delay, reconnecting = 1, False
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn)
+                await connection.add_listener(CHANNEL, self._on_notify)
+                if reconnecting:
+                    for subscriber in self._subscribers:
+                        subscriber.request_resync()
+                reconnecting, delay = True, 1
+                # Una conexión inactiva caída no avisa: se verifica con cada latido
+                while True:
+                    await asyncio.sleep(settings.EVENTS_HEARTBEAT_SECONDS)
+                    await asyncio.wait_for(connection.execute("SELECT 1"), settings.EVENTS_HEARTBEAT_SECONDS)
+            except Exception as e:  # Base caída, credenciales, red: siempre se reintenta
+                logger.warning("LISTEN %s interrumpido (%s); reintento en %d s", CHANNEL, e, delay)
+                reconnecting = True
+            finally:
+                if connection is not None:
+                    connection.terminate()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+
+    async def close(self) -> None:
+        for subscriber in list(self._subscribers):
+            subscriber.close()
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+
+broker = EventBroker()
+
+
+async def publish(db: AsyncSession, event_type: str, id: int, **data) -> None:
+    """Emite un evento con la transacción de `db`: solo sale si se confirma.
+
+    Los eventos llevan ids y estados, no el registro completo: el cliente
+    vuelve a pedir lo que muestra. `id` identifica lo que se agrupa.
+    """
+    db.sync_session.info.setdefault(_PENDING_KEY, []).append({"type": event_type, "id": id, **data})
+
+
+@event.listens_for(Session, "before_commit")
+def _notify_pending(session: Session) -> None:
+    # Todos los NOTIFY de la transacción en un solo SELECT, todavía dentro de ella
+    if not _uses_notify():
+        return
+    payloads = session.info.pop(_PENDING_KEY, None)
+    if payloads:
+        session.execute(select(*(
+            func.pg_notify(CHANNEL, json.dumps(payload, separators=(",", ":"), default=str))
+            for payload in payloads
+        )))
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_pending(session: Session) -> None:
+    for payload in session.info.pop(_PENDING_KEY, ()):
+        broker.dispatch(payload)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,163 @@
+"""Importación masiva de estudiantes y apoderados desde CSV o XLSX.
+
+Las filas se leen en streaming y se procesan por lotes: cada lote resuelve
+los DNIs de apoderados con una sola consulta y se inserta con
+INSERT ... ON CONFLICT DO NOTHING en modo executemany (insertmanyvalues),
+así que el costo es de unas pocas idas a la base por cada mil filas. Los
+errores se reportan por fila sin abortar el resto de la importación.
+"""
+import codecs
+import csv
+import time
+from itertools import islice
+from typing import IO, Dict, Iterable, Iterator, List, Tuple
+
+from openpyxl import load_workbook
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db.dialect import insert_for
+from app.models.student import Guardian, Student
+from app.schemas.student import ImportReport, ImportRowError, StudentImportRow
+
+BATCH_SIZE = 1000
+
+
+def _normalize_header(header) -> str:
+    return str(header or "").strip().lower()
+
+
+def iter_csv(stream: IO[bytes]) -> Iterator[dict]:
+    # utf-8-sig: Excel agrega BOM al exportar CSV
+    text = codecs.getreader("utf-8-sig")(stream)
+    reader = csv.reader(text)
+    headers = [_normalize_header(h) for h in next(reader, [])]
+    for values in reader:
+        if any(values):
+            yield dict(zip(headers, values))
+
+
+def iter_xlsx(stream: IO[bytes]) -> Iterator[dict]:
+    # read_only carga las filas bajo demanda, sin construir la hoja completa en memoria
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        headers = [_normalize_header(h) for h in next(rows, [])]
+        for values in rows:
+            if any(v is not None for v in values):
+                yield dict(zip(headers, values))
+    finally:
+        workbook.close()
+
+
+def iter_rows(stream: IO[bytes], filename: str) -> Iterator[dict]:
+    if filename.lower().endswith(".xlsx"):
+        return iter_xlsx(stream)
+    if filename.lower().endswith(".csv"):
+        return iter_csv(stream)
+    raise ValueError("Formato no soportado. Use .csv o .xlsx")
+
+
+def _error(row_number: int, raw: dict, message: str) -> ImportRowError:
+    dni = raw.get("dni")
+    return ImportRowError(row=row_number, dni=str(dni) if dni is not None else None, error=message)
+
+
+def _import_batch(db: Session, batch: List[Tuple[int, dict]], seen_dnis: set) -> Tuple[int, int, List[ImportRowError]]:
+    errors: List[ImportRowError] = []
+    valid: List[Tuple[int, StudentImportRow]] = []
+    for row_number, raw in batch:
+        try:
+            row = StudentImportRow.model_validate(raw)
+        except ValidationError as e:
+            detail = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            errors.append(_error(row_number, raw, detail))
+            continue
+        if row.dni in seen_dnis:
+            errors.append(_error(row_number, raw, "DNI repetido en el archivo"))
+            continue
+        seen_dnis.add(row.dni)
+        valid.append((row_number, row))
+    if not valid:
+        return 0, 0, errors
+
+    # 1. Crear apoderados nuevos (los existentes se ignoran por ON CONFLICT)
+    new_guardians: Dict[str, dict] = {}
+    for _, row in valid:
+        if row.guardian_first_name and row.guardian_last_name and row.guardian_dni not in new_guardians:
+            new_guardians[row.guardian_dni] = {
+                "dni": row.guardian_dni,
+                "first_name": row.guardian_first_name,
+                "last_name": row.guardian_last_name,
+                "phone": row.guardian_phone,
+                "email": row.guardian_email,
+            }
+    guardians_created = 0
+    if new_guardians:
+        created = db.execute(
+            insert_for(db, Guardian).on_conflict_do_nothing(index_elements=["dni"]).returning(Guardian.dni),
+            list(new_guardians.values()),
+        ).all()
+        guardians_created = len(created)
+
+    # 2. Resolver todos los DNIs de apoderados del lote en una sola consulta
+    guardian_dnis = {row.guardian_dni for _, row in valid}
+    guardian_ids = dict(db.execute(select(Guardian.dni, Guardian.id).where(Guardian.dni.in_(guardian_dnis))).all())
+
+    students = []
+    row_numbers: Dict[str, int] = {}
+    for row_number, row in valid:
+        guardian_id = guardian_ids.get(row.guardian_dni)
+        if guardian_id is None:
+            errors.append(ImportRowError(
+                row=row_number, dni=row.dni,
+                error="Apoderado no encontrado. Incluya sus nombres para registrarlo.",
+            ))
+            continue
+        row_numbers[row.dni] = row_number
+        students.append({
+            "dni": row.dni,
+            "first_name": row.first_name,
+            "last_name": row.last_name,
+            "birth_date": row.birth_date,
+            "address": row.address,
+            "guardian_id": guardian_id,
+        })
+
+    # 3. Insertar estudiantes; los que ya existían no vuelven en RETURNING
+    inserted = set()
+    if students:
+        inserted = set(db.execute(
+            insert_for(db, Student).on_conflict_do_nothing(index_elements=["dni"]).returning(Student.dni),
+            students,
+        ).scalars())
+    for dni, row_number in row_numbers.items():
+        if dni not in inserted:
+            errors.append(ImportRowError(row=row_number, dni=dni, error="Estudiante ya registrado"))
+
+    db.commit()
+    return len(inserted), guardians_created, errors
+
+
+def import_students(db: Session, rows: Iterable[dict], batch_size: int = BATCH_SIZE) -> ImportReport:
+    """Importa estudiantes (y sus apoderados) por lotes; cada lote se confirma por separado"""
+    started = time.perf_counter()
+    numbered = enumerate(rows, start=2)  # La fila 1 es la cabecera
+    seen_dnis: set = set()
+    total = inserted = guardians_created = 0
+    errors: List[ImportRowError] = []
+    while batch := list(islice(numbered, batch_size)):
+        total += len(batch)
+        batch_inserted, batch_guardians, batch_errors = _import_batch(db, batch, seen_dnis)
+        inserted += batch_inserted
+        guardians_created += batch_guardians
+        errors.extend(batch_errors)
+    errors.sort(key=lambda e: e.row)
+    return ImportReport(
+        total_rows=total,
+        inserted=inserted,
+        guardians_created=guardians_created,
+        errors=errors,
+        elapsed_seconds=round(time.perf_counter() - started, 3),
+    )
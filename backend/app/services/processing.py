@@ -0,0 +1,92 @@
+"""Post-procesamiento de documentos: miniaturas, recompresión y metadatos.
+
+Las funciones de este módulo no usan la base de datos: reciben una ruta y
+devuelven un dict con los resultados, para poder ejecutarse en un proceso
+hijo del worker (app.worker).
+"""
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image, ImageOps
+from pypdf import PdfReader
+
+from app.services.storage import derived_dir
+
+THUMBNAIL_SIZE = (256, 256)
+# Fotos de celular por encima de esto se recomprimen para la vista previa
+PREVIEW_MAX_SIDE = 1600
+PREVIEW_MIN_BYTES = 1024 * 1024
+JPEG_QUALITY = 80
+
+IMAGE_TYPES = {"image/jpeg", "image/png"}
+PDF_TYPES = {"application/pdf"}
+
+
+def _save_jpeg(image: Image.Image, destination: Path) -> None:
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    # Temporal con nombre único: dos trabajos con el mismo hash pueden generar el derivado a la vez
+    with tempfile.NamedTemporaryFile(dir=destination.parent, suffix=".part", delete=False) as tmp:
+        tmp_path = Path(tmp.name)
+        try:
+            image.convert("RGB").save(tmp, "JPEG", quality=JPEG_QUALITY, optimize=True)
+        except BaseException:
+            tmp.close()
+            tmp_path.unlink(missing_ok=True)
+            raise
+    # NamedTemporaryFile crea el archivo con 0600; nginx sirve los derivados como otro usuario
+    tmp_path.chmod(0o644)
+    os.replace(tmp_path, destination)
+
+
+def process_image(path: Path, sha256: str) -> dict:
+    target = derived_dir(sha256)
+    thumbnail_path = target / "thumbnail.jpg"
+    preview_path = target / "preview.jpg"
+
+    with Image.open(path) as original:
+        image = ImageOps.exif_transpose(original)
+        result = {
+            "width": image.width,
+            "height": image.height,
+            "metadata": {"format": original.format, "mode": original.mode},
+        }
+        # Mismo contenido ⇒ mismos derivados: si ya existen no se recalculan
+        if not thumbnail_path.exists():
+            thumbnail = image.copy()
+            thumbnail.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
+            _save_jpeg(thumbnail, thumbnail_path)
+        result["thumbnail_url"] = str(thumbnail_path)
+
+        oversized = max(image.size) > PREVIEW_MAX_SIDE or path.stat().st_size > PREVIEW_MIN_BYTES
+        if oversized:
+            if not preview_path.exists():
+                preview = image.copy()
+                preview.thumbnail((PREVIEW_MAX_SIDE, PREVIEW_MAX_SIDE), Image.Resampling.LANCZOS)
+                _save_jpeg(preview, preview_path)
+            result["preview_url"] = str(preview_path)
+    return result
+
+
+def process_pdf(path: Path) -> dict:
+    reader = PdfReader(path)
+    info = reader.metadata or {}
+    metadata = {
+        key.lstrip("/").lower(): str(value)
+        for key, value in info.items()
+        if key in ("/Title", "/Author", "/Producer", "/Creator", "/CreationDate")
+    }
+    metadata["encrypted"] = reader.is_encrypted
+    return {"page_count": len(reader.pages), "metadata": metadata}
+
+
+def process_document(path: str, content_type: str, sha256: Optional[str]) -> dict:
+    """Procesa un documento según su tipo; se ejecuta en un proceso del pool"""
+    file_path = Path(path)
+    if content_type in IMAGE_TYPES and sha256:
+        return process_image(file_path, sha256)
+    if content_type in PDF_TYPES:
+        return process_pdf(file_path)
+    # Word u otros: no hay nada que derivar
+    return {}
@@ -0,0 +1,191 @@
+"""Búsqueda de estudiantes y apoderados por prefijo de DNI o por nombre.
+
+La consulta se normaliza (minúsculas, sin tildes). Si son solo dígitos se
+busca por prefijo de DNI; si no, cada palabra debe aparecer en
+"apellidos nombres" (las de menos de 3 letras, al inicio de una palabra:
+un trigrama no puede acotar una subcadena más corta) y se admiten errores
+de tipeo. Los resultados se devuelven ordenados por relevancia.
+
+Hay dos implementaciones según el dialecto:
+
+- PostgreSQL: índices GIN pg_trgm sobre search_name(last_name, first_name),
+  una función inmutable creada en la migración 0002 que aplica
+  lower + unaccent. El prefijo de DNI usa el índice btree de dni con un
+  rango (dni >= q AND dni < q || ':'), válido también en planes genéricos.
+- Otros (SQLite en desarrollo y pruebas): un índice de trigramas en memoria
+  por proceso, que se construye en la primera búsqueda y se invalida con
+  invalidate() al escribir estudiantes o apoderados. Con varios workers
+  cada uno tiene su índice; no se usa en producción.
+"""
+import asyncio
+import bisect
+import heapq
+import unicodedata
+from collections import Counter
+from itertools import chain
+from typing import Dict, List, Set, Tuple
+
+from sqlalchemy import and_, func, literal, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+# pg_trgm.word_similarity_threshold por defecto; lo mismo para el índice en memoria
+FUZZY_THRESHOLD = 0.6
+
+
+def normalize(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return " ".join("".join(ch for ch in decomposed if not unicodedata.combining(ch)).split())
+
+
+def _is_dni_prefix(query: str) -> bool:
+    return query.isdigit()
+
+
+def _is_short(token: str) -> bool:
+    return len(token) < 3
+
+
+# --- PostgreSQL ---
+def _search_name(model):
+    # Debe coincidir con la expresión de los índices de la migración 0002
+    return func.search_name(model.last_name, model.first_name)
+
+
+async def _search_postgres(db: AsyncSession, model, query: str, limit: int) -> List[int]:
+    if _is_dni_prefix(query):
+        statement = (
+            select(model.id)
+            .where(model.dni >= query, model.dni < query + ":")
+            .order_by(model.dni)
+        )
+    else:
+        name = _search_name(model)
+        substring = and_(*(
+            or_(name.startswith(token, autoescape=True), name.contains(" " + token, autoescape=True))
+            if _is_short(token) else name.contains(token, autoescape=True)
+            for token in query.split()
+        ))
+        fuzzy = literal(query).op("<%")(name)
+        statement = (
+            select(model.id)
+            .where(or_(substring, fuzzy))
+            .order_by(func.word_similarity(query, name).desc(), model.id)
+        )
+    return list(await db.scalars(statement.limit(limit)))
+
+
+# --- Índice en memoria ---
+def _trigrams(word: str) -> Set[str]:
+    # Igual que pg_trgm: cada palabra con dos espacios antes y uno después
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _name_trigrams(name: str) -> Set[str]:
+    return set().union(*(_trigrams(word) for word in name.split())) if name else set()
+
+
+class InMemoryIndex:
+    """Trigramas -> posiciones, más la lista de DNIs ordenada para prefijos"""
+
+    def __init__(self, rows: List[Tuple[int, str, str, str]]):
+        self.ids: List[int] = []
+        self.names: List[str] = []
+        self.lengths: List[int] = []
+        self.postings: Dict[str, List[int]] = {}
+        for position, (row_id, _, last_name, first_name) in enumerate(rows):
+            # Con un espacio inicial, toda palabra va precedida de uno
+            name = " " + normalize(f"{last_name} {first_name}")
+            self.ids.append(row_id)
+            self.names.append(name)
+            self.lengths.append(len(name))
+            for trigram in _name_trigrams(name):
+                self.postings.setdefault(trigram, []).append(position)
+        self.dnis = sorted((dni, row_id) for row_id, dni, _, _ in rows)
+
+    def search(self, query: str, limit: int) -> List[int]:
+        if _is_dni_prefix(query):
+            start = bisect.bisect_left(self.dnis, (query,))
+            end = bisect.bisect_left(self.dnis, (query + ":",))
+            return [row_id for _, row_id in self.dnis[start:min(end, start + limit)]]
+
+        # Con un espacio delante, " token" encuentra las palabras que empiezan así
+        needles = [" " + token if _is_short(token) else token for token in query.split()]
+        matches = self._substring_matches(needles)
+        if not matches:
+            return self._fuzzy_matches(query, limit)
+
+        # Primero donde todas las palabras coinciden desde su inicio; en cada
+        # grupo, los nombres más cortos (a igual largo, por id)
+        best = self._filter(matches, [" " + needle.lstrip() for needle in needles])
+        ranked = heapq.nsmallest(limit, best, key=self.lengths.__getitem__)
+        if len(ranked) < limit:
+            best_set = set(best)
+            rest = [p for p in matches if p not in best_set]
+            ranked += heapq.nsmallest(limit - len(ranked), rest, key=self.lengths.__getitem__)
+        return [self.ids[position] for position in ranked]
+
+    def _filter(self, positions, needles: List[str]) -> List[int]:
+        names = self.names
+        for needle in needles:
+            positions = [p for p in positions if needle in names[p]]
+        return positions
+
+    def _substring_matches(self, needles: List[str]) -> List[int]:
+        # La lista de posiciones más corta entre los trigramas de las palabras
+        # acota los candidatos; cada uno se verifica con `in`
+        trigrams = [
+            (" " + needle if len(needle) < 3 else needle)[i:i + 3]
+            for needle in needles for i in range(max(1, len(needle) - 2))
+        ]
+        return self._filter(min((self.postings.get(t, ()) for t in trigrams), key=len), needles)
+
+    def _fuzzy_matches(self, query: str, limit: int) -> List[int]:
+        # word_similarity aproximada: fracción de trigramas de la consulta presentes en el nombre
+        query_trigrams = _name_trigrams(query)
+        shared = Counter(chain.from_iterable(self.postings.get(trigram, ()) for trigram in query_trigrams))
+        needed = FUZZY_THRESHOLD * len(query_trigrams)
+        scored = [(-count, self.ids[p]) for p, count in shared.items() if count >= needed]
+        return [row_id for _, row_id in heapq.nsmallest(limit, scored)]
+
+
+_indexes: Dict[str, InMemoryIndex] = {}
+# Una escritura durante la construcción deja ese índice obsoleto: no se guarda
+_generations: Dict[str, int] = {}
+_build_lock = asyncio.Lock()
+
+
+def invalidate(*models) -> None:
+    """Descartar los índices en memoria tras escribir esas tablas"""
+    for model in models:
+        _indexes.pop(model.__tablename__, None)
+        _generations[model.__tablename__] = _generations.get(model.__tablename__, 0) + 1
+
+
+async def _memory_index(db: AsyncSession, model) -> InMemoryIndex:
+    index = _indexes.get(model.__tablename__)
+    if index is None:
+        async with _build_lock:
+            index = _indexes.get(model.__tablename__)
+            if index is None:
+                generation = _generations.get(model.__tablename__, 0)
+                rows = (await db.execute(
+                    select(model.id, model.dni, model.last_name, model.first_name).order_by(model.id)
+                )).all()
+                index = await run_in_threadpool(InMemoryIndex, rows)
+                if _generations.get(model.__tablename__, 0) == generation:
+                    _indexes[model.__tablename__] = index
+    return index
+
+
+async def search_ids(db: AsyncSession, model, query: str, limit: int) -> List[int]:
+    """Ids de `model` (Student o Guardian) que coinciden, del más relevante al menos"""
+    query = normalize(query)
+    if not query:
+        return []
+    if db.get_bind().dialect.name == "postgresql":
+        return await _search_postgres(db, model, query, limit)
+    index = await _memory_index(db, model)
+    return index.search(query, limit)
+
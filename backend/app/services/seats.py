@@ -0,0 +1,191 @@
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import bindparam, func, literal, select, true, update
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.dialect import insert_for
+from app.models.academic import AcademicYear, Section, SectionSeat
+from app.models.enrollment import Enrollment
+
+# Las matrículas rechazadas no ocupan vacante (pendientes y aprobadas sí)
+NON_OCCUPYING_STATUSES = {"Rechazado"}
+PENDING_STATUS = "Pendiente"
+
+# Ocupación por año (GET /academic/occupancy); se invalida con cada cambio de matrícula
+occupancy_cache = TTLCache(maxsize=32, ttl=settings.OCCUPANCY_CACHE_TTL_SECONDS)
+
+
+def invalidate_occupancy(academic_year_id: Optional[int] = None) -> None:
+    if academic_year_id is None:
+        occupancy_cache.clear()
+    else:
+        occupancy_cache.invalidate(academic_year_id)
+
+
+def occupies_seat(status: str) -> bool:
+    return status not in NON_OCCUPYING_STATUSES
+
+
+def _seat_filter(section_id: int, academic_year_id: int):
+    return (
+        SectionSeat.section_id == section_id,
+        SectionSeat.academic_year_id == academic_year_id,
+    )
+
+
+def _status_count(status_filter):
+    return (
+        select(func.count(Enrollment.id))
+        .where(Enrollment.section_id == Section.id, status_filter)
+        .correlate(Section)
+        .scalar_subquery()
+    )
+
+
+def ensure_seat_rows(db: Session, section_ids: Iterable[int], academic_year_id: int) -> None:
+    """Crea los contadores que falten, inicializados con las matrículas existentes.
+
+    Un solo INSERT ... SELECT para todas las secciones; los que ya existen se
+    dejan como están (ON CONFLICT DO NOTHING).
+    """
+    in_year = Enrollment.academic_year_id == academic_year_id
+    rows = select(
+        Section.id,
+        literal(academic_year_id),
+        _status_count(in_year & Enrollment.status.notin_(NON_OCCUPYING_STATUSES)),
+        _status_count(in_year & (Enrollment.status == PENDING_STATUS)),
+    ).where(Section.id.in_(list(section_ids)))
+    stmt = insert_for(db, SectionSeat).from_select(
+        ["section_id", "academic_year_id", "enrolled_count", "pending_count"], rows
+    ).on_conflict_do_nothing(index_elements=["section_id", "academic_year_id"])
+    db.execute(stmt)
+
+
+def ensure_seat_row(db: Session, section_id: int, academic_year_id: int) -> None:
+    ensure_seat_rows(db, [section_id], academic_year_id)
+
+
+def create_seat_rows(db: Session, section_id: Optional[int] = None, academic_year_id: Optional[int] = None) -> None:
+    """Crea en cero los contadores de una sección o un año recién creados.
+
+    Cubre todas las combinaciones con los años (o secciones) existentes, así
+    la ocupación no tiene que completarlos al leer. Una sección o un año
+    nuevos no tienen matrículas, por eso no se cuentan.
+    """
+    rows = select(Section.id, AcademicYear.id, literal(0), literal(0)).join(AcademicYear, true())
+    if section_id is not None:
+        rows = rows.where(Section.id == section_id)
+    if academic_year_id is not None:
+        rows = rows.where(AcademicYear.id == academic_year_id)
+    stmt = insert_for(db, SectionSeat).from_select(
+        ["section_id", "academic_year_id", "enrolled_count", "pending_count"], rows
+    ).on_conflict_do_nothing(index_elements=["section_id", "academic_year_id"])
+    db.execute(stmt)
+
+
+def lock_free_seats(db: Session, section_ids: Iterable[int], academic_year_id: int) -> Dict[int, int]:
+    """Bloquea los contadores de las secciones y devuelve {section_id: vacantes libres}.
+
+    Mientras dure la transacción ninguna otra matrícula puede tomar esas
+    vacantes, así que se pueden repartir en memoria y aplicar con add_seats.
+    """
+    section_ids = list(section_ids)
+    ensure_seat_rows(db, section_ids, academic_year_id)
+    rows = db.execute(
+        select(SectionSeat.section_id, Section.capacity - SectionSeat.enrolled_count)
+        .join(Section, Section.id == SectionSeat.section_id)
+        .where(SectionSeat.section_id.in_(section_ids), SectionSeat.academic_year_id == academic_year_id)
+        .order_by(SectionSeat.section_id)
+        .with_for_update(of=SectionSeat)
+    ).all()
+    return {section_id: max(free, 0) for section_id, free in rows}
+
+
+def add_seats(db: Session, taken: Dict[int, int], academic_year_id: int) -> None:
+    """Suma las vacantes ocupadas por sección en un solo executemany"""
+    if not taken:
+        return
+    table = SectionSeat.__table__
+    db.execute(
+        table.update()
+        .where(table.c.section_id == bindparam("sid"), table.c.academic_year_id == academic_year_id)
+        .values(enrolled_count=table.c.enrolled_count + bindparam("taken")),
+        [{"sid": section_id, "taken": count} for section_id, count in taken.items()],
+    )
+
+
+def take_seat(db: Session, section_id: int, academic_year_id: int, *conditions) -> bool:
+    """Ocupa una vacante con un único UPDATE condicional.
+
+    False si la sección está llena, si falta el contador o si no se cumple
+    alguna de `conditions` (condiciones extra del WHERE, p. ej. un NOT EXISTS).
+    El UPDATE toma el bloqueo de la fila del contador, así que dos reservas
+    concurrentes se serializan y nunca se supera la capacidad. No hace commit:
+    si la matrícula no llega a insertarse, el rollback devuelve la vacante.
+    """
+    capacity = select(Section.capacity).where(Section.id == section_id).scalar_subquery()
+    stmt = (
+        update(SectionSeat)
+        .where(*_seat_filter(section_id, academic_year_id), SectionSeat.enrolled_count < capacity, *conditions)
+        .values(enrolled_count=SectionSeat.enrolled_count + 1)
+        .execution_options(synchronize_session=False)
+    )
+    return db.execute(stmt).rowcount > 0
+
+
+def seat_row_exists(db: Session, section_id: int, academic_year_id: int) -> bool:
+    return db.execute(
+        select(SectionSeat.enrolled_count).where(*_seat_filter(section_id, academic_year_id))
+    ).first() is not None
+
+
+def reserve_seat(db: Session, section_id: int, academic_year_id: int) -> bool:
+    """Ocupa una vacante (take_seat) creando el contador si falta; False si la sección está llena"""
+    if take_seat(db, section_id, academic_year_id):
+        return True
+    # Puede que el contador aún no exista (primera matrícula de la sección en el año)
+    if seat_row_exists(db, section_id, academic_year_id):
+        return False
+    ensure_seat_row(db, section_id, academic_year_id)
+    return take_seat(db, section_id, academic_year_id)
+
+
+def release_seat(db: Session, section_id: int, academic_year_id: int) -> None:
+    """Libera una vacante (matrícula eliminada o rechazada)"""
+    ensure_seat_row(db, section_id, academic_year_id)
+    db.execute(
+        update(SectionSeat)
+        .where(*_seat_filter(section_id, academic_year_id), SectionSeat.enrolled_count > 0)
+        .values(enrolled_count=SectionSeat.enrolled_count - 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def change_status(
+    db: Session, section_id: int, academic_year_id: int, old_status: str, new_status: Optional[str]
+) -> bool:
+    """Ajusta los contadores de la sección para un cambio de estado (None = matrícula eliminada).
+
+    Devuelve False si la matrícula vuelve a ocupar vacante y la sección está llena.
+    Debe llamarse antes de hacer flush del cambio.
+    """
+    was_occupying = occupies_seat(old_status)
+    now_occupying = new_status is not None and occupies_seat(new_status)
+    if was_occupying and not now_occupying:
+        release_seat(db, section_id, academic_year_id)
+    elif now_occupying and not was_occupying:
+        if not reserve_seat(db, section_id, academic_year_id):
+            return False
+
+    pending_delta = (new_status == PENDING_STATUS) - (old_status == PENDING_STATUS)
+    if pending_delta:
+        ensure_seat_row(db, section_id, academic_year_id)
+        db.execute(
+            update(SectionSeat)
+            .where(*_seat_filter(section_id, academic_year_id))
+            .values(pending_count=SectionSeat.pending_count + pending_delta)
+            .execution_options(synchronize_session=False)
+        )
+    return True
@@ -0,0 +1,236 @@
+import hashlib
+import mimetypes
+import os
+import shutil
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import BinaryIO, NamedTuple, Optional
+
+from fastapi import UploadFile
+from sqlalchemy import case, delete, select, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.db.dialect import insert_for
+from app.models.enrollment import DocumentBlob
+
+# Almacén direccionado por contenido: uploads/blobs/ab/cd/<sha256>
+UPLOAD_ROOT = Path("uploads")
+BLOB_DIR = UPLOAD_ROOT / "blobs"
+BLOB_TMP_DIR = BLOB_DIR / "tmp"
+# Miniaturas y vistas previas generadas por el worker, también por hash
+DERIVED_DIR = UPLOAD_ROOT / "derived"
+
+# Tamaño de cada bloque leído del UploadFile
+CHUNK_SIZE = 1024 * 1024
+
+# Límite de tamaño por tipo de archivo; nginx corta antes la petición completa
+# (client_max_body_size de /api/v1/documents/upload: el mayor de estos más el multipart)
+MAX_UPLOAD_BYTES = {
+    ".pdf": 20 * 1024 * 1024,
+    ".jpg": 12 * 1024 * 1024,
+    ".jpeg": 12 * 1024 * 1024,
+    ".png": 12 * 1024 * 1024,
+    ".doc": 10 * 1024 * 1024,
+    ".docx": 10 * 1024 * 1024,
+}
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, max_bytes: int):
+        super().__init__(f"El archivo supera el máximo de {max_bytes // (1024 * 1024)} MB")
+        self.max_bytes = max_bytes
+
+
+class StoredFile(NamedTuple):
+    path: Path  # Ruta definitiva (derivada del hash)
+    size: int
+    sha256: str
+    tmp_path: Path  # Donde queda el contenido hasta que acquire_blob lo ubica
+
+
+def blob_path(sha256: str) -> Path:
+    # Dos niveles de subdirectorios para no juntar miles de archivos en una carpeta
+    return BLOB_DIR / sha256[:2] / sha256[2:4] / sha256
+
+
+def derived_dir(sha256: str) -> Path:
+    return DERIVED_DIR / sha256[:2] / sha256[2:4] / sha256
+
+
+def remove_blob_files(path: Path) -> None:
+    """Borra el archivo de un blob liberado y sus derivados"""
+    path.unlink(missing_ok=True)
+    shutil.rmtree(derived_dir(path.name), ignore_errors=True)
+
+
+def content_type_for(extension: str) -> str:
+    return mimetypes.types_map.get(extension.lower(), "application/octet-stream")
+
+
+def _write_chunk(buffer: BinaryIO, hasher, chunk: bytes) -> None:
+    # hashlib libera el GIL con bloques grandes, así que hash y escritura van juntos al hilo
+    hasher.update(chunk)
+    buffer.write(chunk)
+
+
+def _finish(buffer: BinaryIO) -> None:
+    buffer.flush()
+    os.fsync(buffer.fileno())
+    buffer.close()
+
+
+def _place(tmp_path: Path, destination: Path) -> None:
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    # Si el blob ya existía se reemplaza por un contenido idéntico
+    os.replace(tmp_path, destination)
+
+
+def _abort(buffer: BinaryIO, tmp_path: Path) -> None:
+    buffer.close()
+    try:
+        tmp_path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+async def save_blob(file: UploadFile, max_bytes: int) -> StoredFile:
+    """Recibe el archivo por bloques en un temporal sin bloquear el event loop.
+
+    El SHA-256 se calcula mientras se escribe. El temporal se renombra a la
+    ruta derivada del hash recién en acquire_blob, con la fila del blob
+    bloqueada (ver collect_released_blobs); si el documento no llega a
+    registrarse, discard_blob lo limpia. Si se supera `max_bytes` se corta
+    la copia y se responde 413.
+
+    Cuando esto corre, Starlette ya recibió el cuerpo multipart completo
+    (en memoria hasta 1 MB y el resto en un temporal propio): `max_bytes`
+    limita lo que entra al almacén de blobs, no lo que llega al disco. El
+    tope de la petición lo pone nginx (client_max_body_size de la ruta de
+    subida), antes de que el cuerpo llegue al backend.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLarge(max_bytes)
+
+    tmp_path = BLOB_TMP_DIR / f"{uuid.uuid4().hex}.part"
+    hasher = hashlib.sha256()
+    size = 0
+    buffer = await run_in_threadpool(tmp_path.open, "wb")
+    try:
+        while chunk := await file.read(CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge(max_bytes)
+            await run_in_threadpool(_write_chunk, buffer, hasher, chunk)
+        await run_in_threadpool(_finish, buffer)
+    except BaseException:
+        await run_in_threadpool(_abort, buffer, tmp_path)
+        raise
+    digest = hasher.hexdigest()
+    return StoredFile(blob_path(digest), size, digest, tmp_path)
+
+
+def acquire_blob(db: Session, stored: StoredFile, content_type: str) -> int:
+    """Registra el blob o suma una referencia si ya existía, y ubica el archivo.
+
+    El upsert deja la fila del blob bloqueada hasta el commit, así que el
+    archivo se ubica sin que collect_released_blobs pueda borrarlo a la vez.
+    """
+    stmt = insert_for(db, DocumentBlob).values(
+        sha256=stored.sha256,
+        size_bytes=stored.size,
+        content_type=content_type,
+        path=str(stored.path),
+        ref_count=1,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["sha256"],
+        set_={"ref_count": DocumentBlob.__table__.c.ref_count + 1, "released_at": None},
+    ).returning(DocumentBlob.id)
+    blob_id = db.execute(stmt).scalar_one()
+    _place(stored.tmp_path, stored.path)
+    return blob_id
+
+
+def discard_blob(db: Session, stored: StoredFile, content_type: str) -> None:
+    """Limpia una subida cuyo documento no llegó a registrarse (después del rollback).
+
+    El temporal se borra. El archivo que ya se había ubicado no se borra
+    aquí, porque otra subida del mismo contenido pudo ubicarlo también: si
+    no hay blob que lo referencie se registra como liberado y lo borra
+    collect_released_blobs. Requiere commit.
+    """
+    stored.tmp_path.unlink(missing_ok=True)
+    db.execute(
+        insert_for(db, DocumentBlob).values(
+            sha256=stored.sha256,
+            size_bytes=stored.size,
+            content_type=content_type,
+            path=str(stored.path),
+            ref_count=0,
+            released_at=datetime.now(timezone.utc),
+        ).on_conflict_do_nothing(index_elements=["sha256"])
+    )
+
+
+def reference_existing_blob(db: Session, sha256: str) -> Optional[DocumentBlob]:
+    """Suma una referencia a un blob ya almacenado (re-subida sin enviar el archivo).
+
+    También recupera un blob liberado que el GC todavía no borró.
+    """
+    blob = db.execute(
+        update(DocumentBlob)
+        .where(DocumentBlob.sha256 == sha256)
+        .values(ref_count=DocumentBlob.ref_count + 1, released_at=None)
+        .returning(DocumentBlob)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    if blob is None or not Path(blob.path).exists():
+        return None
+    return blob
+
+
+def release_blob(db: Session, blob_id: int) -> None:
+    """Resta una referencia; al llegar a cero el blob queda liberado para el GC.
+
+    El archivo no se borra aquí: lo hace collect_released_blobs pasado el
+    período de gracia y con la fila bloqueada.
+    """
+    db.execute(
+        update(DocumentBlob)
+        .where(DocumentBlob.id == blob_id)
+        .values(
+            ref_count=DocumentBlob.ref_count - 1,
+            released_at=case((DocumentBlob.ref_count <= 1, datetime.now(timezone.utc)), else_=None),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def collect_released_blobs(db: Session, grace_seconds: int, limit: int = 100) -> int:
+    """Borra los archivos y filas de blobs liberados hace más de `grace_seconds` (worker).
+
+    Las filas se bloquean (SKIP LOCKED) y el archivo se borra antes del
+    commit: una subida del mismo contenido espera en su upsert (acquire_blob)
+    y, al terminar este commit, inserta una fila nueva y vuelve a ubicar el
+    archivo. Una subida que ya bloqueó la fila hace que se salte.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=grace_seconds)
+    released = db.execute(
+        select(DocumentBlob.id, DocumentBlob.path)
+        .where(DocumentBlob.ref_count <= 0, DocumentBlob.released_at < cutoff)
+        .order_by(DocumentBlob.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+    for blob in released:
+        remove_blob_files(Path(blob.path))
+    if released:
+        db.execute(
+            delete(DocumentBlob)
+            .where(DocumentBlob.id.in_([blob.id for blob in released]))
+            .execution_options(synchronize_session=False)
+        )
+    db.commit()
+    return len(released)
@@ -0,0 +1,244 @@
+"""Worker de post-procesamiento de documentos.
+
+Toma trabajos de la tabla document_jobs y los procesa en un pool de
+procesos (uno por núcleo por defecto): miniaturas y recompresión de
+imágenes, número de páginas y metadatos de PDFs. No necesita broker: la
+cola es la propia base de datos y se pueden levantar varios workers.
+También borra los archivos de blobs que ya no usa ningún documento y las
+lápidas de sincronización vencidas.
+
+Uso (desde backend/):
+    python -m app.worker            # procesa continuamente
+    python -m app.worker --once     # vacía la cola y termina
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.enrollment import Document, DocumentBlob, DocumentJob
+from app.models.sync import prune_tombstones
+from app.services import processing, storage
+
+logger = logging.getLogger("app.worker")
+
+# Cada cuánto se borran las lápidas que superan SYNC_TOMBSTONE_RETENTION_DAYS
+TOMBSTONE_PRUNE_INTERVAL_SECONDS = 3600
+
+
+class ClaimedJob(NamedTuple):
+    id: int
+    document_id: int
+    attempts: int
+    path: str
+    content_type: str
+    sha256: Optional[str]
+
+
+def claim_jobs(db: Session, limit: int) -> List[ClaimedJob]:
+    """Marca como 'running' hasta `limit` trabajos pendientes y los devuelve"""
+    pending = (
+        select(DocumentJob.id)
+        .where(DocumentJob.status == "pending")
+        .order_by(DocumentJob.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    claimed = db.execute(
+        update(DocumentJob)
+        .where(DocumentJob.id.in_(pending))
+        .values(status="running", started_at=func.now(), attempts=DocumentJob.attempts + 1)
+        .returning(DocumentJob.id, DocumentJob.document_id, DocumentJob.attempts)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if not claimed:
+        db.commit()
+        return []
+
+    documents = {
+        row.id: row
+        for row in db.execute(
+            select(Document.id, Document.file_url, Document.sha256, DocumentBlob.content_type)
+            .outerjoin(DocumentBlob, Document.blob_id == DocumentBlob.id)
+            .where(Document.id.in_([job.document_id for job in claimed]))
+        )
+    }
+    db.commit()
+
+    jobs = []
+    for job in claimed:
+        document = documents.get(job.document_id)
+        if document is None:
+            continue
+        content_type = document.content_type or storage.content_type_for(os.path.splitext(document.file_url)[1])
+        jobs.append(ClaimedJob(job.id, job.document_id, job.attempts, document.file_url, content_type, document.sha256))
+    return jobs
+
+
+def requeue_stale_jobs(db: Session) -> int:
+    """Devuelve a la cola los trabajos de un worker que murió a mitad de proceso"""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.DOCUMENT_JOB_TIMEOUT_SECONDS)
+    result = db.execute(
+        update(DocumentJob)
+        .where(DocumentJob.status == "running", DocumentJob.started_at < cutoff)
+        .values(status="pending")
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
+
+
+def record_result(db: Session, job: ClaimedJob, result: Optional[dict], error: Optional[str]) -> None:
+    if error is None:
+        db.execute(
+            update(Document)
+            .where(Document.id == job.document_id)
+            .values(
+                processing_status="Completado",
+                thumbnail_url=result.get("thumbnail_url"),
+                preview_url=result.get("preview_url"),
+                page_count=result.get("page_count"),
+                width=result.get("width"),
+                height=result.get("height"),
+                file_metadata=result.get("metadata"),
+                processed_at=func.now(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        job_values = {"status": "done", "error": None}
+    else:
+        retry = job.attempts < settings.DOCUMENT_JOB_MAX_ATTEMPTS
+        job_values = {"status": "pending" if retry else "failed", "error": error}
+        if not retry:
+            db.execute(
+                update(Document)
+                .where(Document.id == job.document_id)
+                .values(processing_status="Error", processed_at=func.now())
+                .execution_options(synchronize_session=False)
+            )
+    db.execute(
+        update(DocumentJob)
+        .where(DocumentJob.id == job.id)
+        .values(finished_at=func.now(), **job_values)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def _new_pool(processes: int) -> ProcessPoolExecutor:
+    # "spawn" para que los hijos no hereden las conexiones del pool de SQLAlchemy
+    return ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"))
+
+
+def run(processes: int, once: bool = False) -> None:
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        logger.info("Señal %s recibida, terminando trabajos en curso...", signum)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    in_flight: Dict[Future, ClaimedJob] = {}
+    last_stale_check = 0.0
+    last_blob_gc = 0.0
+    last_tombstone_prune = 0.0
+    delay = 1
+    pool = _new_pool(processes)
+    try:
+        while not stopping or in_flight:
+            db = SessionLocal()
+            try:
+                if time.monotonic() - last_stale_check > settings.DOCUMENT_JOB_TIMEOUT_SECONDS:
+                    requeued = requeue_stale_jobs(db)
+                    if requeued:
+                        logger.warning("%d trabajo(s) vencidos devueltos a la cola", requeued)
+                    last_stale_check = time.monotonic()
+
+                if time.monotonic() - last_blob_gc > settings.BLOB_GC_INTERVAL_SECONDS:
+                    collected = storage.collect_released_blobs(db, settings.BLOB_GC_GRACE_SECONDS)
+                    if collected:
+                        logger.info("%d blob(s) liberados borrados", collected)
+                    last_blob_gc = time.monotonic()
+
+                if time.monotonic() - last_tombstone_prune > TOMBSTONE_PRUNE_INTERVAL_SECONDS:
+                    pruned = prune_tombstones(db, settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+                    if pruned:
+                        logger.info("%d lápida(s) vencidas borradas", pruned)
+                    last_tombstone_prune = time.monotonic()
+
+                # Mantener el pool lleno: se piden tantos trabajos como procesos libres (x2)
+                free = processes * 2 - len(in_flight)
+                if not stopping and free > 0:
+                    jobs = claim_jobs(db, free)
+                    for index, job in enumerate(jobs):
+                        try:
+                            future = pool.submit(processing.process_document, job.path, job.content_type, job.sha256)
+                        except BrokenProcessPool:
+                            # Los trabajos ya tomados que no llegaron al pool vuelven a la cola
+                            for unsent in jobs[index:]:
+                                record_result(db, unsent, None, "BrokenProcessPool: el pool de procesos se cayó")
+                            raise
+                        in_flight[future] = job
+                delay = 1
+
+                if not in_flight:
+                    if once:
+                        break
+                    time.sleep(settings.DOCUMENT_WORKER_POLL_SECONDS)
+                    continue
+
+                done, _ = wait(in_flight, timeout=settings.DOCUMENT_WORKER_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = in_flight.pop(future)
+                    try:
+                        result, error = future.result(), None
+                    except Exception as e:
+                        result, error = None, f"{type(e).__name__}: {e}"
+                        logger.warning("Documento %s falló (intento %s): %s", job.document_id, job.attempts, error)
+                    record_result(db, job, result, error)
+            except BrokenProcessPool:
+                # Un proceso hijo murió (OOM, señal): los trabajos en curso ya fallaron
+                # con BrokenProcessPool y se registran (con reintento) en la próxima vuelta
+                logger.error("El pool de procesos se cayó; se crea uno nuevo")
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = _new_pool(processes)
+            except Exception:
+                # Base caída o red: se reintenta con espera creciente sin perder los trabajos en curso.
+                # Un resultado que no se pudo registrar vuelve a la cola con requeue_stale_jobs.
+                logger.exception("Error en el ciclo del worker; reintento en %d s", delay)
+                time.sleep(delay)
+                delay = min(delay * 2, 30)
+            finally:
+                db.close()
+    finally:
+        pool.shutdown(wait=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Worker de post-procesamiento de documentos")
+    parser.add_argument("--processes", type=int, default=settings.DOCUMENT_WORKER_PROCESSES or os.cpu_count() or 1)
+    parser.add_argument("--once", action="store_true", help="Procesar la cola pendiente y terminar")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    logger.info("Worker de documentos iniciado con %d proceso(s)", args.processes)
+    run(args.processes, once=args.once)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+"""Benchmarks y pruebas de carga del backend (se ejecutan desde backend/).
+
+- dataset:                colegio sintético reproducible (apoderados, estudiantes, secciones,
+                          matrículas, documentos)
+- workload:               temporada de matrícula (logins, búsquedas, matrículas, subidas, listados)
+- runner:                 corre el workload contra una o varias revisiones de git y reporta
+                          p50/p95/p99 y throughput por endpoint
+- api_load:               carga sobre endpoints de lectura puntuales
+- enrollment_contention:  matrículas concurrentes sobre una sola sección
+- serialization:          microbenchmark de serialización de listados
+
+Todo corre en local contra SQLite o un PostgreSQL desechable (DATABASE_URL),
+sin acceso a la red.
+"""
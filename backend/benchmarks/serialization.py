@@ -0,0 +1,143 @@
+"""Microbenchmark de serialización de los listados (sin base de datos).
+
+Compara, para una página de cada endpoint de listado, el costo de convertir
+las filas en el cuerpo JSON de la respuesta:
+
+- orm+json:     objetos con atributos (como los ORM) por response_model
+                (from_attributes) y JSONResponse (json de la stdlib), el
+                camino de FastAPI antes de las consultas por columnas.
+- dict+orjson:  diccionarios por response_model y ORJSONResponse.
+- json_list:    TypeAdapter.validate_python + dump_json (app.api.projection).
+
+Uso (desde backend/):
+    python -m benchmarks.serialization --rows 100 --repeat 200
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import date, datetime
+from types import SimpleNamespace
+from typing import List
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.api.projection import json_list
+from app.schemas.academic import AcademicYear, Grade, Section
+from app.schemas.document import Document
+from app.schemas.enrollment import Enrollment
+from app.schemas.student import GuardianCreate, Student
+
+
+def _guardian(i: int) -> dict:
+    return {"id": i, "dni": f"{40000000 + i}", "first_name": "Apoderado", "last_name": f"N{i}",
+            "phone": "987654321", "email": f"apoderado{i}@example.com"}
+
+
+def _section(i: int) -> dict:
+    return {"id": i, "grade_id": i // 3 + 1, "name": "ABC"[i % 3], "capacity": 30}
+
+
+def sample_pages(rows: int) -> dict:
+    """Una página de `rows` elementos por endpoint, con la forma de nest()"""
+    return {
+        "enrollments": (Enrollment, [
+            {
+                "id": i, "student_id": i, "academic_year_id": 2, "grade_id": 1, "section_id": 1,
+                "status": "Matriculado", "created_at": datetime(2025, 3, 1, 8, 30),
+                "student": {"id": i, "dni": f"{70000000 + i}", "first_name": "Estudiante", "last_name": f"N{i}"},
+                "grade": {"id": 1, "name": "1° Primaria", "level": "Primaria"},
+                "section": {"id": 1, "name": "A", "capacity": 30},
+            }
+            for i in range(rows)
+        ]),
+        "students": (Student, [
+            {
+                "id": i, "dni": f"{70000000 + i}", "first_name": "Estudiante", "last_name": f"N{i}",
+                "birth_date": date(2015, 1, 1), "address": "Av. Principal 123", "guardian_id": i,
+                "guardian": _guardian(i),
+            }
+            for i in range(rows)
+        ]),
+        "guardians": (GuardianCreate, [_guardian(i) for i in range(rows)]),
+        "documents": (Document, [
+            {
+                "id": i, "enrollment_id": i, "type": "DNI", "status": "Pendiente",
+                "file_url": f"/api/v1/documents/{i}/content", "sha256": "ab" * 32, "size_bytes": 120_000,
+                "uploaded_at": datetime(2025, 3, 1, 8, 30), "processing_status": "done", "page_count": 1,
+                "width": 1240, "height": 1754, "thumbnail_url": None, "preview_url": None,
+            }
+            for i in range(rows)
+        ]),
+        "grades": (Grade, [
+            {"id": g, "name": f"{g}° Primaria", "level": "Primaria",
+             "sections": [_section(g * 3 + k) for k in range(3)]}
+            for g in range(max(1, rows // 3))
+        ]),
+        "sections": (Section, [_section(i) for i in range(rows)]),
+        "years": (AcademicYear, [
+            {"id": i, "year": 2000 + i, "start_date": date(2000 + i, 3, 1),
+             "end_date": date(2000 + i, 12, 20), "is_active": False}
+            for i in range(rows)
+        ]),
+    }
+
+
+def as_objects(value):
+    """Diccionarios anidados -> objetos con atributos (sustituto de filas ORM)"""
+    if isinstance(value, dict):
+        return SimpleNamespace(**{key: as_objects(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return [as_objects(item) for item in value]
+    return value
+
+
+async def _response_model(field, items, response_class) -> bytes:
+    content = await serialize_response(field=field, response_content=items, is_coroutine=True)
+    return response_class(content).body
+
+
+async def measure(schema, items, repeat: int) -> dict:
+    field = create_response_field(name="response", type_=List[schema])
+    objects = as_objects(items)
+
+    async def timed(fn) -> float:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            await fn()
+        return (time.perf_counter() - started) / repeat * 1000
+
+    async def orm_json():
+        return await _response_model(field, objects, JSONResponse)
+
+    async def dict_orjson():
+        return await _response_model(field, items, ORJSONResponse)
+
+    async def fast():
+        return json_list(schema, items).body
+
+    # Los tres caminos producen el mismo JSON
+    assert json.loads(await orm_json()) == json.loads(await dict_orjson()) == json.loads(await fast())
+    return {"orm+json": await timed(orm_json), "dict+orjson": await timed(dict_orjson), "json_list": await timed(fast)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100, help="Elementos por página")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{args.rows} filas por página, {args.repeat} repeticiones (ms por página)")
+    print(f"{'endpoint':<12} {'orm+json':>10} {'dict+orjson':>12} {'json_list':>10} {'mejora':>8}")
+    for name, (schema, items) in sample_pages(args.rows).items():
+        result = asyncio.run(measure(schema, items, args.repeat))
+        print(
+            f"{name:<12} {result['orm+json']:>10.3f} {result['dict+orjson']:>12.3f} "
+            f"{result['json_list']:>10.3f} {result['orm+json'] / result['json_list']:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Servidor de la API para los benchmarks: uvicorn local y revisiones de git.
+
+Todo corre en 127.0.0.1; ningún benchmark necesita acceso a la red.
+"""
+import contextlib
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Iterator, Optional
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(app_dir: Path, port: int, cwd: Optional[Path] = None, env: Optional[dict] = None) -> subprocess.Popen:
+    """Levanta `app.main:app` de `app_dir` y espera a que /health responda.
+
+    `cwd` es el directorio de trabajo del servidor (allí quedan los uploads).
+    """
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=cwd or app_dir,
+        env={**os.environ, **(env or {}), "PYTHONPATH": str(app_dir)},
+        stdout=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"El servidor de {app_dir} terminó al iniciar")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health", timeout=1, trust_env=False)
+            return process
+        except httpx.TransportError:
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit(f"El servidor de {app_dir} no respondió")
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+@contextlib.contextmanager
+def checkout(revision: Optional[str]) -> Iterator[Path]:
+    """Directorio backend/ de `revision` en un git worktree temporal (None = árbol actual)"""
+    if revision is None:
+        yield BACKEND_DIR
+        return
+    worktree = Path(tempfile.mkdtemp(prefix="mrc_rev_"))
+    subprocess.run(["git", "worktree", "add", "--detach", str(worktree), revision], check=True,
+                   cwd=BACKEND_DIR, stdout=subprocess.DEVNULL)
+    try:
+        yield worktree / "backend"
+    finally:
+        subprocess.run(["git", "worktree", "remove", "--force", str(worktree)], cwd=BACKEND_DIR)
+        shutil.rmtree(worktree, ignore_errors=True)
@@ -0,0 +1,226 @@
+"""Workload de temporada de matrícula sobre un colegio de benchmarks.dataset.
+
+Cada usuario virtual (una secretaria) inicia sesión al mismo tiempo que
+los demás (tormenta de logins) y luego repite acciones al azar, con pesos
+parecidos a los de la temporada:
+
+- buscar estudiantes y apoderados por apellido, nombre o prefijo de DNI,
+- recorrer listados de matrículas y estudiantes por cursor,
+- cargar los datos de referencia (grados, años) y la ocupación,
+- matricular estudiantes sin matrícula, a menudo en secciones completas
+  (el 400 "No hay vacantes" es una respuesta esperada),
+- subir documentos de matrículas existentes.
+
+Las acciones se eligen con un generador con semilla por usuario, así dos
+corridas con la misma semilla envían la misma secuencia de solicitudes.
+"""
+import asyncio
+import os
+import random
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.academic import AcademicYear, Section, SectionSeat
+from app.models.enrollment import Enrollment
+from app.models.student import Guardian, Student
+
+API = "/api/v1"
+UPLOAD_TYPES = ["DNI del Alumno", "DNI del Apoderado", "Partida de Nacimiento", "Certificado de Estudios"]
+
+
+@dataclass
+class Context:
+    """Datos del colegio que el workload necesita conocer de antemano"""
+    year_id: int
+    users: List[str]
+    password: str
+    # grade_id -> secciones libres / completas al empezar
+    open_sections: Dict[int, List[int]]
+    full_sections: Dict[int, List[int]]
+    # (student_id, grade_id) sin matrícula en el año activo
+    unenrolled: List[Tuple[int, int]]
+    enrollment_ids: List[int]
+    search_terms: List[str]
+
+
+def load_context(db: Session, users: Sequence[str], password: str, seed: int = 42) -> Context:
+    rng = random.Random(seed)
+    year_id = db.scalar(select(AcademicYear.id).where(AcademicYear.is_active.is_(True)))
+    open_sections, full_sections = defaultdict(list), defaultdict(list)
+    for section_id, grade_id, capacity, occupied in db.execute(
+        select(Section.id, Section.grade_id, Section.capacity, SectionSeat.enrolled_count)
+        .join(SectionSeat, (SectionSeat.section_id == Section.id) & (SectionSeat.academic_year_id == year_id))
+        .order_by(Section.id)
+    ):
+        (full_sections if occupied >= capacity else open_sections)[grade_id].append(section_id)
+
+    enrolled = select(Enrollment.student_id).where(Enrollment.academic_year_id == year_id)
+    previous_grade = (
+        select(Enrollment.grade_id).where(Enrollment.student_id == Student.id)
+        .order_by(Enrollment.academic_year_id.desc()).limit(1).scalar_subquery()
+    )
+    unenrolled = db.execute(
+        select(Student.id, previous_grade).where(Student.id.notin_(enrolled)).order_by(Student.id)
+    ).all()
+    # Pasan al grado siguiente al del año anterior; sin historial (ingresantes), a 1° de Primaria
+    grade_ids = sorted(set(open_sections) | set(full_sections))
+    next_grade = {grade_id: grade_ids[min(i + 1, len(grade_ids) - 1)] for i, grade_id in enumerate(grade_ids)}
+    unenrolled = [
+        (student_id, next_grade[grade_id] if grade_id else grade_ids[0]) for student_id, grade_id in unenrolled
+    ]
+    rng.shuffle(unenrolled)
+
+    enrollment_ids = db.scalars(
+        select(Enrollment.id).where(Enrollment.academic_year_id == year_id).order_by(Enrollment.id)
+    ).all()
+
+    # Términos de búsqueda reales: apellidos, nombres, prefijos de DNI, con y sin tildes
+    names = db.execute(select(Student.last_name, Student.first_name, Student.dni).limit(2000)).all()
+    names += db.execute(select(Guardian.last_name, Guardian.first_name, Guardian.dni).limit(500)).all()
+    terms = []
+    for last_name, first_name, dni in rng.sample(names, min(len(names), 300)):
+        terms.append(last_name.split()[0][:rng.randint(3, 8)].lower())
+        terms.append(f"{last_name.split()[0]} {first_name.split()[0]}")
+        terms.append(dni[:rng.randint(4, 8)])
+    terms += ["nunez", "quispe m", "nahui", "rodrigues"]  # Sin tildes / con errores: rama difusa
+
+    return Context(
+        year_id=year_id, users=list(users), password=password,
+        open_sections=dict(open_sections), full_sections=dict(full_sections),
+        unenrolled=unenrolled, enrollment_ids=list(enrollment_ids), search_terms=terms,
+    )
+
+
+@dataclass
+class Results:
+    latencies: Dict[str, List[float]] = field(default_factory=lambda: defaultdict(list))
+    statuses: Dict[str, Dict[int, int]] = field(default_factory=lambda: defaultdict(lambda: defaultdict(int)))
+    errors: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    elapsed: float = 0.0
+
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, context: Context, results: Results, rng: random.Random, username: str):
+        self.client = client
+        self.context = context
+        self.results = results
+        self.rng = rng
+        self.username = username
+        self.headers: Dict[str, str] = {}
+
+    async def request(self, name: str, method: str, url: str, expected: Sequence[int] = (200,), **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+        except httpx.HTTPError:
+            self.results.errors[name] += 1
+            return None
+        self.results.latencies[name].append((time.perf_counter() - started) * 1000)
+        self.results.statuses[name][response.status_code] += 1
+        if response.status_code not in expected:
+            self.results.errors[name] += 1
+        return response
+
+    async def login(self) -> bool:
+        response = await self.request(
+            "POST /login/access-token", "POST", f"{API}/login/access-token",
+            data={"username": self.username, "password": self.context.password},
+        )
+        if response is None or response.status_code != 200:
+            return False
+        self.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+        return True
+
+    async def search_students(self):
+        q = self.rng.choice(self.context.search_terms)
+        await self.request("GET /students/search", "GET", f"{API}/students/search", params={"q": q})
+
+    async def search_guardians(self):
+        q = self.rng.choice(self.context.search_terms)
+        await self.request("GET /students/guardian/search", "GET", f"{API}/students/guardian/search", params={"q": q})
+
+    async def _browse(self, name: str, url: str, pages: int):
+        params = {"limit": 50}
+        for _ in range(pages):
+            response = await self.request(name, "GET", url, params=params)
+            cursor = response.headers.get("x-next-cursor") if response is not None else None
+            if not cursor:
+                return
+            params = {"limit": 50, "cursor": cursor}
+
+    async def browse_enrollments(self):
+        await self._browse("GET /enrollments/", f"{API}/enrollments/", self.rng.randint(1, 4))
+
+    async def browse_students(self):
+        await self._browse("GET /students/", f"{API}/students/", self.rng.randint(1, 3))
+
+    async def load_reference(self):
+        # Lo que pide la aplicación al abrir la pantalla de matrícula
+        await self.request("GET /academic/years", "GET", f"{API}/academic/years")
+        await self.request("GET /academic/grades", "GET", f"{API}/academic/grades")
+        await self.request("GET /academic/occupancy", "GET", f"{API}/academic/occupancy",
+                           params={"year_id": self.context.year_id})
+
+    async def enroll(self):
+        if not self.context.unenrolled:
+            return await self.browse_enrollments()
+        student_id, grade_id = self.context.unenrolled.pop()
+        full = self.context.full_sections.get(grade_id, [])
+        open_ = self.context.open_sections.get(grade_id, [])
+        # La mitad de los intentos apunta a una sección completa
+        section_id = self.rng.choice(full) if full and (not open_ or self.rng.random() < 0.5) else self.rng.choice(open_)
+        await self.request(
+            "POST /enrollments/", "POST", f"{API}/enrollments/", expected=(200, 400),
+            json={"student_id": student_id, "academic_year_id": self.context.year_id,
+                  "grade_id": grade_id, "section_id": section_id},
+        )
+
+    async def upload_document(self):
+        enrollment_id = self.rng.choice(self.context.enrollment_ids)
+        # Escaneos de 30 KB a 1 MB, contenido distinto en cada subida
+        size = min(int(self.rng.lognormvariate(11.5, 0.7)), 1024 * 1024)
+        content = b"%PDF-1.4\n" + os.urandom(size)
+        await self.request(
+            "POST /documents/upload", "POST", f"{API}/documents/upload",
+            data={"enrollment_id": str(enrollment_id), "type": self.rng.choice(UPLOAD_TYPES)},
+            files={"file": ("escaneo.pdf", content, "application/pdf")},
+        )
+
+    def actions(self) -> List[Tuple[int, Callable]]:
+        return [
+            (30, self.search_students),
+            (8, self.search_guardians),
+            (20, self.browse_enrollments),
+            (8, self.browse_students),
+            (12, self.load_reference),
+            (14, self.enroll),
+            (8, self.upload_document),
+        ]
+
+    async def run(self, iterations: int):
+        if not await self.login():
+            return
+        weights, actions = zip(*self.actions())
+        for _ in range(iterations):
+            await self.rng.choices(actions, weights)[0]()
+
+
+async def run(base_url: str, context: Context, virtual_users: int, iterations: int, seed: int = 42) -> Results:
+    """Ejecuta el workload completo y devuelve latencias y estados por endpoint"""
+    results = Results()
+    limits = httpx.Limits(max_connections=virtual_users, max_keepalive_connections=virtual_users)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120, trust_env=False) as client:
+        users = [
+            VirtualUser(client, context, results, random.Random(seed + i), context.users[i % len(context.users)])
+            for i in range(virtual_users)
+        ]
+        started = time.perf_counter()
+        await asyncio.gather(*(user.run(iterations) for user in users))
+        results.elapsed = time.perf_counter() - started
+    return results
@@ -0,0 +1,107 @@
+"""Pruebas del backend sobre un SQLite temporal.
+
+Uso (desde backend/):
+    python -m pytest
+
+La base se crea una vez por sesión con las migraciones y el seed, igual que
+en un despliegue. Las pruebas comparten la base: cada una crea sus propios
+estudiantes, secciones y matrículas (DNIs únicos) en vez de limpiar tablas.
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import os
+import tempfile
+
+# Antes de importar la app: la configuración y los motores se crean al importar
+_workdir = tempfile.mkdtemp(prefix="mrc-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_workdir}/test.db"
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "1")
+# uploads/ es relativo al directorio de trabajo
+os.chdir(_workdir)
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import cli  # noqa: E402
+from app.db.session import SessionLocal  # noqa: E402
+
+_dni = itertools.count(10_000_000)
+
+
+def next_dni() -> str:
+    return str(next(_dni))
+
+
+@pytest.fixture(scope="session")
+def client():
+    with contextlib.redirect_stdout(io.StringIO()):
+        cli.migrate(argparse.Namespace(revision="head"))
+        cli.seed(argparse.Namespace())
+
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        response = test_client.post("/api/v1/login/access-token", data={"username": "admin", "password": "admin123"})
+        assert response.status_code == 200, response.text
+        test_client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+        yield test_client
+
+
+@pytest.fixture
+def db(client):
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def year(client) -> dict:
+    return client.get("/api/v1/academic/years").json()[0]
+
+
+@pytest.fixture
+def make_section(client):
+    """Crea una sección nueva (sin matrículas) en el primer grado"""
+    def make(capacity: int = 30) -> dict:
+        grade = client.get("/api/v1/academic/grades").json()[0]
+        response = client.post(
+            "/api/v1/academic/sections", json={"name": f"T{next_dni()}", "grade_id": grade["id"], "capacity": capacity}
+        )
+        assert response.status_code == 200, response.text
+        return response.json()
+    return make
+
+
+@pytest.fixture
+def make_student(client):
+    def make(**fields) -> dict:
+        guardian_dni = next_dni()
+        response = client.post(
+            "/api/v1/students/guardian", json={"dni": guardian_dni, "first_name": "Apoderado", "last_name": "Prueba"}
+        )
+        assert response.status_code == 200, response.text
+        body = {
+            "dni": next_dni(), "first_name": "Estudiante", "last_name": "Prueba",
+            "birth_date": "2015-01-01", "guardian_dni": guardian_dni, **fields,
+        }
+        response = client.post("/api/v1/students/", json=body)
+        assert response.status_code == 200, response.text
+        return response.json()
+    return make
+
+
+@pytest.fixture
+def enroll(client, year, make_student):
+    """Matricula un estudiante nuevo en la sección; devuelve la respuesta"""
+    def enroll(section: dict, student: dict = None):
+        student = student or make_student()
+        return client.post("/api/v1/enrollments/", json={
+            "student_id": student["id"], "academic_year_id": year["id"],
+            "grade_id": section["grade_id"], "section_id": section["id"],
+        })
+    return enroll
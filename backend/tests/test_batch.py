@@ -0,0 +1,18 @@
+"""Matrícula masiva: validación del tamaño del lote"""
+from app.schemas.enrollment import MAX_BATCH_ITEMS
+
+
+def test_oversized_batch_is_rejected(client, year, make_section):
+    section = make_section()
+    items = [{"student_id": n, "section_id": section["id"]} for n in range(1, MAX_BATCH_ITEMS + 2)]
+    response = client.post("/api/v1/enrollments/batch", json={"academic_year_id": year["id"], "items": items})
+    assert response.status_code == 422
+
+
+def test_batch_within_limit_is_accepted(client, year, make_section, make_student):
+    section, student = make_section(), make_student()
+    response = client.post("/api/v1/enrollments/batch", json={
+        "academic_year_id": year["id"], "items": [{"student_id": student["id"], "section_id": section["id"]}],
+    })
+    assert response.status_code == 200
+    assert response.json()["created"] == 1
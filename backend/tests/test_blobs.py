@@ -0,0 +1,103 @@
+"""Almacén de blobs por contenido: referencias, período de gracia y subidas fallidas"""
+import hashlib
+import uuid
+from pathlib import Path
+
+import pytest
+from sqlalchemy import select
+
+from app.api import documents
+from app.models.enrollment import Document, DocumentBlob
+from app.services import storage
+
+
+@pytest.fixture
+def enrollment(make_section, enroll):
+    return enroll(make_section()).json()
+
+
+def _content() -> bytes:
+    # Contenido distinto en cada prueba: los blobs son compartidos por toda la base
+    return b"%PDF-1.4 " + uuid.uuid4().hex.encode()
+
+
+def _upload(client, enrollment, content: bytes):
+    return client.post(
+        "/api/v1/documents/upload",
+        data={"enrollment_id": str(enrollment["id"]), "type": "DNI"},
+        files={"file": ("dni.pdf", content, "application/pdf")},
+    )
+
+
+def _blob(db, content: bytes):
+    sha256 = hashlib.sha256(content).hexdigest()
+    return db.scalar(select(DocumentBlob).where(DocumentBlob.sha256 == sha256).execution_options(populate_existing=True))
+
+
+def test_same_content_is_stored_once(client, db, enrollment):
+    content = _content()
+    first = _upload(client, enrollment, content).json()
+    second = _upload(client, enrollment, content).json()
+
+    assert first["id"] != second["id"]
+    blob = _blob(db, content)
+    blob_ids = db.scalars(select(Document.blob_id).where(Document.id.in_([first["id"], second["id"]]))).all()
+    assert blob_ids == [blob.id, blob.id]
+    assert blob.ref_count == 2
+    assert Path(blob.path).read_bytes() == content
+
+
+def test_release_waits_for_grace_period(client, db, enrollment):
+    content = _content()
+    ids = [_upload(client, enrollment, content).json()["id"] for _ in range(2)]
+
+    assert client.delete(f"/api/v1/documents/{ids[0]}").status_code == 200
+    blob = _blob(db, content)
+    assert (blob.ref_count, blob.released_at) == (1, None)
+
+    assert client.delete(f"/api/v1/documents/{ids[1]}").status_code == 200
+    blob = _blob(db, content)
+    assert blob.ref_count == 0 and blob.released_at is not None
+    path = Path(blob.path)
+    # El archivo sigue ahí hasta que el GC lo borre pasado el período de gracia
+    assert path.exists()
+    storage.collect_released_blobs(db, grace_seconds=3600)
+    assert _blob(db, content) is not None
+
+    storage.collect_released_blobs(db, grace_seconds=0)
+    assert _blob(db, content) is None
+    assert not path.exists()
+
+
+def test_reupload_by_hash_revives_released_blob(client, db, enrollment):
+    content = _content()
+    document = _upload(client, enrollment, content).json()
+    client.delete(f"/api/v1/documents/{document['id']}")
+
+    response = client.post("/api/v1/documents/upload", data={
+        "enrollment_id": str(enrollment["id"]), "type": "DNI", "sha256": hashlib.sha256(content).hexdigest(),
+    })
+    assert response.status_code == 200
+    blob = _blob(db, content)
+    assert (blob.ref_count, blob.released_at) == (1, None)
+    path = Path(blob.path)
+    storage.collect_released_blobs(db, grace_seconds=0)
+    assert path.exists()
+
+
+def test_failed_upload_leaves_no_orphan(client, db, enrollment, monkeypatch):
+    async def fail(*args, **kwargs):
+        raise RuntimeError("fallo simulado")
+
+    monkeypatch.setattr(documents.events, "publish", fail)
+    content = _content()
+    with pytest.raises(RuntimeError):
+        _upload(client, enrollment, content)
+
+    # El blob queda registrado como liberado para que el GC borre el archivo
+    blob = _blob(db, content)
+    assert blob.ref_count == 0 and blob.released_at is not None
+    assert not any(storage.BLOB_TMP_DIR.glob("*.part"))
+    path = Path(blob.path)
+    storage.collect_released_blobs(db, grace_seconds=0)
+    assert not path.exists()
@@ -0,0 +1,55 @@
+"""Bloqueo de login por IP: la clave no se puede falsear con X-Forwarded-For"""
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+
+from app.api import auth
+from app.core.config import settings
+from app.core.throttle import FailureTracker
+from app.main import app
+
+MAX_FAILURES = 3
+
+
+@pytest.fixture(autouse=True)
+def trackers(client, monkeypatch):
+    monkeypatch.setattr(auth, "ip_failures", FailureTracker(MAX_FAILURES, 60))
+    monkeypatch.setattr(auth, "user_failures", FailureTracker(MAX_FAILURES, 60))
+
+
+def _behind(peer: str, trusted_hosts: str) -> TestClient:
+    """App detrás del mismo middleware que usa gunicorn, con conexiones desde `peer`"""
+    proxied = ProxyHeadersMiddleware(app, trusted_hosts=trusted_hosts)
+
+    async def connect_from(scope, receive, send):
+        # El TestClient de Starlette no informa la dirección de la conexión
+        await proxied({**scope, "client": (peer, 50000)}, receive, send)
+
+    return TestClient(connect_from)
+
+
+def _attempts(test_client, forwarded_for):
+    """Un intento fallido por llamada, cada uno con otro usuario y otro X-Forwarded-For"""
+    statuses = []
+    for n in range(MAX_FAILURES + 1):
+        statuses.append(test_client.post(
+            "/api/v1/login/access-token",
+            data={"username": f"nadie-{uuid.uuid4().hex}", "password": "x"},
+            headers={"X-Forwarded-For": forwarded_for(n)},
+        ).status_code)
+    return statuses
+
+
+def test_spoofed_header_from_untrusted_peer_is_ignored():
+    test_client = _behind("192.0.2.1", settings.GUNICORN_FORWARDED_ALLOW_IPS)
+    assert _attempts(test_client, lambda n: f"198.51.100.{n}") == [400] * MAX_FAILURES + [429]
+    assert auth.ip_failures.retry_after("192.0.2.1") is not None
+
+
+def test_trusted_proxy_uses_address_it_saw():
+    # Aunque el proxy añadiera al encabezado del cliente, cuenta la última IP (la que vio nginx)
+    test_client = _behind("172.28.0.10", "172.28.0.10")
+    assert _attempts(test_client, lambda n: f"198.51.100.{n}, 203.0.113.7") == [400] * MAX_FAILURES + [429]
+    assert auth.ip_failures.retry_after("203.0.113.7") is not None
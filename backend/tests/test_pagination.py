@@ -0,0 +1,46 @@
+"""Paginación por cursor y validación de skip/limit en los listados"""
+import pytest
+
+from app.api.pagination import MAX_PAGE_SIZE
+
+LISTS = ["/api/v1/students/", "/api/v1/students/guardian", "/api/v1/enrollments/", "/api/v1/documents/"]
+
+
+def test_cursor_walks_every_row_once(client, make_student):
+    for _ in range(5):
+        make_student()
+    expected = [row["id"] for row in client.get("/api/v1/students/", params={"limit": MAX_PAGE_SIZE}).json()]
+
+    seen, params = [], {"limit": 2}
+    while True:
+        response = client.get("/api/v1/students/", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page) <= 2
+        seen.extend(row["id"] for row in page)
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        params = {"limit": 2, "cursor": cursor}
+    assert seen == expected
+
+
+def test_offset_page_continues_by_cursor(client, make_student):
+    for _ in range(3):
+        make_student()
+    expected = [row["id"] for row in client.get("/api/v1/students/", params={"limit": MAX_PAGE_SIZE}).json()]
+
+    first = client.get("/api/v1/students/", params={"skip": 1, "limit": 1})
+    second = client.get("/api/v1/students/", params={"limit": 1, "cursor": first.headers["X-Next-Cursor"]})
+    assert [first.json()[0]["id"], second.json()[0]["id"]] == expected[1:3]
+
+
+@pytest.mark.parametrize("path", LISTS)
+@pytest.mark.parametrize("params", [{"limit": 0}, {"limit": -1}, {"limit": MAX_PAGE_SIZE + 1}, {"skip": -1}])
+def test_invalid_page_bounds_are_rejected(client, path, params):
+    assert client.get(path, params=params).status_code == 422
+
+
+def test_invalid_cursor_is_rejected(client):
+    response = client.get("/api/v1/students/", params={"cursor": "no-es-un-cursor"})
+    assert (response.status_code, response.json()["detail"]) == (400, "Cursor de paginación inválido")
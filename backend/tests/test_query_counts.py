@@ -0,0 +1,77 @@
+"""Máximo de consultas por endpoint (app.core.query_inspector.assert_max_queries).
+
+El usuario autenticado sale de principal_cache, así que estos topes son
+solo las consultas del endpoint. Si uno falla, el mensaje lista las
+consultas ejecutadas: suele ser un N+1 o una caché que dejó de usarse.
+"""
+import pytest
+
+from app.core.query_inspector import assert_max_queries
+from app.services import seats
+
+
+@pytest.fixture
+def enrollment(make_section, enroll):
+    return enroll(make_section()).json()
+
+
+@pytest.mark.parametrize("path", ["/api/v1/academic/years", "/api/v1/academic/grades", "/api/v1/academic/sections"])
+def test_reference_data_is_served_from_memory(client, path):
+    client.get(path)
+    with assert_max_queries(0):
+        assert client.get(path).status_code == 200
+
+
+def test_occupancy(client, year):
+    seats.invalidate_occupancy()
+    with assert_max_queries(2):
+        client.get("/api/v1/academic/occupancy", params={"year_id": year["id"]})
+    with assert_max_queries(0):
+        client.get("/api/v1/academic/occupancy", params={"year_id": year["id"]})
+
+
+@pytest.mark.parametrize("path", [
+    "/api/v1/students/", "/api/v1/students/guardian", "/api/v1/enrollments/", "/api/v1/documents/",
+])
+def test_lists_are_a_single_query(client, enrollment, path):
+    with assert_max_queries(1):
+        assert client.get(path).status_code == 200
+
+
+def test_lists_do_not_grow_with_rows(client, make_section, enroll):
+    section = make_section()
+    for _ in range(5):
+        enroll(section)
+    with assert_max_queries(1):
+        client.get("/api/v1/enrollments/", params={"limit": 50})
+    with assert_max_queries(1):
+        client.get("/api/v1/students/", params={"limit": 50})
+
+
+def test_sync_changes(client):
+    cursor = client.get("/api/v1/students/").headers["X-Sync-Cursor"]
+    with assert_max_queries(2):
+        client.get("/api/v1/students/", params={"updated_since": cursor})
+
+
+def test_writes(client, make_section, make_student, year, enrollment):
+    section, student = make_section(), make_student()
+    # Reserva (con la validación) e INSERT ... RETURNING
+    with assert_max_queries(2):
+        client.post("/api/v1/enrollments/", json={
+            "student_id": student["id"], "academic_year_id": year["id"],
+            "grade_id": section["grade_id"], "section_id": section["id"],
+        })
+    with assert_max_queries(4):
+        client.patch(f"/api/v1/enrollments/{enrollment['id']}/status", params={"status": "Pendiente"})
+    with assert_max_queries(1):
+        client.put(f"/api/v1/students/{student['id']}", json={
+            "dni": student["dni"], "first_name": "X", "last_name": "Y",
+            "birth_date": "2015-01-01", "guardian_dni": student["guardian"]["dni"],
+        })
+    with assert_max_queries(5):
+        client.post(
+            "/api/v1/documents/upload",
+            data={"enrollment_id": str(enrollment["id"]), "type": "DNI"},
+            files={"file": ("dni.pdf", b"%PDF-1.4 consultas", "application/pdf")},
+        )
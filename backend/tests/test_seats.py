@@ -0,0 +1,139 @@
+"""Contadores de vacantes (section_seats): reserva, cambios de estado y ocupación"""
+from sqlalchemy import func, select
+
+from app.models.academic import AcademicYear, SectionSeat
+from app.models.enrollment import Enrollment
+
+
+def _seat(db, section_id, year_id):
+    return db.get(SectionSeat, (section_id, year_id), populate_existing=True)
+
+
+def _occupancy(client, section, year):
+    body = client.get("/api/v1/academic/occupancy", params={"year_id": year["id"]}).json()
+    for grade in body["grades"]:
+        for entry in grade["sections"]:
+            if entry["section_id"] == section["id"]:
+                return entry
+    raise AssertionError(f"La sección {section['id']} no aparece en la ocupación")
+
+
+def test_new_section_gets_counters_for_every_year(db, make_section):
+    section = make_section()
+    years = db.scalar(select(func.count(AcademicYear.id)))
+    seats = db.scalars(select(SectionSeat).where(SectionSeat.section_id == section["id"])).all()
+    assert len(seats) == years
+    assert all(seat.enrolled_count == 0 and seat.pending_count == 0 for seat in seats)
+
+
+def test_full_section_rejects_enrollment(client, db, year, make_section, enroll):
+    section = make_section(capacity=2)
+    assert enroll(section).status_code == 200
+    assert enroll(section).status_code == 200
+
+    response = enroll(section)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "No hay vacantes disponibles en esta sección"
+    # El rollback devolvió la reserva fallida
+    assert _seat(db, section["id"], year["id"]).enrolled_count == 2
+    assert _occupancy(client, section, year) == {
+        "section_id": section["id"], "name": section["name"], "capacity": 2, "enrolled": 2, "pending": 0, "free": 0,
+    }
+
+
+def test_status_changes_move_seats(client, db, year, make_section, enroll):
+    section = make_section(capacity=1)
+    enrollment = enroll(section).json()
+    assert enroll(section).status_code == 400
+
+    # Pendiente sigue ocupando la vacante, pero cuenta como pendiente
+    assert client.patch(f"/api/v1/enrollments/{enrollment['id']}/status", params={"status": "Pendiente"}).status_code == 200
+    seat = _seat(db, section["id"], year["id"])
+    assert (seat.enrolled_count, seat.pending_count) == (1, 1)
+    occupancy = _occupancy(client, section, year)
+    assert (occupancy["enrolled"], occupancy["pending"], occupancy["free"]) == (0, 1, 0)
+
+    # Rechazado libera la vacante
+    assert client.patch(f"/api/v1/enrollments/{enrollment['id']}/status", params={"status": "Rechazado"}).status_code == 200
+    seat = _seat(db, section["id"], year["id"])
+    assert (seat.enrolled_count, seat.pending_count) == (0, 0)
+    other = enroll(section)
+    assert other.status_code == 200
+
+    # Volver a ocupar una vacante con la sección llena no se permite
+    response = client.patch(f"/api/v1/enrollments/{enrollment['id']}/status", params={"status": "Matriculado"})
+    assert response.status_code == 400
+    assert _seat(db, section["id"], year["id"]).enrolled_count == 1
+
+    # Eliminar la matrícula libera su vacante
+    assert client.delete(f"/api/v1/enrollments/{other.json()['id']}").status_code == 200
+    assert _seat(db, section["id"], year["id"]).enrolled_count == 0
+    assert _occupancy(client, section, year)["free"] == 1
+
+
+def test_counter_matches_enrollments(client, db, year, make_section, enroll):
+    section = make_section(capacity=5)
+    ids = [enroll(section).json()["id"] for _ in range(4)]
+    client.patch(f"/api/v1/enrollments/{ids[0]}/status", params={"status": "Rechazado"})
+    client.patch(f"/api/v1/enrollments/{ids[1]}/status", params={"status": "Pendiente"})
+    client.delete(f"/api/v1/enrollments/{ids[2]}")
+
+    occupying = db.scalar(select(func.count(Enrollment.id)).where(
+        Enrollment.section_id == section["id"], Enrollment.academic_year_id == year["id"],
+        Enrollment.status != "Rechazado",
+    ))
+    seat = _seat(db, section["id"], year["id"])
+    assert seat.enrolled_count == occupying == 2
+    assert seat.pending_count == 1
+
+
+def test_occupancy_read_does_not_write(client, db, year, make_section):
+    section = make_section()
+    db.query(SectionSeat).filter(SectionSeat.section_id == section["id"]).delete()
+    db.commit()
+
+    # Sin contador la sección cuenta como vacía, y la lectura no lo crea
+    occupancy = _occupancy(client, section, year)
+    assert (occupancy["enrolled"], occupancy["free"]) == (0, section["capacity"])
+    assert _seat(db, section["id"], year["id"]) is None
+
+
+def test_enrollment_validates_grade_and_duplicates(client, year, make_section, make_student, enroll):
+    section = make_section()
+    student = make_student()
+    response = client.post("/api/v1/enrollments/", json={
+        "student_id": student["id"], "academic_year_id": year["id"], "grade_id": 999_999, "section_id": section["id"],
+    })
+    assert (response.status_code, response.json()["detail"]) == (404, "Grado no encontrado")
+
+    assert enroll(section, student).status_code == 200
+    response = enroll(section, student)
+    assert (response.status_code, response.json()["detail"]) == (
+        400, "El estudiante ya está matriculado en este año académico"
+    )
+
+
+def test_duplicate_in_full_section_reports_duplicate(client, db, year, make_section, make_student, enroll):
+    section = make_section(capacity=1)
+    student = make_student()
+    assert enroll(section, student).status_code == 200
+
+    response = enroll(section, student)
+    assert (response.status_code, response.json()["detail"]) == (
+        400, "El estudiante ya está matriculado en este año académico"
+    )
+    assert _seat(db, section["id"], year["id"]).enrolled_count == 1
+
+
+def test_first_enrollment_creates_missing_counter(client, db, year, make_section, enroll):
+    section = make_section(capacity=1)
+    db.query(SectionSeat).filter(SectionSeat.section_id == section["id"]).delete()
+    db.commit()
+
+    response = enroll(section)
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["status"], body["version"], body["section"]["id"]) == ("Matriculado", 1, section["id"])
+    assert body["student"]["dni"] and body["grade"]["id"] == section["grade_id"]
+    assert _seat(db, section["id"], year["id"]).enrolled_count == 1
+    assert enroll(section).json()["detail"] == "No hay vacantes disponibles en esta sección"
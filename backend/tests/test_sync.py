@@ -0,0 +1,115 @@
+"""Sincronización incremental (?updated_since=): cambios, lápidas y cursores vencidos"""
+from datetime import timedelta
+
+from sqlalchemy import select, update
+
+from app.api.sync import decode_sync_cursor, encode_sync_cursor
+from app.core.config import settings
+from app.models.student import Guardian, Student
+from app.models.sync import Tombstone, prune_tombstones, utcnow
+
+
+def _changes(client, cursor: str, limit: int = 100) -> dict:
+    response = client.get("/api/v1/students/", params={"updated_since": cursor, "limit": limit})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _drain(client, cursor: str, limit: int):
+    """Recorre todas las páginas; devuelve (ids cambiados, ids eliminados, cursor final)"""
+    items, deleted = [], []
+    while True:
+        body = _changes(client, cursor, limit)
+        assert len(body["items"]) <= limit
+        items.extend(item["id"] for item in body["items"])
+        deleted.extend(body["deleted"])
+        cursor = body["cursor"]
+        if not body["has_more"]:
+            return items, deleted, cursor
+
+
+def test_changes_since_full_load(client, make_student):
+    untouched, edited, removed = make_student(), make_student(), make_student()
+    guardian_changed = make_student()
+    cursor = client.get("/api/v1/students/").headers["X-Sync-Cursor"]
+
+    created = make_student()
+    client.put(f"/api/v1/students/{edited['id']}", json={
+        "dni": edited["dni"], "first_name": "Editado", "last_name": "Prueba",
+        "birth_date": "2015-01-01", "guardian_dni": edited["guardian"]["dni"],
+    })
+    # El listado anida al apoderado: su cambio reenvía al estudiante
+    client.put(f"/api/v1/students/guardian/{guardian_changed['guardian']['dni']}", json={
+        "dni": guardian_changed["guardian"]["dni"], "first_name": "Nuevo", "last_name": "Apoderado",
+    })
+    client.delete(f"/api/v1/students/{removed['id']}")
+
+    items, deleted, _ = _drain(client, cursor, limit=1)
+    assert {created["id"], edited["id"], guardian_changed["id"]} <= set(items)
+    assert removed["id"] in deleted
+    assert removed["id"] not in items
+    # Solo la ventana de solapamiento puede reenviar registros sin cambios
+    if untouched["id"] in items:
+        assert settings.SYNC_OVERLAP_SECONDS > 0
+
+
+def test_settled_cursor_returns_nothing_new(client, make_student):
+    make_student()
+    cursor = client.get("/api/v1/students/").headers["X-Sync-Cursor"]
+    _, _, cursor = _drain(client, cursor, limit=100)
+    first = _changes(client, cursor)
+    assert not first["has_more"]
+    # Reintentar con el mismo cursor no pierde ni inventa cambios
+    again = _changes(client, cursor)
+    assert ([item["id"] for item in again["items"]], again["deleted"]) == (
+        [item["id"] for item in first["items"]], first["deleted"]
+    )
+
+    created = make_student()
+    assert created["id"] in [item["id"] for item in _changes(client, first["cursor"])["items"]]
+
+
+def test_late_commit_during_paging_is_not_skipped(client, db, make_student):
+    cursor = client.get("/api/v1/students/").headers["X-Sync-Cursor"]
+    make_student(), make_student()
+    page = _changes(client, cursor, limit=1)
+    assert page["has_more"]
+
+    # Transacción que empezó antes y se confirma a mitad del recorrido:
+    # su updated_at queda detrás del cursor de la página ya entregada
+    (page_at, _), _ = decode_sync_cursor(page["cursor"])
+    late = make_student()
+    backdated = page_at - timedelta(milliseconds=1)
+    db.execute(update(Student).where(Student.id == late["id"]).values(updated_at=backdated))
+    db.execute(update(Guardian).where(Guardian.dni == late["guardian"]["dni"]).values(updated_at=backdated))
+    db.commit()
+
+    items, _, cursor = _drain(client, page["cursor"], limit=1)
+    assert late["id"] not in items
+    # El retroceso final vuelve hasta el inicio del recorrido, no solo hasta la última página
+    assert late["id"] in [item["id"] for item in _changes(client, cursor)["items"]]
+
+
+def test_invalid_cursor_is_rejected(client):
+    response = client.get("/api/v1/students/", params={"updated_since": "%%%"})
+    assert response.status_code == 400
+
+
+def test_cursor_older_than_retention_forces_full_reload(client):
+    expired = encode_sync_cursor((utcnow() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS + 1), 0))
+    response = client.get("/api/v1/students/", params={"updated_since": expired})
+    assert response.status_code == 410
+
+    recent = encode_sync_cursor((utcnow() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS - 1), 0))
+    assert client.get("/api/v1/students/", params={"updated_since": recent}).status_code == 200
+
+
+def test_prune_keeps_tombstones_inside_retention(db):
+    old = Tombstone(table_name="students", row_id=-1, deleted_at=utcnow() - timedelta(days=40))
+    recent = Tombstone(table_name="students", row_id=-2)
+    db.add_all([old, recent])
+    db.commit()
+
+    assert prune_tombstones(db, retention_days=30) >= 1
+    remaining = set(db.scalars(select(Tombstone.row_id).where(Tombstone.row_id < 0)))
+    assert remaining == {-2}
@@ -0,0 +1,87 @@
+"""Concurrencia optimista: ETag / If-Match y 412 con versiones vencidas"""
+import pytest
+
+
+def _student_body(student: dict, **changes) -> dict:
+    body = {key: student[key] for key in ("dni", "first_name", "last_name", "birth_date")}
+    body["guardian_dni"] = student["guardian"]["dni"]
+    return {**body, **changes}
+
+
+def test_student_update_with_current_etag(client, make_student):
+    student = make_student()
+    etag = client.get(f"/api/v1/students/{student['dni']}").headers["ETag"]
+    assert etag == '"1"'
+
+    response = client.put(
+        f"/api/v1/students/{student['id']}", json=_student_body(student, first_name="Nuevo"), headers={"If-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"2"'
+    assert (response.json()["first_name"], response.json()["version"]) == ("Nuevo", 2)
+
+
+@pytest.mark.parametrize("if_match", ['"1"', 'W/"1"', '"abc"'])
+def test_stale_student_update_is_rejected(client, make_student, if_match):
+    student = make_student()
+    client.put(f"/api/v1/students/{student['id']}", json=_student_body(student, first_name="Otro"))
+
+    response = client.put(
+        f"/api/v1/students/{student['id']}", json=_student_body(student, first_name="Pisado"),
+        headers={"If-Match": if_match},
+    )
+    assert response.status_code == 412
+    current = client.get(f"/api/v1/students/{student['dni']}").json()
+    assert (current["first_name"], current["version"]) == ("Otro", 2)
+
+
+def test_update_without_if_match_is_unconditional(client, make_student):
+    student = make_student()
+    for _ in range(2):
+        response = client.put(f"/api/v1/students/{student['id']}", json=_student_body(student))
+        assert response.status_code == 200
+    assert response.headers["ETag"] == '"3"'
+
+
+def test_missing_record_is_404_not_412(client, make_student):
+    student = make_student()
+    response = client.put("/api/v1/students/999999", json=_student_body(student, dni="99999999"), headers={"If-Match": '"1"'})
+    assert response.status_code == 404
+
+
+def test_stale_guardian_update_is_rejected(client, make_student):
+    guardian = make_student()["guardian"]
+    body = {"dni": guardian["dni"], "first_name": "X", "last_name": "Y"}
+    url = f"/api/v1/students/guardian/{guardian['dni']}"
+
+    assert client.put(url, json=body, headers={"If-Match": '"1"'}).status_code == 200
+    assert client.put(url, json=body, headers={"If-Match": '"1"'}).status_code == 412
+
+
+def test_stale_enrollment_status_is_rejected(client, db, year, make_section, enroll):
+    section = make_section(capacity=1)
+    enrollment = enroll(section).json()
+    url = f"/api/v1/enrollments/{enrollment['id']}/status"
+
+    response = client.patch(url, params={"status": "Rechazado"}, headers={"If-Match": '"1"'})
+    assert (response.status_code, response.headers["ETag"]) == (200, '"2"')
+    # El 412 no toca los contadores: la vacante liberada sigue libre
+    assert client.patch(url, params={"status": "Matriculado"}, headers={"If-Match": '"1"'}).status_code == 412
+    occupancy = client.get("/api/v1/academic/occupancy", params={"year_id": year["id"]}).json()
+    free = {entry["section_id"]: entry["free"] for grade in occupancy["grades"] for entry in grade["sections"]}
+    assert free[section["id"]] == 1
+
+
+def test_stale_document_status_is_rejected(client, make_section, enroll):
+    enrollment = enroll(make_section()).json()
+    document = client.post(
+        "/api/v1/documents/upload",
+        data={"enrollment_id": str(enrollment["id"]), "type": "DNI"},
+        files={"file": ("dni.pdf", b"%PDF-1.4 versiones", "application/pdf")},
+    ).json()
+    url = f"/api/v1/documents/{document['id']}/status"
+
+    assert client.patch(url, params={"status": "Validado"}, headers={"If-Match": '"1"'}).status_code == 200
+    response = client.patch(url, params={"status": "Observado"}, headers={"If-Match": '"1"'})
+    assert response.status_code == 412
+    assert client.get(f"/api/v1/documents/{document['id']}").json()["status"] == "Validado"
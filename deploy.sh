@@ -39,15 +39,19 @@ if [ ! -f .env ]; then
 fi
 
 # 5. Crear directorio para uploads
-mkdir -p uploads/documents
+mkdir -p uploads/blobs/tmp
 
-# 6. Levantar servicios
-echo "🚀 Levantando contenedores..."
-docker-compose up -d --build
-
-# 7. Esperar a que la BD esté lista
+# 6. Levantar la base de datos y aplicar migraciones y datos iniciales
+# (una sola vez por despliegue; la API no toca el esquema al arrancar)
+echo "🗄️ Aplicando migraciones..."
+docker-compose up -d --build db
 echo "⏳ Esperando a que PostgreSQL esté listo..."
 sleep 10
+docker-compose run --rm backend sh -c "python -m app.cli migrate && python -m app.cli seed"
+
+# 7. Levantar servicios
+echo "🚀 Levantando contenedores..."
+docker-compose up -d --build
 
 # 8. Verificar estado
 echo "✅ Verificando servicios..."